@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+import atexit
+import fcntl
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Flow events in Chrome's trace event format, one JSON object per line in $DSE_TRACE.
+# scripts/dse/dse_profile.py turns the lines into a trace for chrome://tracing, Perfetto or speedscope.
+# Nothing is written unless DSE_TRACE is set, so plain `make` runs are untouched.
+
+def trace_path():
+    return os.environ.get("DSE_TRACE")
+
+def write(event):
+    path = trace_path()
+    if not path:
+        return
+    line = json.dumps(event) + "\n"
+    # Pool workers and the scripts make runs all append to the same file
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(line)
+
+def event(name, cat, start, wall, run=None, **args):
+    # Complete ("X") event, times in us. Scripts run by make report under the pid/tid of the
+    # dse thread that started make (DSE_TRACE_PID/TID), so they nest under its span.
+    write({
+        "name": name,
+        "cat": cat,
+        "ph": "X",
+        "ts": int(start * 1e6),
+        "dur": int(wall * 1e6),
+        "pid": int(os.environ.get("DSE_TRACE_PID", os.getpid())),
+        "tid": int(os.environ.get("DSE_TRACE_TID", threading.get_native_id())),
+        "args": dict(args, run=run or os.environ.get("DSE_TRACE_RUN"), session=os.environ.get("DSE_TRACE_SESSION")),
+    })
+
+def rusage_mb(ru):
+    # ru_maxrss is in KiB on Linux
+    return round(ru.ru_maxrss / 1024, 1)
+
+@contextmanager
+def span(name, cat, run=None, **args):
+    start = time.time()
+    try:
+        yield args
+    finally:
+        event(name, cat, start, time.time() - start, run, **args)
+
+def process_start():
+    # Includes interpreter startup, most of what a get_options.py call costs
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rpartition(")")[2].split()[19])
+        # starttime is in clock ticks since boot
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf("SC_CLK_TCK")
+        return time.time() - age
+    except (OSError, ValueError, AttributeError):
+        return time.time()
+
+def step(name=None):
+    # Call at the top of a script make runs: one event for the whole process at exit
+    if not trace_path():
+        return
+    # Scripts chdir, a relative DSE_TRACE should still mean the file it meant at startup
+    os.environ["DSE_TRACE"] = os.path.abspath(trace_path())
+    start = process_start()
+    name = name or " ".join([os.path.basename(sys.argv[0])] + sys.argv[1:])
+    def done():
+        self = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = self.ru_utime + self.ru_stime + children.ru_utime + children.ru_stime
+        event(name, "step", start, time.time() - start, cpu_s=round(cpu, 3),
+              max_rss_mb=max(rusage_mb(self), rusage_mb(children)))
+    atexit.register(done)
+
+def child_env(run=None):
+    # Environment for a make started under the current span
+    env = {}
+    if trace_path():
+        env["DSE_TRACE_PID"] = str(os.getpid())
+        env["DSE_TRACE_TID"] = str(threading.get_native_id())
+        if run is not None:
+            env["DSE_TRACE_RUN"] = run
+    return env
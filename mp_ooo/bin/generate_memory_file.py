@@ -2,11 +2,16 @@
 
 import sys
 import os
-import shutil
 import pathlib
 import subprocess
 import math
 
+import disasm
+import elf_loader
+import prog_cache
+import flow_trace
+flow_trace.step()
+
 RED    = "31"
 YELLOW = "33"
 GREEN  = "32"
@@ -16,9 +21,19 @@ def sprint_color(s, color):
 
 input_file = []
 addressability = []
+# None: sparse when unloaded memory reads as zero (bmem_0_on_x), dense otherwise
+sparse = None
+# Zero runs at least this long (bytes, whole words) are left out of a sparse image
+sparse_min_bytes = 256
+# ELFs, disassembly indexes and memory images come from bin/prog_cache.py when nothing they depend on changed
+use_cache = True
 
 for v in sys.argv[1:]:
-    if v.startswith('-'):
+    if v in ["--sparse", "--dense"]:
+        sparse = v == "--sparse"
+    elif v == "--no-cache":
+        use_cache = False
+    elif v.startswith('-'):
         addressability.append(int(v[1:]))
     else:
         input_file.append(os.path.abspath(v))
@@ -26,7 +41,7 @@ for v in sys.argv[1:]:
 if len(input_file) == 0 or len(addressability) == 0:
     print(sprint_color("[ERROR] ", RED) + " Missing Argument.")
     print("[INFO]  Compile a C source files or a RISC-V assembly file, or convert a RISC-V ELF file, into a memory file for simulation.")
-    print("[INFO]  Usage: python3 generate_memory_file.py [s/c/elf file] -[addressabilities]")
+    print("[INFO]  Usage: python3 generate_memory_file.py [s/c/elf file] -[addressabilities] [--sparse/--dense] [--no-cache]")
     print("[INFO]  Example: python3 generate_memory_file.py -4 test.s")
     print("[INFO]  Example: python3 generate_memory_file.py -1 -4 -8 -32 matrix.c helper.c")
     exit(1)
@@ -39,13 +54,16 @@ linker_script = os.path.join(script_dir, "link.ld")
 compile = True
 
 assembler="riscv64-unknown-elf-gcc"
-objdump="riscv64-unknown-elf-objdump"
-objcopy="riscv64-unknown-elf-objcopy"
 
 result = subprocess.run(f"python3 {script_dir}/get_options.py arch", shell=True, stdout=subprocess.PIPE)
 arch = result.stdout.decode().split('\n')[0]
 result = subprocess.run(f"python3 {script_dir}/get_options.py abi", shell=True, stdout=subprocess.PIPE)
 abi = result.stdout.decode().split('\n')[0]
+if sparse is None:
+    # The DRAM model reads words $readmemh never loaded as X, and BRAM_0_ON_X turns that X into 0.
+    # Without it a left out zero word would read X, so the image stays dense.
+    result = subprocess.run(f"python3 {script_dir}/get_options.py bmem_x", shell=True, stdout=subprocess.PIPE)
+    sparse = result.stdout.decode().split('\n')[0] == "1"
 
 opt = "-Ofast -flto"
 warn = "-Wall -Wextra -Wno-unused"
@@ -53,10 +71,9 @@ include = "" if len(input_file) == 1 else f"-I {os.path.dirname(os.path.abspath(
 assembler_args = f"-mcmodel=medany -ffreestanding -nostartfiles -static -static-libgcc -lm -lgcc -lc -Wl,--no-relax -march={arch} -mabi={abi} {opt} {warn} -T {linker_script} {include}"
 
 out_elf_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".elf")
-out_dis_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".dis")
-temp_bin_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".bin")
+out_idx_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".idx")
 
-for f in [os.path.join(work_dir, f"memory_{x}.lst") for x in addressability] + [out_elf_file, out_dis_file, temp_bin_file]:
+for f in [os.path.join(work_dir, f"memory_{x}.lst") for x in addressability] + [out_elf_file, out_idx_file]:
     if os.path.isfile(f):
         os.remove(f)
 if not os.path.isdir(work_dir):
@@ -72,52 +89,85 @@ if len(input_file) == 1:
         out_elf_file = input_file[0]
 
 if compile:
-    result = subprocess.run(f"{assembler} {assembler_args} {start_file} {' '.join(input_file)} -o {out_elf_file}", shell=True, stdout=subprocess.PIPE)
-    if result.returncode != 0 or not os.path.isfile(out_elf_file):
-        print(sprint_color("[ERROR] ", RED) + "Error compiling")
-        exit(1)
+    elf_key = use_cache and prog_cache.compile_key(input_file, [start_file, linker_script, own_path],
+                                                   f"{assembler_args} {start_file != ''}", assembler)
+    if elf_key and prog_cache.fetch("elf", elf_key, out_elf_file):
+        print(f"[INFO]  Compiled source to {out_elf_file} (cached)")
     else:
-        print(f"[INFO]  Compiled source to {out_elf_file}")
-
-result = subprocess.run(f"{objdump} -D -Mnumeric {out_elf_file} > {out_dis_file}", shell=True, stdout=subprocess.PIPE)
-if result.returncode != 0:
-    print(sprint_color("[ERROR] ", RED) + "Error disassembling")
+        result = subprocess.run(f"{assembler} {assembler_args} {start_file} {' '.join(input_file)} -o {out_elf_file}", shell=True, stdout=subprocess.PIPE)
+        if result.returncode != 0 or not os.path.isfile(out_elf_file):
+            print(sprint_color("[ERROR] ", RED) + "Error compiling")
+            exit(1)
+        else:
+            print(f"[INFO]  Compiled source to {out_elf_file}")
+        if elf_key:
+            prog_cache.store("elf", elf_key, out_elf_file)
+
+# Everything below depends only on the ELF
+elf_hash = use_cache and os.path.isfile(out_elf_file) and prog_cache.file_hash(out_elf_file)
+
+lst_keys = {}
+idx_key = None
+if elf_hash:
+    loader_hash = prog_cache.file_hash(elf_loader.__file__)
+    script_hash = prog_cache.file_hash(own_path)
+    lst_keys = {a: prog_cache.make_key(elf_hash, a, sparse, sparse_min_bytes, loader_hash, script_hash)
+                for a in addressability}
+    # The index names the ELF it was built from
+    idx_key = prog_cache.make_key(elf_hash, out_elf_file, loader_hash, prog_cache.file_hash(disasm.__file__))
+
+# No objdump -D here: disasm.py runs objdump -d over just the function asked about, using the index,
+# e.g. python3 ../bin/disasm.py bin/<prog>.idx pc 1eceb0a4, and dump writes the old .dis
+indexed = bool(idx_key) and prog_cache.fetch("idx", idx_key, out_idx_file)
+if indexed:
+    print(f"[INFO]  Indexed {os.path.basename(out_elf_file)} to {out_idx_file} (cached)")
+
+# A cached image passed the alignment check when it was written
+missing = []
+for a in addressability:
+    fname = os.path.join(work_dir, f"memory_{a}.lst")
+    if a in lst_keys and prog_cache.fetch("lst", lst_keys[a], fname):
+        print(f"[INFO]  Wrote {'sparse' if sparse else 'dense'} memory contents to {fname} (cached)")
+    else:
+        missing.append(a)
+if indexed and len(missing) == 0:
+    exit(0)
+
+try:
+    elf = elf_loader.load(out_elf_file)
+except (OSError, elf_loader.ElfError) as e:
+    print(sprint_color("[ERROR] ", RED) + f"Error reading {out_elf_file}: {e}")
     exit(1)
-else:
-    print(f"[INFO]  Disassembling {os.path.basename(out_elf_file)} to {out_dis_file}")
 
-result = subprocess.run(f"objdump -h {out_elf_file}", shell=True, stdout=subprocess.PIPE)
-if result.returncode != 0:
-    print(sprint_color("[ERROR] ", RED) + "Error objdumping")
-    exit(1)
-sections = [x.strip().split() for x in result.stdout.decode().splitlines()[5::2]]
+if not indexed:
+    disasm.save_index(disasm.build_index(elf, out_elf_file), out_idx_file)
+    print(f"[INFO]  Indexed {os.path.basename(out_elf_file)} to {out_idx_file}")
+    if idx_key:
+        prog_cache.store("idx", idx_key, out_idx_file)
 
-for a in addressability:
+sections = elf_loader.memory_sections(elf)
+
+for s in sections:
+    for a in missing:
+        if s.lma % a != 0 or s.size % a != 0 or (s.lma + s.size) % a != 0:
+            print(sprint_color("[ERROR] ", RED) + "Non aligned section not supported")
+            exit(1)
+
+for a in missing:
     fname = os.path.join(work_dir, f"memory_{a}.lst")
     with open(fname, 'w') as f:
         for s in sections:
-            section_start = int(s[4], 16)
-            section_size = int(s[2], 16)
-            section_end = section_start + section_size
-            if section_start % a != 0 or section_size % a != 0 or section_end % a != 0:
-                print(sprint_color("[ERROR] ", RED) + "Non aligned section not supported")
-                exit(1)
-            os.system(f"{objcopy} -O binary -j {s[1]} {out_elf_file} {temp_bin_file}")
-            if not os.path.isfile(temp_bin_file):
-                print(sprint_color("[ERROR] ", RED) + "Error binarizing")
-                exit(1)
-            with open(temp_bin_file, 'rb') as f2:
-                binary = f2.read()
-            if len(binary) != 0:
-                f.write(f"@{section_start >> int(math.log2(a)):08x}\n")
-                temp_string = "".zfill(2*(section_start % a))
-                for i in range(len(binary)):
-                    temp_string += f"{binary[i]:02x}"
-                    if len(temp_string) == 2*a:
-                        f.write("".join(reversed([temp_string[i:i+2] for i in range(0, len(temp_string), 2)])) + '\n')
-                        temp_string = ""
-                if len(temp_string) != 0:
-                    f.write("".join(reversed([temp_string[i:i+2] for i in range(0, len(temp_string), 2)])).zfill(2*a) + '\n')
+            if len(s.data) != 0:
+                if not sparse:
+                    # One write per section
+                    f.write(f"@{s.lma >> int(math.log2(a)):08x}\n" + elf_loader.hex_words(s.data, a, s.lma % a) + '\n')
+                    continue
+                # Zero runs are skipped with an @address jump to the next nonzero word
+                words = bytes(s.lma % a) + s.data
+                words += bytes(-len(words) % a)
+                for offset, block in elf_loader.nonzero_blocks(words, a, max(sparse_min_bytes // a, 1)):
+                    f.write(f"@{(s.lma >> int(math.log2(a))) + offset:08x}\n" + elf_loader.hex_words(block, a))
                 f.write('\n')
-            os.remove(temp_bin_file)
-    print(f"[INFO]  Wrote memory contents to {fname}")
+    print(f"[INFO]  Wrote {'sparse' if sparse else 'dense'} memory contents to {fname}")
+    if a in lst_keys:
+        prog_cache.store("lst", lst_keys[a], fname)
@@ -6,6 +6,9 @@ import os
 import string
 import subprocess
 
+import flow_trace
+flow_trace.step()
+
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 os.chdir("..")
 
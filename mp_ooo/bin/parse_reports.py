@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+import re
+import sys
+from typing import NamedTuple, Optional
+
+# Every report is read in one streaming pass of fixed-size blocks, so a multi-GB
+# simulation.log costs no more memory than a small timing.rpt.
+# Each parser stops as soon as it has every field it reports.
+
+class TimingReport(NamedTuple):
+    slack: Optional[float]      # ns, first (worst) path
+    met: Optional[bool]         # None when there is no slack line at all
+
+class AreaReport(NamedTuple):
+    area: Optional[float]
+    cells: Optional[int]
+
+class PowerReport(NamedTuple):
+    dynamic: Optional[float]    # mW
+    leakage: Optional[float]    # mW
+    total: Optional[float]      # mW, the Total column of the power group table
+
+class SimReport(NamedTuple):
+    segment_ipc: Optional[float]
+    total_ipc: Optional[float]
+    segment_time: Optional[int]
+    total_time: Optional[int]
+    power_start: Optional[int]
+    power_stop: Optional[int]
+
+    @property
+    def ipc(self):
+        return self.segment_ipc if self.segment_ipc is not None else self.total_ipc
+
+    @property
+    def delay(self):
+        # What the score uses: the power window's stop time / 1e6
+        return self.power_stop / 1000000 if self.power_stop is not None else None
+
+timing_re = re.compile(rb'slack \((?P<state>MET|VIOLATED)[^)]*\)\s+(?P<slack>-?\d+\.\d+)', re.IGNORECASE)
+area_re = re.compile(rb'Total cell area:\s+(?P<area>\d+\.\d+)|Number of cells:\s+(?P<cells>\d+)')
+power_re = re.compile(rb'Total Dynamic Power\s+=\s+(?P<dynamic>[\d.e+-]+)\s+(?P<dynamic_unit>\w?W)'
+                      rb'|Cell Leakage Power\s+=\s+(?P<leakage>[\d.e+-]+)\s+(?P<leakage_unit>\w?W)'
+                      rb'|^Total\s\s(?P<total_row>[^\n]*)', re.MULTILINE)
+power_value_re = re.compile(rb'([\d.e+-]+)\s*(\w?W)')
+sim_re = re.compile(rb'Monitor: (?:Segment IPC: +(?P<segment_ipc>[\d.]+)'
+                    rb'|Total IPC: +(?P<total_ipc>[\d.]+)'
+                    rb'|Segment Time: +(?P<segment_time>\d+)'
+                    rb'|Total Time: +(?P<total_time>\d+)'
+                    rb'|Power Start time is +(?P<power_start>\d+)'
+                    rb'|Power Stop time is +(?P<power_stop>\d+))')
+block_size = 1 << 20
+units = {b"nW": 1e-6, b"uW": 1e-3, b"mW": 1.0, b"W": 1e3}
+
+def scan(path, pattern):
+    # Yields {group: bytes} for every match, in file order.
+    # Blocks are cut after their last newline and every pattern is single-line, so no match is split.
+    with open(path, 'rb') as f:
+        tail = b''
+        while True:
+            block = f.read(block_size)
+            data = tail + block
+            tail = b''
+            if block:
+                cut = data.rfind(b'\n') + 1
+                data, tail = data[:cut], data[cut:]
+            for match in pattern.finditer(data):
+                yield {k: v for k, v in match.groupdict().items() if v is not None}
+            if not block:
+                return
+
+def first_of(path, pattern, fields):
+    # First value of each field, stopping once all of them are found
+    found = {}
+    for groups in scan(path, pattern):
+        for k, v in groups.items():
+            found.setdefault(k, v)
+        if all(k in found for k in fields):
+            break
+    return found
+
+def to_mw(value, unit):
+    return float(value) * units[unit]
+
+def parse_timing(path):
+    found = first_of(path, timing_re, ["slack"])
+    if "slack" not in found:
+        return TimingReport(None, None)
+    return TimingReport(float(found["slack"]), found["state"].upper() == b"MET")
+
+def parse_area(path):
+    found = first_of(path, area_re, ["area", "cells"])
+    return AreaReport(float(found["area"]) if "area" in found else None,
+                      int(found["cells"]) if "cells" in found else None)
+
+def parse_power(path):
+    found = first_of(path, power_re, ["dynamic", "leakage", "total_row"])
+    total = None
+    if "total_row" in found:
+        values = power_value_re.findall(found["total_row"])
+        if values:
+            total = to_mw(*values[-1])
+    return PowerReport(to_mw(found["dynamic"], found["dynamic_unit"]) if "dynamic" in found else None,
+                       to_mw(found["leakage"], found["leakage_unit"]) if "leakage" in found else None,
+                       total)
+
+def parse_sim(path):
+    fields = SimReport._fields
+    found = first_of(path, sim_re, fields)
+    return SimReport(*[(float(found[k]) if k.endswith("ipc") else int(found[k])) if k in found else None
+                       for k in fields])
+
+# metric -> (parser, report relative to the synth/ or sim/ directory, value)
+metrics = {
+    "slack"     : (parse_timing, "reports/timing.rpt",  lambda r: r.slack),
+    "met"       : (parse_timing, "reports/timing.rpt",  lambda r: r.met),
+    "area"      : (parse_area,   "reports/area.rpt",    lambda r: r.area),
+    "cells"     : (parse_area,   "reports/area.rpt",    lambda r: r.cells),
+    "power"     : (parse_power,  "reports/power2.rpt",  lambda r: r.total),
+    "ipc"       : (parse_sim,    "vcs/simulation.log",  lambda r: r.ipc),
+    "delay"     : (parse_sim,    "vcs/simulation.log",  lambda r: r.delay),
+    "time"      : (parse_sim,    "vcs/simulation.log",
+                   lambda r: r.segment_time if r.segment_time is not None else r.total_time),
+}
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in metrics:
+        print(f"Usage: parse_reports.py {{{'|'.join(metrics)}}} [report]")
+        exit(1)
+    parser, default, value = metrics[sys.argv[1]]
+    path = sys.argv[2] if len(sys.argv) > 2 else default
+    result = value(parser(path))
+    if result is None:
+        print(f"Error: no {sys.argv[1]} in {path}", file=sys.stderr)
+        exit(1)
+    print(result)
+
+if __name__ == "__main__":
+    main()
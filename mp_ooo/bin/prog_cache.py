@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+import errno
+import hashlib
+import os
+import shutil
+import sys
+
+# Content-addressed cache of what generate_memory_file.py builds: compiled ELFs keyed by everything
+# the compile reads, disassembly indexes and memory images keyed by the ELF's own bytes. A hit is a
+# hardlink into sim/bin. Entries are read-only and outputs are always removed before being relinked
+# or rewritten, so nothing ever writes through a link into the cache.
+# scripts/dse sets ECE411_PROG_CACHE so every sandbox shares one cache.
+
+cache_dir = os.environ.get("ECE411_PROG_CACHE",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), "../sim/prog_cache"))
+header_suffixes = (".h", ".hpp", ".inc")
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def tool_id(tool):
+    # Which compiler, without running it: resolved path, size and mtime
+    path = shutil.which(tool)
+    if path is None:
+        return f"{tool} missing"
+    st = os.stat(path)
+    return f"{os.path.realpath(path)} {st.st_size} {st.st_mtime_ns}"
+
+def make_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def compile_key(sources, support_files, flags, compiler):
+    # sources in order, every header next to them (the include path), startup.s, link.ld and this script
+    parts = [flags, tool_id(compiler)]
+    for src in sources:
+        parts += [os.path.basename(src), file_hash(src)]
+    for d in sorted({os.path.dirname(os.path.abspath(s)) for s in sources}):
+        for name in sorted(os.listdir(d)):
+            if name.endswith(header_suffixes):
+                parts += [name, file_hash(os.path.join(d, name))]
+    for f in support_files:
+        if f:
+            parts += [os.path.basename(f), file_hash(f)]
+    return make_key(*parts)
+
+def entry_path(kind, key):
+    return os.path.join(cache_dir, kind, key[:2], key)
+
+def link(src, dst):
+    # Hardlink, a copy when the cache is on another filesystem
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        shutil.copy2(src, dst)
+
+def fetch(kind, key, dst):
+    src = entry_path(kind, key)
+    if not os.path.isfile(src):
+        return False
+    try:
+        link(src, dst)
+    except FileNotFoundError:
+        # Removed by clear() in between
+        return False
+    return True
+
+def store(kind, key, src):
+    dst = entry_path(kind, key)
+    if os.path.isfile(dst) or not os.path.isfile(src):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.tmp{os.getpid()}"
+    shutil.copy2(src, tmp)
+    os.chmod(tmp, 0o444)
+    # Atomic, a concurrent sandbox may store the same key
+    os.replace(tmp, dst)
+    # The output becomes a link to the entry, so a second run of the same program costs no disk
+    link(dst, src)
+
+def clear():
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ["clear", "stats"]:
+        print("Usage: python3 prog_cache.py [clear | stats]")
+        exit(1)
+    if sys.argv[1] == "clear":
+        clear()
+    else:
+        for kind in ["elf", "idx", "lst"]:
+            files = [os.path.join(d, f) for d, _, fs in os.walk(os.path.join(cache_dir, kind)) for f in fs]
+            print(f"{kind}: {len(files)} entries, {sum(os.path.getsize(f) for f in files) / 2**20:.1f} MiB")
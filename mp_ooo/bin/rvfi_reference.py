@@ -5,6 +5,9 @@ import os
 import sys
 import string
 
+import flow_trace
+flow_trace.step()
+
 channels = 8
 
 rvfi_list = [
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import argparse
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+### ARTIFACT PATHS
+script_dir      = os.path.dirname(os.path.abspath(__file__))
+artifact_dir    = os.environ.get("DSE_ARTIFACT_DIR", script_dir + "/artifacts")
+# Reports older than this are dropped by gc, unless a best or Pareto run still points at them
+keep_days       = float(os.environ.get("DSE_ARTIFACT_KEEP_DAYS", 30))
+zstd_level      = 3
+gzip_level      = 6
+block_size      = 1 << 20
+
+schema = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest      TEXT PRIMARY KEY,
+    codec       TEXT NOT NULL,
+    size        INTEGER,
+    stored      INTEGER,
+    created     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created     TEXT NOT NULL,
+    session     TEXT,
+    run         TEXT,
+    stage       TEXT,
+    name        TEXT,
+    digest      TEXT NOT NULL REFERENCES objects(digest)
+);
+CREATE INDEX IF NOT EXISTS artifacts_run ON artifacts(run, stage);
+CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts(digest);
+"""
+
+def connect(path=None):
+    os.makedirs(artifact_dir, exist_ok=True)
+    conn = sqlite3.connect(path or os.path.join(artifact_dir, "index.db"), timeout=60)
+    conn.row_factory = sqlite3.Row
+    # Parallel sandboxes store concurrently
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(schema)
+    return conn
+
+def object_path(digest, codec):
+    return os.path.join(artifact_dir, "objects", digest[:2], f"{digest}.{codec}")
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def compress(src, dst):
+    # zstd when the zstandard module is installed, gzip otherwise; streamed, never all in memory
+    with open(src, 'rb') as fsrc:
+        if zstandard is not None:
+            with open(dst, 'wb') as fdst:
+                zstandard.ZstdCompressor(level=zstd_level).copy_stream(fsrc, fdst)
+            return "zst"
+        with gzip.open(dst, 'wb', compresslevel=gzip_level) as fdst:
+            shutil.copyfileobj(fsrc, fdst, block_size)
+        return "gz"
+
+def put(conn, path):
+    # Stores the file once per content, returns its digest
+    digest = file_digest(path)
+    row = conn.execute("SELECT codec FROM objects WHERE digest = ?", (digest,)).fetchone()
+    if row is not None and os.path.isfile(object_path(digest, row["codec"])):
+        return digest
+    tmp = os.path.join(artifact_dir, "objects", f"{digest}.tmp{os.getpid()}")
+    os.makedirs(os.path.dirname(tmp), exist_ok=True)
+    codec = compress(path, tmp)
+    dst = object_path(digest, codec)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # Same content, same name: a concurrent store of it is harmless
+    os.replace(tmp, dst)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO objects (digest, codec, size, stored, created) VALUES (?, ?, ?, ?, ?)",
+                     (digest, codec, os.path.getsize(path), os.path.getsize(dst),
+                      datetime.now().isoformat(timespec='seconds')))
+    return digest
+
+def store_files(run, stage, base_dir, rels, conn=None, session=None):
+    # Archives base_dir/rel for each rel that exists, returns {rel: digest} for dse_results.db
+    # A connection opened here is closed here, a sweep calls this for every stage of every run
+    owned = conn is None
+    conn = connect() if owned else conn
+    session = os.environ.get("DSE_TRACE_SESSION") if session is None else session
+    try:
+        stored = {}
+        for rel in rels:
+            src = os.path.join(base_dir, rel)
+            if os.path.isfile(src):
+                stored[rel] = put(conn, src)
+        with conn:
+            conn.executemany("INSERT INTO artifacts (created, session, run, stage, name, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(datetime.now().isoformat(timespec='seconds'), session, run, stage, rel, digest)
+                              for rel, digest in stored.items()])
+        return stored
+    finally:
+        if owned:
+            conn.close()
+
+def open_object(conn, digest):
+    # Binary file object streaming the original bytes
+    row = conn.execute("SELECT codec FROM objects WHERE digest = ?", (digest,)).fetchone()
+    if row is None:
+        raise KeyError(f"no artifact {digest}")
+    path = object_path(digest, row["codec"])
+    if row["codec"] == "gz":
+        return gzip.open(path, 'rb')
+    if zstandard is None:
+        raise RuntimeError(f"{digest} is zstd compressed, install zstandard to read it")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+
+def find(conn, run, stage=None, name=None, session=None):
+    # Artifacts of a run name, from its latest session unless one is given
+    sql = "SELECT * FROM artifacts WHERE run = ?"
+    args = [run]
+    if session is None:
+        sql += " AND session IS (SELECT session FROM artifacts WHERE run = ? ORDER BY id DESC LIMIT 1)"
+        args.append(run)
+    else:
+        sql += " AND session = ?"
+        args.append(session)
+    if stage is not None:
+        sql += " AND stage = ?"
+        args.append(stage)
+    if name is not None:
+        sql += " AND (name = ? OR name LIKE ?)"
+        args += [name, f"%/{name}"]
+    return conn.execute(sql + " ORDER BY id", args).fetchall()
+
+def export(conn, digest, dst):
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    with open_object(conn, digest) as fsrc, open(dst, 'wb') as fdst:
+        shutil.copyfileobj(fsrc, fdst, block_size)
+    return dst
+
+def pinned_digests(results):
+    # Reports of every benchmark's best run and of the Pareto front, whatever their age
+    import dse_db
+    rows = dse_db.best_per_benchmark(results) + dse_db.pareto_front(results)
+    return {digest for row in rows for files in (row.get("reports") or {}).values()
+            if isinstance(files, dict) for digest in files.values()}
+
+def gc(conn, days=keep_days, pinned=()):
+    # Forget index entries older than days, then delete objects nothing points at any more
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+    pinned = set(pinned)
+    with conn:
+        old = conn.execute("SELECT id, digest FROM artifacts WHERE created < ?", (cutoff,)).fetchall()
+        conn.executemany("DELETE FROM artifacts WHERE id = ?", [(r["id"],) for r in old if r["digest"] not in pinned])
+        orphans = conn.execute("SELECT digest, codec, stored FROM objects WHERE digest NOT IN "
+                               "(SELECT digest FROM artifacts)").fetchall()
+        orphans = [r for r in orphans if r["digest"] not in pinned]
+        conn.executemany("DELETE FROM objects WHERE digest = ?", [(r["digest"],) for r in orphans])
+    freed = 0
+    for r in orphans:
+        try:
+            os.remove(object_path(r["digest"], r["codec"]))
+            freed += r["stored"] or 0
+        except FileNotFoundError:
+            pass
+    # Left behind by a killed store
+    for dirpath, _, filenames in os.walk(os.path.join(artifact_dir, "objects")):
+        for f in filenames:
+            path = os.path.join(dirpath, f)
+            if ".tmp" in f and time.time() - os.path.getmtime(path) > 86400:
+                os.remove(path)
+    return len(orphans), freed
+
+def stats(conn):
+    row = conn.execute("SELECT COUNT(*) AS n, SUM(size) AS size, SUM(stored) AS stored FROM objects").fetchone()
+    refs = conn.execute("SELECT COUNT(*) AS n, COUNT(DISTINCT session || ' ' || run) AS runs FROM artifacts").fetchone()
+    logical = conn.execute("SELECT SUM(o.size) FROM artifacts a JOIN objects o ON a.digest = o.digest").fetchone()[0]
+    return {"runs": refs["runs"], "files": refs["n"], "objects": row["n"], "logical_mb": (logical or 0) / 2**20,
+            "unique_mb": (row["size"] or 0) / 2**20, "stored_mb": (row["stored"] or 0) / 2**20}
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicated, compressed store of DSE run reports")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ls", help="reports of a run (its latest session unless --session)")
+    p.add_argument("run")
+    p.add_argument("--session", default=None)
+    p = sub.add_parser("cat", help="stream one report to stdout, e.g. cat 3 synth timing.rpt")
+    p.add_argument("run")
+    p.add_argument("stage")
+    p.add_argument("name")
+    p.add_argument("--session", default=None)
+    p = sub.add_parser("export", help="decompress every report of a run into a directory")
+    p.add_argument("run")
+    p.add_argument("-o", "--output", default=None)
+    p.add_argument("--session", default=None)
+    p = sub.add_parser("gc", help="drop reports older than --days, except those of best and Pareto runs")
+    p.add_argument("--days", type=float, default=keep_days)
+    p.add_argument("--db", default=None, help="dse_results.db whose best runs are kept")
+    sub.add_parser("stats", help="logical vs stored size")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.cmd == "ls":
+        for r in find(conn, args.run, session=args.session):
+            print(f'{r["created"]}  {r["session"]}  {r["stage"]:<6} {r["name"]:<24} {r["digest"][:16]}')
+    elif args.cmd == "cat":
+        rows = find(conn, args.run, args.stage, args.name, args.session)
+        if not rows:
+            print(f"Error: no {args.stage} {args.name} for run {args.run}", file=sys.stderr)
+            exit(1)
+        with open_object(conn, rows[-1]["digest"]) as f:
+            shutil.copyfileobj(f, sys.stdout.buffer, block_size)
+    elif args.cmd == "export":
+        out = args.output or f"reports_{args.run}"
+        for r in find(conn, args.run, session=args.session):
+            print(export(conn, r["digest"], os.path.join(out, r["stage"], r["name"])))
+    elif args.cmd == "gc":
+        import dse_db
+        count, freed = gc(conn, args.days, pinned_digests(dse_db.connect(args.db)))
+        print(f"removed {count} objects, {freed / 2**20:.1f} MiB")
+    else:
+        for k, v in stats(conn).items():
+            print(f"{k}: {v:.1f}" if isinstance(v, float) else f"{k}: {v}")
+
+if __name__ == "__main__":
+    main()
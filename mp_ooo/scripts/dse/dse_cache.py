@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+### CACHE PATHS
+script_dir  = os.path.dirname(os.path.abspath(__file__))
+cache_dir   = os.environ.get("DSE_CACHE_DIR", script_dir + "/cache")
+# Files each stage leaves behind, relative to its make directory
+stage_files = {
+    "synth" : ["reports/synthesis.log", "reports/timing.rpt", "reports/area.rpt", "outputs/synth.ddc"],
+    "sim"   : ["vcs/simulation.log", "vcs/time.txt"],
+    "power" : ["reports/power.rpt", "reports/power2.rpt"],
+}
+# Compiled simulators, relative to sim/; the binary must come first
+simulator_files = {
+    "vcs"       : ["vcs/top_tb", "vcs/top_tb.daidir", "vcs/compile.log"],
+    "verilator" : ["verilator/build/Vtop_tb"],
+}
+# The build flags live in the sim Makefile and the configs it passes to the tools
+simulator_build = ["sim/Makefile", "sim/vcs_warn.config", "sim/xprop.config", "sim/verilator_warn.vlt"]
+simulator_budget = int(os.environ.get("DSE_SIMULATOR_BUDGET", 20 * 2**30))
+# options.json fields each stage depends on
+synth_options = ["clock", "dw_ip", "synth"]
+sim_options   = ["clock", "dw_ip", "bmem_0_on_x", "verilator", "c_ext", "f_ext"]
+# Written by the sim Makefile from files that are hashed, hashing them too would depend on build order
+generated_files = ["rvfi_reference.svh"]
+FICLONE     = 0x40049409
+
+def reflink_copy(src, dst, follow_symlinks=True):
+    # Copy-on-write clone where the filesystem supports it (btrfs, xfs), plain copy otherwise
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except OSError as e:
+        if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS):
+            raise
+        shutil.copy2(src, dst)
+    return dst
+
+def copy_path(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.isdir(src):
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.copytree(src, dst, symlinks=True, copy_function=reflink_copy)
+    else:
+        reflink_copy(src, dst)
+
+def path_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def hash_tree(h, root, subdirs, suffixes):
+    for subdir in subdirs:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, subdir)):
+            dirnames.sort()
+            for fname in sorted(filenames):
+                if not fname.endswith(suffixes) or fname in generated_files:
+                    continue
+                path = os.path.join(dirpath, fname)
+                h.update(os.path.relpath(path, root).encode())
+                hash_file(h, path)
+
+def hash_file(h, path):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+
+def hash_options(h, root, keys):
+    with open(os.path.join(root, "options.json")) as f:
+        options = json.load(f)
+    h.update(json.dumps({k: options.get(k) for k in keys}, sort_keys=True).encode())
+
+def design_hash(root):
+    # RTL, SRAM macros and the (already rewritten) types.sv
+    h = hashlib.sha256()
+    hash_tree(h, root, ["hdl", "sram/output"], (".sv", ".v", ".db"))
+    hash_file(h, os.path.join(root, "pkg/types.sv"))
+    return h.hexdigest()
+
+def synth_key(root, warm=False):
+    # A warm-started netlist differs from a from-scratch one, they are cached apart
+    h = hashlib.sha256(b"synth-warm" if warm else b"synth")
+    h.update(design_hash(root).encode())
+    hash_tree(h, root, ["synth"], (".tcl", ".sdc"))
+    hash_options(h, root, synth_options)
+    return h.hexdigest()
+
+def warm_key(root):
+    # synth_key without the clock: every clock point of one design can seed the others
+    h = hashlib.sha256(b"warm")
+    h.update(design_hash(root).encode())
+    hash_tree(h, root, ["synth"], (".tcl", ".sdc"))
+    hash_options(h, root, [k for k in synth_options if k != "clock"])
+    return h.hexdigest()
+
+def sim_key(root, prog, timeout=None):
+    h = hashlib.sha256(b"sim")
+    h.update(design_hash(root).encode())
+    hash_tree(h, root, ["hvl"], (".sv", ".v", ".svh", ".cpp", ".json"))
+    hash_options(h, root, sim_options)
+    hash_file(h, os.path.join(root, "sim", prog))
+    # A sim cut short is a different result, the full one keeps its old key
+    if timeout is not None:
+        h.update(f"timeout {timeout}".encode())
+    return h.hexdigest()
+
+def simulator_key(root, simulator="vcs"):
+    # What the compiled testbench depends on: RTL, params, testbench and build flags, not the program
+    h = hashlib.sha256(b"simulator")
+    h.update(simulator.encode())
+    h.update(design_hash(root).encode())
+    hash_tree(h, root, ["hvl"], (".sv", ".v", ".svh", ".cpp", ".json"))
+    for rel in simulator_build:
+        if os.path.isfile(os.path.join(root, rel)):
+            h.update(rel.encode())
+            hash_file(h, os.path.join(root, rel))
+    hash_options(h, root, ["dw_ip"])
+    return h.hexdigest()
+
+def power_key(root, prog, warm=False):
+    # Power reads the netlist, so a warm-started one gets its own entry like in synth_key
+    h = hashlib.sha256(b"power")
+    h.update(synth_key(root, warm).encode())
+    h.update(sim_key(root, prog).encode())
+    hash_tree(h, root, ["synth"], ("power.tcl",))
+    return h.hexdigest()
+
+def entry_dir(stage, key):
+    return os.path.join(cache_dir, stage, key[:2], key)
+
+def contains(stage, key):
+    return os.path.isfile(os.path.join(entry_dir(stage, key), "result.json"))
+
+def lookup(stage, key):
+    path = os.path.join(entry_dir(stage, key), "result.json")
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def restore(stage, key, stage_dir):
+    # Put the archived reports back where make would have written them
+    entry = entry_dir(stage, key)
+    data = lookup(stage, key)
+    if data is None:
+        return None
+    for rel in data["files"]:
+        dst = os.path.join(stage_dir, rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(os.path.join(entry, "files", rel), dst)
+    return data["result"]
+
+def store(stage, key, stage_dir, result):
+    entry = entry_dir(stage, key)
+    if os.path.isfile(os.path.join(entry, "result.json")):
+        return
+    tmp = f"{entry}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    files = []
+    for rel in stage_files[stage]:
+        src = os.path.join(stage_dir, rel)
+        if os.path.isfile(src):
+            os.makedirs(os.path.dirname(os.path.join(tmp, "files", rel)), exist_ok=True)
+            shutil.copy2(src, os.path.join(tmp, "files", rel))
+            files.append(rel)
+    os.makedirs(tmp, exist_ok=True)
+    with open(os.path.join(tmp, "result.json"), 'w') as f:
+        json.dump({"stage": stage, "key": key, "result": result, "files": files}, f, indent=4)
+    # Publish atomically, a concurrent sandbox may have stored the same key
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def restore_simulator(key, sim_dir, simulator="vcs"):
+    # Copy a compiled testbench into sim_dir; False on a miss, make then builds it
+    entry = entry_dir("simulator", key)
+    meta = os.path.join(entry, "result.json")
+    try:
+        # mtime is the LRU clock
+        os.utime(meta)
+        for rel in simulator_files[simulator]:
+            src = os.path.join(entry, "files", rel)
+            if os.path.exists(src):
+                copy_path(src, os.path.join(sim_dir, rel))
+    except (FileNotFoundError, shutil.Error):
+        # Missing, or evicted while we copied
+        return False
+    # Newer than the just rewritten sources, or make would rebuild it anyway
+    now = time.time()
+    for rel in simulator_files[simulator]:
+        if os.path.exists(os.path.join(sim_dir, rel)):
+            os.utime(os.path.join(sim_dir, rel), (now, now))
+    return True
+
+def store_simulator(key, sim_dir, simulator="vcs", budget=None):
+    entry = entry_dir("simulator", key)
+    binary = os.path.join(sim_dir, simulator_files[simulator][0])
+    if os.path.isfile(os.path.join(entry, "result.json")) or not os.path.isfile(binary):
+        return
+    tmp = f"{entry}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    files = []
+    for rel in simulator_files[simulator]:
+        src = os.path.join(sim_dir, rel)
+        if os.path.exists(src):
+            copy_path(src, os.path.join(tmp, "files", rel))
+            files.append(rel)
+    with open(os.path.join(tmp, "result.json"), 'w') as f:
+        json.dump({"stage": "simulator", "key": key, "simulator": simulator, "files": files,
+                   "size": path_size(os.path.join(tmp, "files"))}, f, indent=4)
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict_simulators(simulator_budget if budget is None else budget)
+
+def evict_simulators(budget):
+    # Least recently used first until the binaries fit in the budget (bytes)
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(os.path.join(cache_dir, "simulator")):
+        if "result.json" in filenames:
+            meta = os.path.join(dirpath, "result.json")
+            try:
+                with open(meta) as f:
+                    size = json.load(f)["size"]
+                entries.append((os.path.getmtime(meta), size, dirpath))
+            except (OSError, ValueError, KeyError):
+                continue
+            dirnames[:] = []
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        # Rename first so a concurrent restore sees a clean miss, not half a binary
+        trash = f"{path}.evict{os.getpid()}"
+        try:
+            os.rename(path, trash)
+        except OSError:
+            continue
+        shutil.rmtree(trash, ignore_errors=True)
+        total -= size
+
+def warm_seeds(key):
+    # Mapped designs kept for warm starts: [(meta, path of synth.ddc)], one per clock
+    seeds = []
+    root = entry_dir("warm", key)
+    for clock in os.listdir(root) if os.path.isdir(root) else []:
+        try:
+            with open(os.path.join(root, clock, "result.json")) as f:
+                seeds.append((json.load(f), os.path.join(root, clock, "synth.ddc")))
+        except (OSError, ValueError):
+            continue
+    return seeds
+
+def nearest_seed(key, clock, max_depth):
+    # Closest clock first, the looser one on a tie: relaxing a netlist is easier than tightening it.
+    # Seeds already warm-started max_depth times in a row are not used, their QoR only drifts further.
+    seeds = [s for s in warm_seeds(key) if s[0]["depth"] < max_depth]
+    if not seeds:
+        return None
+    return min(seeds, key=lambda s: (abs(s[0]["clock"] - clock), s[0]["clock"] < clock))
+
+def store_seed(key, synth_dir, meta):
+    # meta: clock, depth (0 = full compile), area, slack. A from-scratch seed replaces a warm one.
+    entry = os.path.join(entry_dir("warm", key), str(meta["clock"]))
+    old = os.path.join(entry, "result.json")
+    if os.path.isfile(old):
+        with open(old) as f:
+            if json.load(f)["depth"] <= meta["depth"]:
+                return
+    tmp = f"{entry}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    reflink_copy(os.path.join(synth_dir, "outputs/synth.ddc"), os.path.join(tmp, "synth.ddc"))
+    with open(os.path.join(tmp, "result.json"), 'w') as f:
+        json.dump(meta, f, indent=4)
+    # Move the old seed aside first, a concurrent warm start then sees no seed rather than half of one
+    trash = f"{entry}.old{os.getpid()}"
+    try:
+        os.rename(entry, trash)
+    except OSError:
+        pass
+    try:
+        os.rename(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    shutil.rmtree(trash, ignore_errors=True)
+
+def clear(stage=None):
+    shutil.rmtree(os.path.join(cache_dir, stage) if stage else cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ["clear", "stats"]:
+        print("Usage: python3 dse_cache.py [clear [stage] | stats]")
+        exit(1)
+    if sys.argv[1] == "clear":
+        clear(sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        for stage in list(stage_files) + ["simulator", "warm"]:
+            count = 0
+            size = 0
+            for dirpath, dirnames, filenames in os.walk(os.path.join(cache_dir, stage)):
+                count += filenames.count("result.json")
+                size += sum(os.path.getsize(os.path.join(dirpath, x)) for x in filenames)
+            print(f"{stage}: {count} entries, {size / 2**20:.1f} MiB")
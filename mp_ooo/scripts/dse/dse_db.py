@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+import dse_params
+
+### DB PATHS
+script_dir  = os.path.dirname(os.path.abspath(__file__))
+db_path     = os.environ.get("DSE_DB", script_dir + "/dse_results.db")
+
+schema = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created     TEXT NOT NULL,
+    name        TEXT,
+    sweep       TEXT,
+    prog        TEXT,
+    benchmark   TEXT,
+    clock       REAL,
+    ungroup     INTEGER,
+    gate_clock  INTEGER,
+    params      TEXT,
+    overrides   TEXT,
+    area        REAL,
+    slack       REAL,
+    timingmet   INTEGER,
+    delay       REAL,
+    ipc         REAL,
+    power       REAL,
+    score       REAL,
+    synth_time  REAL,
+    sim_time    REAL,
+    power_time  REAL,
+    reports     TEXT,
+    pruned      TEXT,
+    fidelity    TEXT
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id      INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    key         TEXT NOT NULL,
+    value       INTEGER,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS runs_benchmark_score ON runs(benchmark, score);
+CREATE INDEX IF NOT EXISTS runs_clock ON runs(clock);
+CREATE INDEX IF NOT EXISTS params_key_value ON params(key, value);
+"""
+
+def connect(path=None):
+    conn = sqlite3.connect(path or db_path, timeout=60)
+    conn.row_factory = sqlite3.Row
+    # Parallel sandboxes record concurrently
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(schema)
+    # Databases written before a column existed
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+    if "pruned" not in columns:
+        conn.execute("ALTER TABLE runs ADD COLUMN pruned TEXT")
+    # NULL is a full run; dse_halving.py records its cheaper rungs under their name
+    if "fidelity" not in columns:
+        conn.execute("ALTER TABLE runs ADD COLUMN fidelity TEXT")
+    return conn
+
+def benchmark_name(prog):
+    return os.path.splitext(os.path.basename(prog))[0] if prog else None
+
+def literal_params(types_text):
+    # Plain integer localparams only; derived ones follow from these
+    types_text = re.sub(r'//.*', '', types_text)
+    return {m.group(1): int(m.group(2)) for m in
+            re.finditer(r'localparam\s+[^=;]*?\b(\w+)\s*=\s*(\d+)\s*;', types_text)}
+
+def effective_params(run, types_text):
+    # Derived values too (NUM_PHYSICAL_REGISTERS, ...), so they can be queried
+    try:
+        return dse_params.evaluate(dse_params.load_model(types_text), run["params"] or {})
+    except dse_params.ParamError:
+        params = literal_params(types_text)
+        params.update(run["params"] or {})
+        return params
+
+def record_run(conn, run, run_data, name=None, sweep=None, params=None):
+    if params is None:
+        params = dict(run["params"] or {})
+    times = run_data.get("times", {})
+    timingmet = run_data.get("timingmet")
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO runs (created, name, sweep, prog, benchmark, clock, ungroup, gate_clock, params, overrides, "
+            "area, slack, timingmet, delay, ipc, power, score, synth_time, sim_time, power_time, reports, pruned, "
+            "fidelity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (datetime.now().isoformat(timespec='seconds'), name, sweep, run.get("prog"),
+             benchmark_name(run.get("prog")), run["clock"], int(bool(run.get("ungroup"))),
+             int(bool(run.get("gate_clock"))), json.dumps(params, sort_keys=True),
+             json.dumps(run["params"] or {}, sort_keys=True),
+             run_data.get("area"), run_data.get("slack"),
+             int(timingmet) if isinstance(timingmet, bool) else None,
+             run_data.get("delay"), run_data.get("ipc"), run_data.get("power"), run_data.get("score"),
+             times.get("synth"), times.get("sim"), times.get("power"),
+             json.dumps(run_data.get("reports", {})), run_data.get("pruned"), run_data.get("fidelity")))
+        run_id = cur.lastrowid
+        conn.executemany("INSERT INTO params (run_id, key, value) VALUES (?, ?, ?)",
+                         [(run_id, k, v) for k, v in params.items()])
+    return run_id
+
+def to_dict(row):
+    d = dict(row)
+    d["params"] = json.loads(d["params"]) if d["params"] else {}
+    d["overrides"] = json.loads(d["overrides"]) if d["overrides"] else {}
+    d["reports"] = json.loads(d["reports"]) if d["reports"] else {}
+    return d
+
+def get_run(conn, run_id):
+    row = conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+    return to_dict(row) if row else None
+
+def best_per_benchmark(conn):
+    rows = conn.execute(
+        "SELECT r.* FROM runs r JOIN "
+        "(SELECT benchmark, MIN(score) AS best FROM runs WHERE score IS NOT NULL GROUP BY benchmark) b "
+        "ON r.benchmark = b.benchmark AND r.score = b.best ORDER BY r.benchmark, r.id")
+    best = {}
+    for row in rows:
+        best.setdefault(row["benchmark"], to_dict(row))
+    return list(best.values())
+
+def runs_where(conn, benchmark=None, **params):
+    # runs_where(conn, NUM_ROB_ENTRIES=20) -> every run whose effective ROB size was 20
+    sql = "SELECT r.* FROM runs r"
+    args = []
+    for i, (key, value) in enumerate(params.items()):
+        sql += f" JOIN params p{i} ON p{i}.run_id = r.id AND p{i}.key = ? AND p{i}.value = ?"
+        args += [key, value]
+    if benchmark is not None:
+        sql += " WHERE r.benchmark = ?"
+        args.append(benchmark)
+    sql += " ORDER BY r.id"
+    return [to_dict(row) for row in conn.execute(sql, args)]
+
+def pareto_front(conn, benchmark=None, objectives=("power", "delay", "area")):
+    # Non-dominated completed runs, every objective minimized
+    sql = "SELECT * FROM runs WHERE score IS NOT NULL"
+    args = []
+    if benchmark is not None:
+        sql += " AND benchmark = ?"
+        args.append(benchmark)
+    rows = [to_dict(row) for row in conn.execute(sql, args)]
+    rows.sort(key=lambda r: tuple(r[o] for o in objectives))
+    front = []
+    for r in rows:
+        point = tuple(r[o] for o in objectives)
+        dominated = False
+        for f in front:
+            other = tuple(f[o] for o in objectives)
+            # Strictly better somewhere; runs with equal objectives are all on the front
+            if all(a <= b for a, b in zip(other, point)) and other != point:
+                dominated = True
+                break
+        if not dominated:
+            front.append(r)
+    return front
+
+def print_runs(rows):
+    cols = ["id", "benchmark", "clock", "area", "slack", "ipc", "delay", "power", "score"]
+    print(" ".join(f"{c:>12}" for c in cols) + "  overrides")
+    for r in rows:
+        vals = []
+        for c in cols:
+            v = r[c]
+            vals.append(f"{v:>12.6g}" if isinstance(v, float) else f"{str(v):>12}")
+        print(" ".join(vals) + "  " + json.dumps(r["overrides"], sort_keys=True))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the DSE results database")
+    parser.add_argument("--db", default=None, help=f"database path (default: {db_path})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("best", help="best score per benchmark")
+    sub.add_parser("pruned", help="runs whose sim and power were skipped, with the reason")
+    p = sub.add_parser("pareto", help="power/delay/area Pareto front")
+    p.add_argument("-b", "--benchmark", default=None)
+    p = sub.add_parser("where", help="runs matching KEY=VALUE params, e.g. NUM_ROB_ENTRIES=20")
+    p.add_argument("conds", nargs="+")
+    p.add_argument("-b", "--benchmark", default=None)
+    p = sub.add_parser("show", help="dump one run as json")
+    p.add_argument("id", type=int)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.cmd == "best":
+        print_runs(best_per_benchmark(conn))
+    elif args.cmd == "pruned":
+        for row in conn.execute("SELECT id, benchmark, clock, area, overrides, pruned FROM runs WHERE pruned IS NOT NULL ORDER BY id"):
+            print(f'{row["id"]:>6} {row["benchmark"]} clock {row["clock"]} {row["overrides"]}: {row["pruned"]}')
+    elif args.cmd == "pareto":
+        print_runs(pareto_front(conn, args.benchmark))
+    elif args.cmd == "where":
+        conds = {}
+        for c in args.conds:
+            key, _, value = c.partition("=")
+            conds[key] = int(value)
+        print_runs(runs_where(conn, args.benchmark, **conds))
+    else:
+        print(json.dumps(get_run(conn, args.id), indent=4))
+
+if __name__ == "__main__":
+    main()
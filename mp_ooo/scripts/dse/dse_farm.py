@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+import argparse
+import hmac
+import json
+import os
+import shutil
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from multiprocessing import Process
+
+import dse_artifacts
+import dse_cache
+import dse_db
+import dse_func
+import dse_queue
+
+### FARM PATHS
+script_dir      = os.path.dirname(os.path.abspath(__file__))
+default_address = "unix:" + script_dir + "/dse_farm.sock"
+farm_dir        = script_dir + "/farm"
+### FARM VARS
+# Shared secret for TCP farms, every worker must present the coordinator's; serve refuses TCP without one
+token           = os.environ.get("DSE_FARM_TOKEN", "")
+idle_retry      = 10        # s a worker waits when every job is claimed but not finished
+chunk_size      = 1 << 20
+
+# Protocol: one JSON object per line. A message with "size" is followed by exactly that many
+# raw bytes (a report file), streamed so multi-GB logs never sit in memory.
+# Reports travel as the worker's dse_artifacts objects and are stored again on the coordinator,
+# so run_data["reports"] stays {stage: {name: digest}} on both ends.
+def send(f, msg, path=None):
+    if path is not None:
+        msg = dict(msg, size=os.path.getsize(path))
+    f.write(json.dumps(msg).encode() + b"\n")
+    if path is not None:
+        with open(path, 'rb') as src:
+            shutil.copyfileobj(src, f, chunk_size)
+    f.flush()
+
+def recv(f):
+    # Header only; a file's bytes are then read with recv_payload
+    line = f.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+def recv_payload(f, msg, dst):
+    remaining = msg["size"]
+    with open(dst, 'wb') as out:
+        while remaining:
+            block = f.read(min(chunk_size, remaining))
+            if not block:
+                raise ConnectionError("connection closed in the middle of a file")
+            out.write(block)
+            remaining -= len(block)
+
+def parse_address(address):
+    # unix:/path/to.sock or host:port, :port is this host only (0.0.0.0:port for every interface)
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+### COORDINATOR
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        farm = self.server.farm
+        queue = dse_queue.connect(farm["queue_path"])
+        db = dse_db.connect()
+        artifacts = dse_artifacts.connect()
+        hello = recv(self.rfile)
+        if hello is None or hello.get("type") != "hello":
+            return
+        if not hmac.compare_digest(str(hello.get("token", "")).encode(), token.encode()):
+            send(self.wfile, {"type": "stop", "reason": "bad token"})
+            return
+        if hello.get("design") != farm["design"]:
+            # Same params text would still give different hardware
+            send(self.wfile, {"type": "stop", "reason": "worker hdl/types.sv differ from the coordinator's"})
+            return
+        worker = hello["worker"]
+        print(f"[FARM] {worker} connected")
+        job = None
+        reports = {}
+        try:
+            while True:
+                msg = recv(self.rfile)
+                if msg is None:
+                    break
+                if msg["type"] == "request":
+                    dse_queue.requeue_stale(queue)
+                    job = dse_queue.claim(queue, worker)
+                    if job is not None:
+                        reports = {}
+                        send(self.wfile, {"type": "job", "job": job, "copy": farm["copy"]})
+                    elif dse_queue.counts(queue).get("running", 0) or farm["wait"]:
+                        send(self.wfile, {"type": "idle", "retry": idle_retry})
+                    else:
+                        send(self.wfile, {"type": "stop", "reason": "queue is empty"})
+                        farm["done"].set()
+                        break
+                elif job is None or msg.get("job") != job["id"]:
+                    # Everything else is about the job this worker holds; a stale or confused worker is cut off
+                    print(f"[FARM] {worker} sent {msg['type']} for job {msg.get('job')}, "
+                          f"holding {job and job['id']}")
+                    send(self.wfile, {"type": "stop", "reason": f"{msg['type']} for a job this worker does not hold"})
+                    return
+                elif msg["type"] == "heartbeat":
+                    dse_queue.heartbeat(queue, msg["job"])
+                elif msg["type"] == "file":
+                    stored = receive_report(self.rfile, msg, job_name(job), artifacts)
+                    reports.setdefault(msg["stage"], {}).update(stored)
+                elif msg["type"] == "result":
+                    # Only what arrived and matched its digest, whatever the worker listed
+                    run_data = dict(msg["run_data"], reports=reports)
+                    with farm["lock"]:
+                        dse_queue.record(db, job, run_data, farm["copy"], farm["out_file"])
+                    dse_queue.complete(queue, job["id"], run_data)
+                    print(f"[FARM] {worker} finished job {job['id']}")
+                    shutil.rmtree(os.path.join(farm_dir, job_name(job)), ignore_errors=True)
+                    job = None
+                elif msg["type"] == "error":
+                    dse_queue.fail(queue, job["id"], msg["error"])
+                    print(f"[FARM] {worker} failed job {job['id']}: {msg['error']}")
+                    shutil.rmtree(os.path.join(farm_dir, job_name(job)), ignore_errors=True)
+                    job = None
+        except (ConnectionError, OSError) as e:
+            print(f"[FARM] {worker} dropped: {e!r}")
+        finally:
+            if job is not None:
+                # The worker died with the job, hand it to the next one right away
+                dse_queue.release(queue, job["id"])
+            queue.close()
+            db.close()
+            artifacts.close()
+
+def job_name(job):
+    return job["name"] or f"q{job['id']}"
+
+def receive_report(rfile, msg, name, artifacts):
+    # Spooled under farm/<run name>/<stage>/ (the bytes must be read off the socket either way),
+    # stored in this host's dse_artifacts, then dropped. Returns {name: digest}.
+    rel = os.path.normpath(msg["name"])
+    if os.path.isabs(rel) or rel.split(os.sep)[0] == "..":
+        raise ConnectionError(f"report name {msg['name']!r} leaves the run's directory")
+    base = os.path.join(farm_dir, name, msg["stage"])
+    dst = os.path.join(base, rel)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        recv_payload(rfile, msg, dst)
+        if dse_artifacts.file_digest(dst) != msg["digest"]:
+            print(f"[FARM] {name} {msg['stage']} {rel} does not match its digest, dropped")
+            return {}
+        return dse_artifacts.store_files(name, msg["stage"], base, [rel], artifacts)
+    finally:
+        if os.path.exists(dst):
+            os.remove(dst)
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve(address, out_file, queue_path=None, wait=False):
+    # Hands queued jobs to whichever workers connect; returns once the queue is drained (unless wait)
+    family, addr = parse_address(address)
+    if family != socket.AF_UNIX and not token:
+        # Anyone who can reach the port would get jobs, and with them the design
+        raise SystemExit("refusing to serve TCP without a shared secret, set DSE_FARM_TOKEN on the coordinator and workers")
+    copy = dse_func.make_copy_options_and_params()
+    farm = {
+        "queue_path": queue_path,
+        "copy": copy,
+        "design": dse_cache.design_hash(dse_func.root_dir),
+        "out_file": os.path.abspath(out_file),
+        "wait": wait,
+        "lock": threading.Lock(),
+        "done": threading.Event(),
+    }
+    if family == socket.AF_UNIX:
+        if os.path.exists(addr):
+            os.unlink(addr)
+        server = UnixServer(addr, Handler)
+    else:
+        server = TCPServer(addr, Handler)
+    server.farm = farm
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"[FARM] serving {address}")
+    try:
+        queue = dse_queue.connect(queue_path)
+        while True:
+            farm["done"].wait(idle_retry)
+            counts = dse_queue.counts(queue)
+            if not wait and not counts.get("queued") and not counts.get("running"):
+                break
+            farm["done"].clear()
+    finally:
+        server.shutdown()
+        server.server_close()
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+
+### WORKER
+def connect(address):
+    family, addr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.connect(addr)
+    return sock
+
+def worker(address, cache=False, pipelined=False):
+    # One job at a time in its own sandbox; start several for more throughput
+    sock = connect(address)
+    rfile = sock.makefile('rb')
+    wfile = sock.makefile('wb')
+    lock = threading.Lock()
+    def post(msg, path=None):
+        with lock:
+            send(wfile, msg, path)
+    post({"type": "hello", "worker": dse_queue.worker_id(), "token": token,
+          "design": dse_cache.design_hash(dse_func.root_dir)})
+    try:
+        while True:
+            post({"type": "request"})
+            msg = recv(rfile)
+            if msg is None or msg["type"] == "stop":
+                if msg is not None:
+                    print(f"[FARM] stopping: {msg['reason']}")
+                return
+            if msg["type"] == "idle":
+                time.sleep(msg["retry"])
+                continue
+            job, copy = msg["job"], msg["copy"]
+            stop = threading.Event()
+            def beat():
+                while not stop.wait(dse_queue.heartbeat_every):
+                    post({"type": "heartbeat", "job": job["id"]})
+            threading.Thread(target=beat, daemon=True).start()
+            try:
+                run_data = dse_queue.sandbox_job(job, copy, cache, pipelined)
+            except Exception as e:
+                post({"type": "error", "job": job["id"], "error": repr(e)})
+                continue
+            finally:
+                stop.set()
+            send_reports(post, job, run_data)
+            post({"type": "result", "job": job["id"], "run_data": run_data})
+    finally:
+        sock.close()
+
+def send_reports(post, job, run_data):
+    # The sandbox is gone, the reports are in this host's dse_artifacts (see dse_func.report_files)
+    artifacts = dse_artifacts.connect()
+    # Per thread as well, workers may share a process
+    tmp = os.path.join(farm_dir, f"outgoing.{os.getpid()}.{threading.get_ident()}")
+    try:
+        for stage, files in run_data.get("reports", {}).items():
+            for rel, digest in files.items():
+                try:
+                    dse_artifacts.export(artifacts, digest, tmp)
+                except (KeyError, RuntimeError) as e:
+                    print(f"[FARM] not sending {stage} {rel}: {e}")
+                    continue
+                post({"type": "file", "job": job["id"], "stage": stage, "name": rel, "digest": digest}, tmp)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        artifacts.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="DSE farm: a coordinator hands dse_queue jobs to workers over a socket")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="coordinator, serves the job queue")
+    p.add_argument("--listen", default=default_address, help=f"unix:/path or host:port, TCP needs DSE_FARM_TOKEN (default: {default_address})")
+    p.add_argument("--queue", default=None, help="queue database (default: dse_queue.py's)")
+    p.add_argument("--wait", action="store_true", help="keep serving after the queue is empty")
+    p = sub.add_parser("worker", help="pull jobs from a coordinator")
+    p.add_argument("--connect", default=default_address, help=f"unix:/path or host:port (default: {default_address})")
+    p.add_argument("-n", "--workers", type=int, default=1, help="worker processes on this machine")
+    p.add_argument("--cache", action="store_true", help="reuse synth/sim/power results from the stage cache")
+    p.add_argument("--pipelined", action="store_true", help="overlap each run's sim with its synth")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        dse_func.cdscriptdir()
+        outfilename = "farm_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
+        with open(outfilename, "w") as f:
+            f.write(f'Farm Report:')
+        serve(args.listen, outfilename, args.queue, args.wait)
+    else:
+        procs = [Process(target=worker, args=(args.connect, args.cache, args.pipelined)) for _ in range(args.workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,29 @@
 
 import json
 import os
-import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import dse_artifacts
+import dse_cache
+import dse_params
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../bin"))
+import flow_trace
+import parse_reports
+
 ### BASIC PATHS
 script_dir  = os.path.dirname(os.path.abspath(__file__))
-synth_dir   = script_dir + "/../../synth"
-sim_dir     = script_dir + "/../../sim"
-options_dir = script_dir + "/../.."
-params_dir  = script_dir + "/../../pkg"
+root_dir    = os.path.abspath(script_dir + "/../..")
+synth_dir   = root_dir + "/synth"
+sim_dir     = root_dir + "/sim"
+options_dir = root_dir
+params_dir  = root_dir + "/pkg"
 arearpt   = "reports/area.rpt"
 synthlog  = "reports/synthesis.log"
 simlog    = "vcs/simulation.log"
@@ -18,6 +32,31 @@ powerrpt  = "reports/power2.rpt"
 ### DSE VARS
 scale       = 10**-12
 runs        = []
+### WARM START VARS
+# An incremental compile from a nearby clock's netlist is redone from scratch when its QoR drifts:
+warm_retry_slack    = 0.05      # ns, missed timing by less than this (a full compile may still close it)
+warm_area_drift     = 0.05      # more area than the seed needed at a tighter or equal clock
+warm_max_depth      = 3         # warm starts in a row before a seed is no longer used
+# Every stage, make target and Makefile script lands here, see dse_profile.py.
+# Set through the environment so pool workers and the scripts make runs find it too.
+os.environ.setdefault("DSE_TRACE", script_dir + "/dse_trace.jsonl")
+# Run names repeat between invocations ("0", "1", ...), the session tells them apart
+os.environ.setdefault("DSE_TRACE_SESSION", os.path.basename(sys.argv[0]) + " " + datetime.now().strftime('%Y-%m-%d_%H-%M-%S'))
+# Sandboxes compile the same programs, bin/prog_cache.py lets them share one ELF and memory image
+os.environ.setdefault("ECE411_PROG_CACHE", os.path.join(dse_cache.cache_dir, "prog"))
+
+class StageError(Exception):
+    # A make step failed or left no report, nothing of it is cached
+    pass
+
+def set_root(root):
+    # Point every stage at another copy of the mp_ooo tree (e.g. a sandbox)
+    global root_dir, synth_dir, sim_dir, options_dir, params_dir
+    root_dir    = os.path.abspath(root)
+    synth_dir   = root_dir + "/synth"
+    sim_dir     = root_dir + "/sim"
+    options_dir = root_dir
+    params_dir  = root_dir + "/pkg"
 
 def load_runs():
     global runs
@@ -49,48 +88,52 @@ def cdparamsdir():
     print(f"cd {params_dir}")
 
 def check_meets_timing():
-    cdsynthdir()
+    timingrpt = os.path.join(synth_dir, 'reports/timing.rpt')
     # Check for synthesis errors
-    if not os.path.isfile('reports/timing.rpt'):
+    if not os.path.isfile(timingrpt):
         print("Timing report not existent")
     else:
-        if re.search(r'slack \(MET\)', open('reports/timing.rpt').read(), re.IGNORECASE):
-            return True
-        elif re.search(r'slack \(VIOLATED\)', open('reports/timing.rpt').read(), re.IGNORECASE):
-            return False
-        else:
-            return 'Error'
+        met = parse_reports.parse_timing(timingrpt).met
+        return 'Error' if met is None else met
 
 def get_slack():
-    cdsynthdir()
     # Check for synthesis errors
-    with open('reports/timing.rpt') as f:
-        match = re.search(r'slack.*\s+(-?\d+\.\d+)', f.read())
-        return float(match.group(1)) if match else None
+    return parse_reports.parse_timing(os.path.join(synth_dir, 'reports/timing.rpt')).slack
     
 def get_area():
-    cdsynthdir()
-    with open(arearpt, 'r') as file:
-        match = re.search(r'Total cell area:\s+(\d+\.\d+)', file.read())
-        return float(match.group(1)) if match else None
+    return parse_reports.parse_area(os.path.join(synth_dir, arearpt)).area
 
 def get_delay():
-    cdsimdir()
-    with open(simlog, 'r') as file:
-        match = re.search(r'Monitor:\s+Power Stop time is\s+([\d\.]+)', file.read())
-        return (float(match.group(1))/1000000) if match else None
+    return parse_reports.parse_sim(os.path.join(sim_dir, simlog)).delay
 
 def get_ipc():
-    cdsimdir()
-    with open(simlog, 'r') as file:
-        match = re.search(r'Monitor:\s+Segment\s+IPC:\s+([\d\.]+)', file.read())
-        return float(match.group(1)) if match else None
+    return parse_reports.parse_sim(os.path.join(sim_dir, simlog)).segment_ipc
 
 def get_power():
-    cdsynthdir()
-    with open(powerrpt, 'r') as file:
-        match = re.search(r'Total\s\s.*\s([\d\.e\+-]+)\s*[\w]W', file.read())
-        return (float(match.group(1))/1000) if match else None
+    return parse_reports.parse_power(os.path.join(synth_dir, powerrpt)).total
+
+def get_synth_results():
+    # One pass over each synth report instead of one per metric
+    timingrpt = os.path.join(synth_dir, 'reports/timing.rpt')
+    slack, met = None, None
+    if not os.path.isfile(timingrpt):
+        print("Timing report not existent")
+    else:
+        timing = parse_reports.parse_timing(timingrpt)
+        slack, met = timing.slack, ('Error' if timing.met is None else timing.met)
+    return {
+        "area": get_area(),
+        "slack": slack,
+        "timingmet": met
+    }
+
+def get_sim_results(truncated=False):
+    sim = parse_reports.parse_sim(os.path.join(sim_dir, simlog))
+    return {
+        "delay": sim.delay,
+        # A sim cut off by TIMEOUT never reaches the segment end, only the monitor's total
+        "ipc": sim.ipc if truncated else sim.segment_ipc,
+    }
 
 def make_copy_options_and_params():
     cdparamsdir()
@@ -106,6 +149,21 @@ def make_copy_options_and_params():
     }
     return copy
 
+def round_clock(clock):
+    # get_options.py only accepts even periods
+    clock = round(clock)
+    if clock % 2 != 0:
+        clock += 1
+    return clock
+
+def check_params(run, params_text):
+    # Milliseconds here instead of a failed hour-long synth
+    errors, warnings = dse_params.validate(dse_params.load_model(params_text), run["params"] or {})
+    for w in warnings:
+        print(f"[WARNING] params: {w}")
+    if errors:
+        raise dse_params.ParamError("; ".join(errors))
+
 def update_options_and_params(run, copy):
     cdparamsdir()
     og_params = copy["params"]
@@ -115,18 +173,13 @@ def update_options_and_params(run, copy):
     else:
         new_params = og_params
         if isinstance(run["params"], dict):
-            for key in run["params"]:
-                regex = r'(.*' + key + '\s*=\s*)(\d+)'
-                print(regex)
-                new_params = re.sub(regex, r'\g<1>' + str(run["params"][key]), new_params)
+            check_params(run, og_params)
+            new_params = dse_params.apply_overrides(og_params, run["params"])
         with open('types.sv', 'w') as file:
             file.write(new_params)
     cdoptionsdir()
     data = copy["options"]
-    clock = round(run["clock"])
-    if clock % 2 != 0:
-        clock += 1
-    data['clock'] = clock
+    data['clock'] = round_clock(run["clock"])
     data['synth']['ungroup'] = run['ungroup']
     data['synth']['gate_clock'] = run['gate_clock']
     with open('options.json', 'w') as file:
@@ -134,95 +187,296 @@ def update_options_and_params(run, copy):
     cdscriptdir()
 
 
+# What each stage archives in dse_artifacts.py, relative to its make directory
+report_files = {
+    "synth" : ["reports/synthesis.log", "reports/timing.rpt", "reports/area.rpt"],
+    "sim"   : ["vcs/simulation.log"],
+    "power" : ["reports/power2.rpt", "reports/power.rpt"],
+}
+
 def copy_synth_reports(i):
-    cdsynthdir()
-    os.system(f"mkdir -p {script_dir}/reports")
-    os.system(f"cp reports/synthesis.log {script_dir}/reports/synthesis{i}.log")
-    os.system(f"cp reports/timing.rpt {script_dir}/reports/timing{i}.rpt")
-    os.system(f"cp reports/area.rpt {script_dir}/reports/area{i}.rpt")
+    # {report: digest}, read back with dse_artifacts.py cat <run> synth timing.rpt
+    return dse_artifacts.store_files(i, "synth", synth_dir, report_files["synth"])
 
 def copy_sim_reports(i):
-    cdsimdir()
-    os.system(f"mkdir -p {script_dir}/vcs")
-    os.system(f"cp vcs/simulation.log {script_dir}/vcs/simulation{i}.log")
+    return dse_artifacts.store_files(i, "sim", sim_dir, report_files["sim"])
 
 def copy_power_reports(i):
-    cdsynthdir()
-    os.system(f"mkdir -p {script_dir}/reports")
-    os.system(f"cp reports/power2.rpt {script_dir}/reports/power2{i}.rpt")
-    os.system(f"cp reports/power.rpt {script_dir}/reports/power{i}.rpt")
-
-
-def synth_run(name):
-    cdsynthdir()
-    os.system('make synth')
-    copy_synth_reports(name)
-    areatext = get_area()
-    slacktext = get_slack()
-    timingtext = check_meets_timing()
-    cdscriptdir()
-    run_data = {
-        "area": areatext,
-        "slack": slacktext,
-        "timingmet": timingtext
-    }
+    return dse_artifacts.store_files(i, "power", synth_dir, report_files["power"])
+
+def run_make(target, cwd, started=None, name=None):
+    # No chdir, so stages in different directories can run from different threads.
+    # make gets its own process group so a cancelled stage takes its children with it.
+    print(f"cd {cwd} && make {target}")
+    start = time.time()
+    proc = subprocess.Popen(f"make {target}", shell=True, cwd=cwd,
+                            env=dict(os.environ, PWD=cwd, **flow_trace.child_env(name)), start_new_session=True)
+    if started is not None:
+        started(proc)
+    # wait4 rather than wait: its rusage covers make and every tool make waited for
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    flow_trace.event("make " + target.split()[0], "make", start, time.time() - start, name, cmd=f"make {target}",
+                     cpu_s=round(ru.ru_utime + ru.ru_stime, 3), max_rss_mb=flow_trace.rusage_mb(ru),
+                     exit=proc.returncode)
+    return proc.returncode
+
+def kill_make(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+def current_clock():
+    with open(os.path.join(options_dir, "options.json")) as f:
+        return json.load(f)["clock"]
+
+def qor_drift(seed, clock, synth_data):
+    # Reason the warm-started netlist is not trusted, or None
+    if not isinstance(synth_data["timingmet"], bool):
+        return "incremental compile failed"
+    if synth_data["slack"] is None or synth_data["area"] is None:
+        return "incremental compile left no slack or area"
+    if not synth_data["timingmet"] and synth_data["slack"] > -warm_retry_slack:
+        return f"missed timing by {-synth_data['slack']} ns"
+    if clock >= seed["clock"] and synth_data["area"] > seed["area"] * (1 + warm_area_drift):
+        return f"area {synth_data['area']} vs {seed['area']} at {seed['clock']} ps"
+    return None
+
+def warm_synth(name):
+    # Incremental compile from the mapped design of the nearest clock already synthesized for this
+    # RTL, params and synth options; from scratch when there is none or the result drifted
+    key = dse_cache.warm_key(root_dir)
+    clock = current_clock()
+    seed = dse_cache.nearest_seed(key, clock, warm_max_depth)
+    drift = None
+    if seed is not None:
+        meta, ddc = seed
+        # make synth cleans first, a failure can leave no reports at all (or, before the clean, the last run's)
+        area = os.path.join(synth_dir, arearpt)
+        if os.path.isfile(area):
+            os.remove(area)
+        if run_make(f'synth WARM_START={ddc}', synth_dir, name=name) != 0 or not os.path.isfile(area):
+            drift = "incremental compile failed"
+        else:
+            run_data = get_synth_results()
+            drift = qor_drift(meta, clock, run_data)
+        if drift is None:
+            run_data["warm"] = {"seed_clock": meta["clock"], "depth": meta["depth"] + 1}
+        else:
+            print(f"[WARM] {drift}, synthesizing from scratch")
+    if seed is None or drift is not None:
+        area = os.path.join(synth_dir, arearpt)
+        if os.path.isfile(area):
+            os.remove(area)
+        if run_make('synth', synth_dir, name=name) != 0 or not os.path.isfile(area):
+            raise StageError(f"synth {name}: make synth failed")
+        run_data = get_synth_results()
+        run_data["warm"] = {"seed_clock": None, "depth": 0, "fallback": drift}
+    # Only netlists that met timing seed others, a failing one would pass its problems on
+    if run_data["timingmet"] == True:
+        dse_cache.store_seed(key, synth_dir, {"clock": clock, "depth": run_data["warm"]["depth"],
+                                              "area": run_data["area"], "slack": run_data["slack"]})
     return run_data
 
-def sim_run(run, name):
-    cdsimdir()
-    os.system(f'make run_vcs_top_tb PROG={run["prog"]}')
-    copy_sim_reports(name)
-    delaytext = get_delay()
-    ipctext = get_ipc()
-    cdscriptdir()
-    run_data = {
-        "delay": delaytext,
-        "ipc": ipctext,
-    }
+def synth_run(name, cache=False, warm=False):
+    start = time.time()
+    run_data = None
+    with flow_trace.span("synth", "stage", name) as trace:
+        if cache:
+            key = dse_cache.synth_key(root_dir, warm)
+            run_data = dse_cache.restore("synth", key, synth_dir)
+        cached = run_data is not None
+        if not cached:
+            if warm:
+                run_data = warm_synth(name)
+            else:
+                run_make('synth', synth_dir, name=name)
+                run_data = get_synth_results()
+            if cache and isinstance(run_data["timingmet"], bool):
+                dse_cache.store("synth", key, synth_dir, run_data)
+        run_data["reports"] = copy_synth_reports(name)
+        trace["cached"] = cached
+        trace["warm"] = run_data.get("warm")
+    run_data["cached"] = cached
+    run_data["time"] = time.time() - start
     return run_data
 
-def power_run(name):
-    cdsynthdir()
-    os.system('make power')
-    copy_power_reports(name)
-    powertext = get_power()
-    cdscriptdir()
-    run_data = {
-        "power": powertext
-    }
+def check_cancelled(cancelled, name):
+    # A killed make's reports are partial, nothing after the kill may parse or cache them
+    if cancelled is not None and cancelled.is_set():
+        raise StageError(f"sim {name}: cancelled")
+
+def sim_run(run, name, cache=False, reuse=True, started=None, timeout=None, cancelled=None):
+    # reuse=False still records the result, for when a fresh dump.fsdb is needed.
+    # timeout (cycles) cuts the program short, for a cheap IPC estimate.
+    # cancelled (threading.Event) is set by whoever kills the make processes handed to started.
+    start = time.time()
+    run_data = None
+    with flow_trace.span("sim", "stage", name, prog=run["prog"]) as trace:
+        if cache:
+            key = dse_cache.sim_key(root_dir, run["prog"], timeout)
+            if reuse:
+                run_data = dse_cache.restore("sim", key, sim_dir)
+        cached = run_data is not None
+        if not cached:
+            # A compiled testbench for this design reduces make to running the program
+            fetched = False
+            if cache:
+                simulator_key = dse_cache.simulator_key(root_dir, "vcs")
+                fetched = dse_cache.restore_simulator(simulator_key, sim_dir, "vcs")
+            # A log left by an earlier run would pass for this one
+            log = os.path.join(sim_dir, simlog)
+            if os.path.isfile(log):
+                os.remove(log)
+            # Compile on its own, so the profile tells the recompile apart from the sim
+            status = run_make('vcs/top_tb', sim_dir, started, name)
+            check_cancelled(cancelled, name)
+            if status != 0:
+                raise StageError(f"sim {name}: make vcs/top_tb failed")
+            # Only a testbench that compiled is worth handing to other sandboxes
+            if cache and not fetched:
+                dse_cache.store_simulator(simulator_key, sim_dir, "vcs")
+            target = f'run_vcs_top_tb PROG={run["prog"]}'
+            if timeout is not None:
+                target += f' TIMEOUT={timeout}'
+            # A TIMEOUT run ends in $fatal, so its exit code says nothing; the log has to be new
+            run_make(target, sim_dir, started, name)
+            check_cancelled(cancelled, name)
+            if not os.path.isfile(log):
+                raise StageError(f"sim {name}: {run['prog']} wrote no {simlog}")
+            run_data = get_sim_results(timeout is not None)
+            if cache and run_data["delay" if timeout is None else "ipc"] is not None:
+                dse_cache.store("sim", key, sim_dir, run_data)
+        run_data["reports"] = copy_sim_reports(name)
+        trace["cached"] = cached
+    run_data["cached"] = cached
+    run_data["time"] = time.time() - start
+    return run_data
+
+def power_run(name, cache=False, prog=None, warm=False):
+    # warm: the netlist came from synth_run(warm=True)
+    start = time.time()
+    run_data = None
+    with flow_trace.span("power", "stage", name, prog=prog) as trace:
+        if cache:
+            key = dse_cache.power_key(root_dir, prog, warm)
+            run_data = dse_cache.restore("power", key, synth_dir)
+        cached = run_data is not None
+        if not cached:
+            rpt = os.path.join(synth_dir, powerrpt)
+            if os.path.isfile(rpt):
+                os.remove(rpt)
+            if run_make('power', synth_dir, name=name) != 0 or not os.path.isfile(rpt):
+                raise StageError(f"power {name}: make power failed")
+            run_data = {
+                "power": get_power()
+            }
+            if cache and run_data["power"] is not None:
+                dse_cache.store("power", key, synth_dir, run_data)
+        run_data["reports"] = copy_power_reports(name)
+        trace["cached"] = cached
+    run_data["cached"] = cached
+    run_data["time"] = time.time() - start
     return run_data
 
+def sim_reusable(run, cache, power=True, warm=False):
+    # The power stage reads the sim's dump.fsdb, so a cached sim is only usable when power is cached too
+    if not cache or not power:
+        return cache
+    return dse_cache.contains("power", dse_cache.power_key(root_dir, run["prog"], warm))
+
+def keep_going(run, synth_data, prune=None):
+    # Sim and power only pay off when timing is met and the pruning policy has no objection
+    if (synth_data["timingmet"] != True):
+        return False
+    if prune is not None:
+        reason = prune(run, synth_data)
+        if reason:
+            print(f"[PRUNED] {reason}")
+            synth_data["pruned"] = reason
+            return False
+    return True
+
+def synth_sim_overlapped(run, name, cache=False, prune=None, warm=False, timeout=None, power=True):
+    # The RTL sim only needs the HDL and params, so run it next to synth and drop it if timing fails or it is pruned
+    procs = []
+    lock = threading.Lock()
+    cancelled = threading.Event()
+    def started(proc):
+        with lock:
+            procs.append(proc)
+            if cancelled.is_set():
+                kill_make(proc)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        sim_future = pool.submit(sim_run, run, name, cache, sim_reusable(run, cache, power, warm), started, timeout, cancelled)
+        synth_data = synth_run(name, cache, warm)
+        if not keep_going(run, synth_data, prune):
+            with lock:
+                cancelled.set()
+                for proc in procs:
+                    kill_make(proc)
+            # Wait for the killed sim to unwind, its result is meaningless
+            sim_future.exception()
+            return synth_data, None
+        sim_data = sim_future.result()
+    return synth_data, sim_data
+
 def score_calculate(power, delay, area):
     score = scale * power * (delay**3) * (area**(1/2))
     return score
 
-def total_run(run, name, copy):
+def collect_run_data(run, synth_data, sim_data=None, power_data=None):
+    stages = {"synth": synth_data, "sim": sim_data, "power": power_data}
+    stages = {k: v for k, v in stages.items() if v is not None}
+    run_data = {
+        "clock": run["clock"],
+        "area": synth_data["area"],
+        "slack": synth_data["slack"],
+        "timingmet": synth_data["timingmet"],
+    }
+    if sim_data is not None:
+        run_data["delay"] = sim_data["delay"]
+        run_data["ipc"] = sim_data["ipc"]
+    if sim_data is not None and power_data is not None:
+        run_data["power"] = power_data["power"]
+        run_data["score"] = score_calculate(power_data["power"], sim_data["delay"], synth_data["area"])
+    if synth_data.get("pruned"):
+        run_data["pruned"] = synth_data["pruned"]
+    run_data["cached"] = {k: v["cached"] for k, v in stages.items()}
+    run_data["times"] = {k: v["time"] for k, v in stages.items()}
+    run_data["reports"] = {k: v["reports"] for k, v in stages.items()}
+    return run_data
+
+def fidelity_options(fidelity):
+    # fidelity: {"name", "timeout", "power"} of a cheaper rung (dse_halving.py), None for a full run.
+    # Returns (sim timeout in cycles or None, whether power runs)
+    if not fidelity:
+        return None, True
+    return fidelity.get("timeout"), fidelity.get("power", True)
+
+def total_run(run, name, copy, cache=False, pipelined=False, prune=None, warm=False, fidelity=None):
+    # prune(run, synth_data) -> reason or None, see dse_prune.py; fidelity, see fidelity_options
+    timeout, power = fidelity_options(fidelity)
     update_options_and_params(run, copy)
-    synth_data = synth_run(name)
-    if (synth_data["timingmet"] == True):
-        sim_data = sim_run(run, name)
-        power_data = power_run(name)
-        scoretext = score_calculate(power_data["power"], sim_data["delay"], synth_data["area"])
-        run_data = {
-            "clock": run["clock"],
-            "area": synth_data["area"],
-            "slack": synth_data["slack"],
-            "timingmet": synth_data["timingmet"],
-            "delay": sim_data["delay"],
-            "ipc": sim_data["ipc"],
-            "power": power_data["power"],
-            "score": scoretext
-        }
+    if pipelined:
+        synth_data, sim_data = synth_sim_overlapped(run, name, cache, prune, warm, timeout, power)
+        go = sim_data is not None
     else:
-        run_data = {
-            "clock": run["clock"],
-            "area": synth_data["area"],
-            "slack": synth_data["slack"],
-            "timingmet": synth_data["timingmet"],
-        }
+        synth_data = synth_run(name, cache, warm)
+        go = keep_going(run, synth_data, prune)
+    if go:
+        if not pipelined:
+            sim_data = sim_run(run, name, cache, sim_reusable(run, cache, power, warm), timeout=timeout)
+        power_data = power_run(name, cache, run["prog"], warm) if power else None
+        run_data = collect_run_data(run, synth_data, sim_data, power_data)
+    else:
+        run_data = collect_run_data(run, synth_data)
+    if fidelity:
+        run_data["fidelity"] = fidelity["name"]
     return run_data
 
-def total_run_report(run, name, out_file, copy):
+def total_run_report(run, name, out_file, copy, cache=False, pipelined=False, prune=None, warm=False):
 
     update_options_and_params(run, copy)
 
@@ -240,22 +494,30 @@ def total_run_report(run, name, out_file, copy):
                 value = run['params'][key]
                 f.write(f'\n\t{key}: {value}')
 
-    synth_data = synth_run(name)
+    if pipelined:
+        synth_data, sim_data = synth_sim_overlapped(run, name, cache, prune, warm)
+        go = sim_data is not None
+    else:
+        synth_data = synth_run(name, cache, warm)
+        go = keep_going(run, synth_data, prune)
 
     with open(out_file, "a") as f:
         f.write(f'\n -> AREA: {synth_data["area"]}')
         f.write(f'\n -> SLACK: {synth_data["slack"]}')
         f.write(f'\n -> TIMING MET: {synth_data["timingmet"]}')
+        if synth_data.get("pruned"):
+            f.write(f'\n -> PRUNED: {synth_data["pruned"]}')
 
-    if (synth_data["timingmet"] == True):
+    if go:
 
-        sim_data = sim_run(run, name)
+        if not pipelined:
+            sim_data = sim_run(run, name, cache, sim_reusable(run, cache, warm=warm))
 
         with open(out_file, "a") as f:
             f.write(f'\n -> DELAY: {sim_data["delay"]}')
             f.write(f'\n -> IPC: {sim_data["ipc"]}')
 
-        power_data = power_run(name)
+        power_data = power_run(name, cache, run["prog"], warm)
 
         with open(out_file, "a") as f:
             f.write(f'\n -> POWER: {power_data["power"]}')
@@ -265,24 +527,10 @@ def total_run_report(run, name, out_file, copy):
         with open(out_file, "a") as f:
             f.write(f'\n -> SCORE: {scoretext}')
 
-    if (synth_data["timingmet"]):
-        run_data = {
-            "clock": run["clock"],
-            "area": synth_data["area"],
-            "slack": synth_data["slack"],
-            "timingmet": synth_data["timingmet"],
-            "delay": sim_data["delay"],
-            "ipc": sim_data["ipc"],
-            "power": power_data["power"],
-            "score": scoretext
-        }
+    if go:
+        run_data = collect_run_data(run, synth_data, sim_data, power_data)
     else:
-        run_data = {
-            "clock": run["clock"],
-            "area": synth_data["area"],
-            "slack": synth_data["slack"],
-            "timingmet": synth_data["timingmet"],
-        }
+        run_data = collect_run_data(run, synth_data)
     return run_data
 
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import json
+import math
+from datetime import datetime
+
+import dse_db
+import dse_func
+import dse_parallel
+import dse_suite
+import dse_sweep
+
+### HALVING VARS
+# Each rung keeps the best 1/eta of the configs it ran
+eta     = 3
+# Cheapest first. Synth is the same at every rung and comes from the stage cache after the first,
+# so a promotion only pays for the longer sim (and power). The last rung is a full run.
+rungs   = [
+    {"name": "short",       "prog": "../testcode/coremark_im.elf", "timeout": 1000000,  "power": False},
+    {"name": "coremark",    "prog": "../testcode/coremark_im.elf", "timeout": None,     "power": False},
+    {"name": "full",        "prog": "../testcode/coremark_im.elf", "timeout": None,     "power": True},
+]
+
+def proxy_score(run, run_data):
+    # What a rung ranks by, lower is better, only comparable within the rung. Until power is
+    # measured delay^3 * sqrt(area) stands in for the score, and until a full sim clock / ipc for delay.
+    if run_data.get("timingmet") != True:
+        return math.inf
+    if run_data.get("score"):
+        return run_data["score"]
+    delay = run_data.get("delay")
+    if not delay and run_data.get("ipc"):
+        delay = dse_func.round_clock(run["clock"]) / run_data["ipc"] / 10**6
+    if not delay or not run_data.get("area"):
+        return math.inf
+    return delay**3 * math.sqrt(run_data["area"])
+
+def promoted(ranked, eta=eta):
+    # ranked: [(proxy, run, run_data)] best first; failed runs never move up
+    keep = max(len(ranked) // eta, 1)
+    return [(p, run, run_data) for p, run, run_data in ranked[:keep] if p != math.inf]
+
+def successive_halving(runs, copy, prefix, start=0, rung_list=None, eta=eta, record=None, max_workers=None,
+                       pipelined=False, warm=False, resources=None):
+    # Runs every config at rung start, promotes the best 1/eta to the next rung, and so on.
+    # record(rung, runs, names, results) is called once per rung. Returns [(proxy, run, run_data)]
+    # of the last rung reached, best first.
+    rung_list = rungs if rung_list is None else rung_list
+    ranked = [(0.0, run, None) for run in runs]
+    for level in range(start, len(rung_list)):
+        rung = rung_list[level]
+        if level > start:
+            ranked = promoted(ranked, eta)
+        if not ranked:
+            break
+        level_runs = [dict(run, prog=rung["prog"]) for _, run, _ in ranked]
+        names = [f"{prefix}_{rung['name']}_{i}" for i in range(len(level_runs))]
+        # The last rung is a full run, recorded with no fidelity like any other
+        fidelity = rung if level < len(rung_list) - 1 else None
+        results = dse_parallel.parallel_run(level_runs, copy, max_workers, names, cache=True, pipelined=pipelined,
+                                            resources=resources, warm=warm, fidelity=fidelity)
+        dse_func.cdscriptdir()
+        if record is not None:
+            record(rung, level_runs, names, results)
+        ranked = sorted([(proxy_score(run, run_data), run, run_data) for run, run_data in zip(level_runs, results)],
+                        key=lambda r: r[0])
+    return ranked
+
+def hyperband(draw, copy, prefix, rung_list=None, eta=eta, **kwargs):
+    # One successive-halving bracket per starting rung: the most aggressive one starts eta^s configs
+    # on the cheapest rung, the most conservative runs a few straight at full fidelity.
+    # draw(n) -> up to n new runs. Returns the last rung of every bracket, merged.
+    rung_list = rungs if rung_list is None else rung_list
+    s_max = len(rung_list) - 1
+    finals = []
+    for s in reversed(range(s_max + 1)):
+        n = math.ceil((s_max + 1) / (s + 1) * eta**s)
+        runs = draw(n)
+        if not runs:
+            break
+        ranked = successive_halving(runs, copy, f"{prefix}_b{s}", s_max - s, rung_list, eta, **kwargs)
+        finals += [r for r in ranked if r[0] != math.inf]
+    return sorted(finals, key=lambda r: r[0])
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive halving over cheap-to-full fidelity rungs")
+    parser.add_argument("--spec", default=None, help="draw configs from a dse_sweep.py spec (default: dse_runs.json)")
+    parser.add_argument("-n", "--count", type=int, default=27, help="configs started on the first rung")
+    parser.add_argument("--eta", type=int, default=eta, help="keep the best 1/eta of each rung")
+    parser.add_argument("--rungs", default=None, help="json list of rungs {name, prog, timeout, power}")
+    parser.add_argument("--hyperband", action="store_true", help="run brackets starting at every rung")
+    parser.add_argument("--suite", action="store_true", help="run the winners of the last rung on the whole benchmark suite")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="max concurrent runs (default: cpu count)")
+    parser.add_argument("--pipelined", action="store_true", help="overlap each run's sim with its synth")
+    parser.add_argument("--warm", action="store_true", help="start synth from the netlist of the nearest clock of the same design")
+    args = parser.parse_args()
+
+    rung_list = rungs
+    if args.rungs:
+        with open(args.rungs) as f:
+            rung_list = json.load(f)
+    copy = dse_func.make_copy_options_and_params()
+    db = dse_db.connect()
+    if args.spec:
+        source = dse_sweep.expand_spec(dse_sweep.load_spec(args.spec), db, params_text=copy["params"])
+    else:
+        source = iter(dse_func.load_runs())
+
+    sweep = "halving_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    outfilename = sweep + ".log"
+    with open(outfilename, "w") as f:
+        f.write(f'Successive Halving Report (eta {args.eta}, rungs {", ".join(r["name"] for r in rung_list)}):')
+
+    def record(rung, runs, names, results):
+        with open(outfilename, "a") as f:
+            f.write(f'\n\nRung {rung["name"]} ({len(runs)} runs, prog {rung["prog"]}, timeout {rung.get("timeout")})')
+        dse_parallel.write_report(outfilename, runs, names, results)
+        for run, name, run_data in zip(runs, names, results):
+            dse_db.record_run(db, run, run_data, name, sweep, dse_db.effective_params(run, copy["params"]))
+
+    kwargs = {"record": record, "max_workers": args.jobs, "pipelined": args.pipelined, "warm": args.warm}
+    if args.hyperband:
+        ranked = hyperband(lambda n: list(itertools.islice(source, n)), copy, sweep, rung_list, args.eta, **kwargs)
+    else:
+        runs = list(itertools.islice(source, args.count))
+        ranked = successive_halving(runs, copy, sweep, 0, rung_list, args.eta, **kwargs)
+
+    with open(outfilename, "a") as f:
+        f.write(f'\n\nBest of the last rung:')
+        for proxy, run, run_data in ranked[:args.eta]:
+            f.write(f'\n -> {proxy}: clock {run["clock"]} {json.dumps(run["params"], sort_keys=True)}')
+
+    if args.suite:
+        winners = [run for _, run, _ in promoted(ranked, args.eta)]
+        if winners:
+            names = [f"{sweep}_suite_{i}" for i in range(len(winners))]
+            results = dse_suite.suite_run(winners, copy, max_workers=args.jobs, names=names, cache=True)
+            dse_func.cdscriptdir()
+            dse_suite.write_report(outfilename, winners, results)
+            dse_suite.record_results(db, winners, results, copy, sweep)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import random
+from datetime import datetime
+
+import dse_db
+import dse_func
+import dse_parallel
+import dse_params
+import dse_prune
+import dse_surrogate
+
+### SEARCH SPACE
+# types.sv knobs plus the clock, each with the values the optimizer may pick
+default_space = {
+    "NUM_ROB_ENTRIES"       : [8, 12, 16, 20, 24, 28, 32],
+    "ISQ_ALU_SIZE"          : [4, 5, 6, 7, 8, 9, 10, 12],
+    "ISQ_BMD_SIZE"          : [3, 4, 5, 6, 8],
+    "ISQ_LS_SIZE"           : [3, 4, 5, 6, 8, 10],
+    "LOAD_QUEUE_DEPTH"      : [4, 8, 12, 16],
+    "STORE_QUEUE_DEPTH"     : [4, 8, 12, 16],
+    "CDB_ALU_Q_DEPTH"       : [1, 2, 3, 4],
+    "CDB_BRA_Q_DEPTH"       : [1, 2, 3, 4],
+    "CDB_LS_Q_DEPTH"        : [1, 2, 3, 4],
+    "CDB_MUL_Q_DEPTH"       : [1, 2, 3],
+    "CDB_DIV_Q_DEPTH"       : [1, 2, 3],
+    "DIV_STAGES"            : [8, 12, 16, 20, 24, 32],
+    "IC_PREFETCH_DEGREE"    : [1, 2, 3],
+    "DC_PREFETCH_DEGREE"    : [1, 2, 3],
+    "clock"                 : list(range(1400, 2402, 50)),
+}
+base_run = {
+    "clock" : 1750,
+    "ungroup" : False,
+    "gate_clock" : True,
+    "prog" : "../testcode/coremark_im.elf",
+    "params" : {}
+}
+mutation_rate = 0.2
+# Candidates proposed per evaluated config when a surrogate screens them
+oversample = 4
+
+def config_to_run(config, base):
+    run = json.loads(json.dumps(base))
+    run["params"] = dict(run["params"] or {})
+    for key, value in config.items():
+        if key == "clock":
+            run["clock"] = value
+        else:
+            run["params"][key] = value
+    return run
+
+def config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+def fitness(run_data):
+    # P*D^3*sqrt(A), runs that miss timing or crash never win
+    score = run_data.get("score")
+    return score if score is not None else math.inf
+
+def random_config(space, rng):
+    return {key: rng.choice(values) for key, values in space.items()}
+
+def mutate(config, space, rng):
+    # Step to a neighbouring value so good regions are explored locally
+    child = dict(config)
+    for key, values in space.items():
+        if rng.random() < mutation_rate:
+            i = values.index(child[key]) if child[key] in values else rng.randrange(len(values))
+            i = min(max(i + rng.choice([-2, -1, 1, 2]), 0), len(values) - 1)
+            child[key] = values[i]
+    return child
+
+def crossover(a, b, rng):
+    return {key: (a[key] if rng.random() < 0.5 else b[key]) for key in a}
+
+def tournament(population, rng, k=3):
+    return min(rng.sample(population, min(k, len(population))), key=lambda p: p[1])
+
+def is_legal(config, model):
+    if model is None:
+        return True
+    errors, warnings = dse_params.validate(model, {k: v for k, v in config.items() if k != "clock"})
+    return not errors
+
+def propose(population, space, batch, seen, rng, model=None, tries=1000):
+    children = []
+    for _ in range(tries):
+        if len(children) == batch:
+            break
+        if len(population) < 2:
+            child = random_config(space, rng)
+        else:
+            child = mutate(crossover(tournament(population, rng)[0], tournament(population, rng)[0], rng), space, rng)
+        if config_key(child) not in seen:
+            seen.add(config_key(child))
+            # Illegal points would only burn budget on a failed synth
+            if is_legal(child, model):
+                children.append(child)
+    return children
+
+def optimize(evaluate, space=None, budget=32, batch=8, seed=None, history=None, elite=None, model=None, screen=None):
+    # (mu + lambda) evolution strategy, every evaluation costs a synth + sim + power.
+    # screen(configs) -> the configs worth evaluating, most promising first
+    # (see dse_surrogate.rank); candidates it drops are never proposed again.
+    space = default_space if space is None else space
+    elite = batch if elite is None else elite
+    rng = random.Random(seed)
+    seen = set()
+    population = []
+    # Warm start from already evaluated points instead of spending budget on them again
+    for config, score in (history or []):
+        seen.add(config_key(config))
+        population.append((config, score))
+    population = sorted(population, key=lambda p: p[1])[:elite]
+    evaluations = []
+    while len(evaluations) < budget:
+        size = min(batch, budget - len(evaluations))
+        children = propose(population, space, size * (oversample if screen else 1), seen, rng, model)
+        if screen is not None and children:
+            ranked = screen(children)
+            for child in ranked[size:]:
+                # Not skipped, just outranked this generation
+                seen.discard(config_key(child))
+            children = ranked[:size]
+            if not children:
+                # Everything proposed was confidently bad, draw again
+                continue
+        if not children:
+            break
+        results = evaluate(children)
+        for child, run_data in zip(children, results):
+            evaluations.append((child, run_data))
+            population.append((child, fitness(run_data)))
+        population = sorted(population, key=lambda p: p[1])[:elite]
+    return population[0] if population else None, evaluations
+
+def history_from_db(conn, space, benchmark):
+    history = []
+    for row in conn.execute("SELECT * FROM runs WHERE benchmark = ? AND score IS NOT NULL", (benchmark,)):
+        r = dse_db.to_dict(row)
+        config = {key: (r["clock"] if key == "clock" else r["params"].get(key)) for key in space}
+        if None not in config.values():
+            history.append((config, r["score"]))
+    return history
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolutionary search over types.sv parameters and the clock")
+    parser.add_argument("--budget", type=int, default=32, help="total synth+sim+power evaluations")
+    parser.add_argument("--batch", type=int, default=8, help="configs evaluated in parallel per generation")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--space", default=None, help="json file mapping knob -> list of values")
+    parser.add_argument("--prog", default=base_run["prog"])
+    parser.add_argument("--no-history", action="store_true", help="do not warm start from dse_results.db")
+    parser.add_argument("--prune", action="store_true", help="heuristic: skip sim and power when a score estimate "
+                        f"(power floor = {dse_prune.power_margin} x lowest recorded power/area) is worse than the best score")
+    parser.add_argument("--no-surrogate", action="store_true", help="do not screen candidates with models fitted to dse_results.db")
+    args = parser.parse_args()
+
+    space = default_space
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    base = dict(base_run, prog=args.prog)
+    copy = dse_func.make_copy_options_and_params()
+    db = dse_db.connect()
+    sweep = "opt_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    outfilename = sweep + ".log"
+    with open(outfilename, "w") as f:
+        f.write(f'Optimizer Report (budget {args.budget}, batch {args.batch}):')
+
+    history = [] if args.no_history else history_from_db(db, space, dse_db.benchmark_name(args.prog))
+    generation = [0]
+
+    def evaluate(configs):
+        runs = [config_to_run(c, base) for c in configs]
+        names = [f"{sweep}_{generation[0]}_{i}" for i in range(len(runs))]
+        # Rebuilt every generation, the best score only gets better
+        prune = dse_prune.policy_from_db(db, copy["params"]) if args.prune else None
+        results = dse_parallel.parallel_run(runs, copy, args.batch, names, cache=True, prune=prune)
+        dse_func.cdscriptdir()
+        dse_parallel.write_report(outfilename, runs, names, results)
+        for run, name, run_data in zip(runs, names, results):
+            dse_db.record_run(db, run, run_data, name, sweep, dse_db.effective_params(run, copy["params"]))
+        generation[0] += 1
+        return results
+
+    fitted = {}
+    def screen(configs):
+        # Refitted whenever a generation added runs, on everything recorded so far
+        bench = dse_db.benchmark_name(args.prog)
+        count = db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        if fitted.get("count") != count:
+            fitted.update(count=count, models=dse_surrogate.train(db, list(space), bench))
+        models = fitted["models"]
+        if not models:
+            return configs
+        best = db.execute("SELECT MIN(score) FROM runs WHERE benchmark = ?", (bench,)).fetchone()[0]
+        kept, skipped = dse_surrogate.rank(models, configs, best)
+        with open(outfilename, "a") as f:
+            for config, reason in skipped:
+                f.write(f'\n\nSkipped {json.dumps(config, sort_keys=True)}\n -> SURROGATE: {reason}')
+        return kept
+
+    model = dse_params.load_model(copy["params"])
+    best, evaluations = optimize(evaluate, space, args.budget, args.batch, args.seed, history, model=model,
+                                 screen=None if args.no_surrogate else screen)
+    with open(outfilename, "a") as f:
+        f.write(f'\n\nEvaluated {len(evaluations)} configs')
+        if best is not None:
+            f.write(f'\nBest score: {best[1]}')
+            f.write(f'\nBest config: {json.dumps(best[0], sort_keys=True)}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import dse_cache
+import dse_db
+import dse_func
+import dse_params
+import dse_prune
+import dse_sched
+
+### SANDBOX PATHS
+sandbox_dir     = dse_func.script_dir + "/sandboxes"
+# A pool worker's dse_func.root_dir points at its last sandbox, new ones are cut from the real tree
+source_root     = dse_func.root_dir
+# Every run edits these, so each sandbox gets its own copy
+snapshot_dirs   = ["hdl", "pkg", "synth", "sim", "bin", "hvl"]
+snapshot_files  = ["options.json"]
+# Read-only inputs, shared between sandboxes
+shared_dirs     = ["sram", "testcode"]
+
+def ignored_outputs(src):
+    # Skip build products listed in the directory's .gitignore (vcs/, reports/, outputs/, ...)
+    gitignore = os.path.join(src, ".gitignore")
+    if not os.path.isfile(gitignore):
+        return None
+    with open(gitignore) as f:
+        patterns = [l.strip() for l in f if l.strip() and not l.startswith(('#', '!'))]
+    return shutil.ignore_patterns(*patterns)
+
+def make_sandbox(name, root=None):
+    root = source_root if root is None else root
+    path = os.path.join(sandbox_dir, name)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    for d in snapshot_dirs:
+        src = os.path.join(root, d)
+        shutil.copytree(src, os.path.join(path, d), symlinks=True,
+                        ignore=ignored_outputs(src), copy_function=dse_cache.reflink_copy)
+    for f in snapshot_files:
+        dse_cache.reflink_copy(os.path.join(root, f), os.path.join(path, f))
+    for d in shared_dirs:
+        os.symlink(os.path.join(root, d), os.path.join(path, d))
+    return path
+
+def remove_sandbox(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+def run_synth(run, name, copy, keep=False, cache=False, pipelined=False, prune=None, warm=False, fidelity=None):
+    # Runs inside a pool worker: the run's sandbox and its synth (with the sim next to it when pipelined).
+    # Sim and power follow as their own stages in the same sandbox, see advance.
+    path = make_sandbox(name)
+    dse_func.set_root(path)
+    try:
+        dse_func.update_options_and_params(run, copy)
+        timeout, power = dse_func.fidelity_options(fidelity)
+        if pipelined:
+            synth_data, sim_data = dse_func.synth_sim_overlapped(run, name, cache, prune, warm, timeout, power)
+            go = sim_data is not None
+        else:
+            synth_data, sim_data = dse_func.synth_run(name, cache, warm), None
+            go = dse_func.keep_going(run, synth_data, prune)
+    except Exception:
+        if not keep:
+            remove_sandbox(path)
+        raise
+    return path, synth_data, sim_data, go
+
+def run_sim(run, path, name, cache=False, warm=False, fidelity=None):
+    # Runs inside a pool worker, in the sandbox run_synth left
+    dse_func.set_root(path)
+    timeout, power = dse_func.fidelity_options(fidelity)
+    return dse_func.sim_run(run, name, cache, dse_func.sim_reusable(run, cache, power, warm), timeout=timeout)
+
+def run_power(run, path, name, cache=False, warm=False):
+    # Runs inside a pool worker, from the dump run_sim left
+    dse_func.set_root(path)
+    return dse_func.power_run(name, cache, run["prog"], warm)
+
+def submit_run(sched, tag, run, name, copy, keep=False, cache=False, pipelined=False, prune=None, warm=False,
+               fidelity=None, synth_only=False, priority=0):
+    # Queues the run's synth; advance queues its sim and power once the stage before them is done,
+    # so each stage holds only its own licenses, memory and cores.
+    state = {"tag": tag, "run": run, "name": name, "keep": keep, "cache": cache, "warm": warm, "fidelity": fidelity,
+             "synth_only": synth_only, "priority": priority, "path": None, "synth": None, "sim": None}
+    stage = "pipelined" if pipelined and not synth_only else "synth"
+    dse_sched.submit(sched, stage, ("synth", state), run_synth, run, name, copy, keep, cache,
+                     pipelined and not synth_only, prune, warm, fidelity, priority=priority)
+
+def advance(sched, kind, state, future):
+    # Takes a finished stage of a submit_run run from dse_sched.wait_any and queues the next one.
+    # Returns the run's run_data once it is done (an "error" one when a stage failed), else None.
+    run = state["run"]
+    try:
+        value = future.result()
+    except Exception as e:
+        finish(state)
+        return {"clock": run["clock"], "timingmet": 'Error', "error": repr(e)}
+    if kind == "synth":
+        state["path"], state["synth"], state["sim"], go = value
+        if not go or state["synth_only"]:
+            return finish(state, dse_func.collect_run_data(run, state["synth"]))
+        if state["sim"] is None:
+            dse_sched.submit(sched, "sim", ("sim", state), run_sim, run, state["path"], state["name"],
+                             state["cache"], state["warm"], state["fidelity"], priority=state["priority"])
+            return None
+    elif kind == "sim":
+        state["sim"] = value
+    else:
+        return finish(state, dse_func.collect_run_data(run, state["synth"], state["sim"], value))
+    if not dse_func.fidelity_options(state["fidelity"])[1]:
+        return finish(state, dse_func.collect_run_data(run, state["synth"], state["sim"]))
+    dse_sched.submit(sched, "power", ("power", state), run_power, run, state["path"], state["name"],
+                     state["cache"], state["warm"], priority=state["priority"])
+    return None
+
+def finish(state, run_data=None):
+    if state["path"] is not None and not state["keep"]:
+        remove_sandbox(state["path"])
+    if run_data is None:
+        return None
+    run_data["sandbox"] = state["path"] if state["keep"] else None
+    if state["fidelity"]:
+        run_data["fidelity"] = state["fidelity"]["name"]
+    return run_data
+
+def parallel_run(runs, copy, max_workers=None, names=None, keep=False, cache=False, pipelined=False, prune=None,
+                 resources=None, warm=False, fidelity=None):
+    if names is None:
+        names = [str(i) for i in range(len(runs))]
+    if len(set(names)) != len(names):
+        raise ValueError("Run names must be unique, they name the sandboxes and reports")
+    max_workers = max_workers or os.cpu_count()
+    # Reject illegal params before anything is queued
+    model = dse_params.load_model(copy["params"])
+    invalid = {}
+    for i, run in enumerate(runs):
+        errors, warnings = dse_params.validate(model, run["params"] or {})
+        if errors:
+            invalid[i] = {"clock": run["clock"], "timingmet": 'Error', "error": "invalid params: " + "; ".join(errors)}
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        sched = dse_sched.make_scheduler(pool, resources, dse_sched.expected_times(dse_db.connect()))
+        for i, (run, name) in enumerate(zip(runs, names)):
+            if i in invalid:
+                results[i] = invalid[i]
+                continue
+            # Earlier runs first, so whole runs finish instead of every run half done
+            submit_run(sched, i, run, name, copy, keep, cache, pipelined, prune, warm, fidelity, priority=i)
+        # One failed run should not lose the others
+        while dse_sched.pending(sched):
+            for (kind, state), future in dse_sched.wait_any(sched):
+                run_data = advance(sched, kind, state, future)
+                if run_data is not None:
+                    results[state["tag"]] = run_data
+    return [results[i] for i in range(len(runs))]
+
+def write_report(out_file, runs, names, results):
+    with open(out_file, "a") as f:
+        for run, name, run_data in zip(runs, names, results):
+            f.write(f'\n')
+            f.write(f"\nRun {name}")
+            f.write(f'\nclock: {run["clock"]}')
+            f.write(f'\nungroup: {run["ungroup"]}')
+            f.write(f'\ngate_clock: {run["gate_clock"]}')
+            f.write(f'\nprog: {run["prog"]}')
+            if (not run['params']):
+                f.write(f'\nparams: none')
+            else:
+                f.write(f'\nparams: ')
+                for key in run['params']:
+                    f.write(f'\n\t{key}: {run["params"][key]}')
+            for key in ["area", "slack", "timingmet", "delay", "ipc", "power", "score", "pruned", "error"]:
+                if key in run_data:
+                    f.write(f'\n -> {key.upper()}: {run_data[key]}')
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every config in dse_runs.json in parallel sandboxes")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="max concurrent runs (default: cpu count)")
+    parser.add_argument("--keep", action="store_true", help="keep sandboxes after the runs finish")
+    parser.add_argument("--cache", action="store_true", help="reuse synth/sim/power results from the stage cache")
+    parser.add_argument("--pipelined", action="store_true", help="overlap each run's sim with its synth")
+    parser.add_argument("--warm", action="store_true", help="start synth from the netlist of the nearest clock of the same design")
+    parser.add_argument("--prune", action="store_true", help="heuristic: skip sim and power when a score estimate (power floor = "
+                        f"{dse_prune.power_margin} x lowest recorded power/area) is worse than the best recorded score")
+    args = parser.parse_args()
+
+    runs = dse_func.load_runs()
+    copy = dse_func.make_copy_options_and_params()
+    names = [f"{i}" for i in range(len(runs))]
+
+    outfilename = "parallel_run_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
+    with open(outfilename, "w") as f:
+        f.write(f'Parallel Report ({len(runs)} runs, {args.jobs or os.cpu_count()} jobs):')
+
+    db = dse_db.connect()
+    prune = None
+    if args.prune:
+        prune = dse_prune.policy_from_db(db, copy["params"])
+    results = parallel_run(runs, copy, args.jobs, names, args.keep, args.cache, args.pipelined, prune, warm=args.warm)
+    dse_func.cdscriptdir()
+    write_report(outfilename, runs, names, results)
+    for run, name, run_data in zip(runs, names, results):
+        dse_db.record_run(db, run, run_data, name, outfilename, dse_db.effective_params(run, copy["params"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+import ast
+import json
+import os
+import re
+import sys
+
+### PARAM PATHS
+script_dir  = os.path.dirname(os.path.abspath(__file__))
+types_sv    = os.path.abspath(script_dir + "/../../pkg/types.sv")
+
+localparam_re = re.compile(r'^(?P<head>\s*localparam\s+(?P<type>[^=;]*?)\s*\b(?P<name>[A-Za-z_]\w*)\s*=\s*)'
+                           r'(?P<expr>[^;]+?)(?P<tail>\s*;)(?P<comment>[ \t]*//[^\n]*)?$', re.MULTILINE)
+range_re    = re.compile(r'Ranges?\s+from\s+(\d+)\s*-\s*(\d+)', re.IGNORECASE)
+max_re      = re.compile(r'\bMax\s+(\d+)', re.IGNORECASE)
+
+# (severity, condition that must hold, message); conditions are SV-style expressions over types.sv names
+rules = [
+    ("error",   "NUM_EBR_CHECKPOINT <= min(ISQ_ALU_SIZE, ISQ_BMD_SIZE, ISQ_LS_SIZE)",
+                "NUM_EBR_CHECKPOINT is bigger than a reservation station"),
+    ("error",   "NUM_EBR_CHECKPOINT >= 1", "NUM_EBR_CHECKPOINT must be at least 1"),
+    ("error",   "FREE_LIST_DEPTH >= 2", "FREE_LIST_DEPTH below 2 leaves the free list without a head/tail bit"),
+    ("error",   "LOAD_QUEUE_DEPTH >= 2 && STORE_QUEUE_DEPTH >= 2", "LSQ depths below 2 have no head/tail bit"),
+    ("warning", "is_pow2(FREE_LIST_DEPTH)", "FREE_LIST_DEPTH is not a power of two, the free list wraps on QUEUE_DEPTH_TOP"),
+]
+
+class ParamError(ValueError):
+    pass
+
+def clog2(x):
+    # SystemVerilog $clog2: ceil(log2(x)), with $clog2(0) == $clog2(1) == 0
+    return 0 if x <= 1 else (int(x) - 1).bit_length()
+
+def is_pow2(x):
+    return x > 0 and (x & (x - 1)) == 0
+
+functions = {"clog2": clog2, "is_pow2": is_pow2, "min": min, "max": max}
+
+def to_python(expr):
+    expr = expr.replace("$clog2", "clog2").replace("&&", " and ").replace("||", " or ")
+    expr = re.sub(r'!(?!=)', ' not ', expr)
+    if "'" in expr or "?" in expr:
+        raise ParamError(f"unsupported SystemVerilog expression: {expr.strip()}")
+    return expr.strip()
+
+def names_in(expr):
+    tree = ast.parse(to_python(expr), mode='eval')
+    return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and n.id not in functions}
+
+def eval_expr(expr, env):
+    tree = ast.parse(to_python(expr), mode='eval')
+    return eval_node(tree.body, env, expr)
+
+def eval_node(node, env, expr):
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in env:
+            raise ParamError(f"unknown name {node.id} in {expr.strip()}")
+        return env[node.id]
+    if isinstance(node, ast.UnaryOp):
+        v = eval_node(node.operand, env, expr)
+        ops = {ast.USub: lambda a: -a, ast.UAdd: lambda a: a, ast.Not: lambda a: not a, ast.Invert: lambda a: ~a}
+        return ops[type(node.op)](v)
+    if isinstance(node, ast.BinOp):
+        a = eval_node(node.left, env, expr)
+        b = eval_node(node.right, env, expr)
+        if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)) and b == 0:
+            raise ParamError(f"division by zero in {expr.strip()}")
+        ops = {ast.Add: lambda: a + b, ast.Sub: lambda: a - b, ast.Mult: lambda: a * b,
+               ast.Div: lambda: int(a / b), ast.FloorDiv: lambda: a // b, ast.Mod: lambda: a % b,
+               ast.Pow: lambda: a ** b, ast.LShift: lambda: a << b, ast.RShift: lambda: a >> b,
+               ast.BitAnd: lambda: a & b, ast.BitOr: lambda: a | b, ast.BitXor: lambda: a ^ b}
+        if type(node.op) in ops:
+            return ops[type(node.op)]()
+    if isinstance(node, ast.BoolOp):
+        values = [eval_node(v, env, expr) for v in node.values]
+        return all(values) if isinstance(node.op, ast.And) else any(values)
+    if isinstance(node, ast.Compare):
+        left = eval_node(node.left, env, expr)
+        ops = {ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b, ast.Gt: lambda a, b: a > b,
+               ast.GtE: lambda a, b: a >= b, ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b}
+        for op, comp in zip(node.ops, node.comparators):
+            right = eval_node(comp, env, expr)
+            if not ops[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in functions:
+        return functions[node.func.id](*[eval_node(a, env, expr) for a in node.args])
+    raise ParamError(f"unsupported expression: {expr.strip()}")
+
+def load_model(text=None):
+    if text is None:
+        with open(types_sv) as f:
+            text = f.read()
+    # Only the params package holds tunables
+    start = text.find("package params;")
+    end = text.find("endpackage", start)
+    params = {}
+    for m in localparam_re.finditer(text, start if start >= 0 else 0, end if end >= 0 else len(text)):
+        comment = (m.group("comment") or "").strip()
+        param = {
+            "type"      : m.group("type"),
+            "expr"      : m.group("expr"),
+            "unsigned"  : "unsigned" in m.group("type"),
+            "locked"    : "DO NOT CHANGE" in comment.upper(),
+            "range"     : None,
+            "deps"      : names_in(m.group("expr")),
+            "span"      : m.span("expr"),
+        }
+        if range_re.search(comment):
+            param["range"] = tuple(int(x) for x in range_re.search(comment).groups())
+        elif max_re.search(comment):
+            param["range"] = (0, int(max_re.search(comment).group(1)))
+        params[m.group("name")] = param
+    return {"text": text, "params": params}
+
+def evaluate(model, overrides=None):
+    overrides = overrides or {}
+    params = model["params"]
+    for key in overrides:
+        if key not in params:
+            raise ParamError(f"{key} is not a localparam in the params package")
+    values = {}
+    visiting = set()
+    def value_of(name):
+        if name in values:
+            return values[name]
+        if name in visiting:
+            raise ParamError(f"cyclic localparam dependency through {name}")
+        if name not in params:
+            raise ParamError(f"unknown name {name}")
+        visiting.add(name)
+        if name in overrides:
+            expr = str(overrides[name])
+        else:
+            expr = params[name]["expr"]
+        env = {dep: value_of(dep) for dep in names_in(expr)}
+        values[name] = int(eval_expr(expr, env))
+        visiting.discard(name)
+        return values[name]
+    for name in params:
+        value_of(name)
+    return values
+
+def validate(model, overrides=None):
+    overrides = overrides or {}
+    errors = []
+    warnings = []
+    try:
+        values = evaluate(model, overrides)
+    except ParamError as e:
+        return [str(e)], warnings
+    params = model["params"]
+    baseline = evaluate(model)
+    for name, value in values.items():
+        p = params[name]
+        if name in overrides and p["locked"] and value != baseline[name]:
+            errors.append(f"{name} is marked DO NOT CHANGE")
+        if p["unsigned"] and value < 0:
+            errors.append(f"{name} = {value} is negative but declared {p['type']}")
+        if p["range"] is not None and not p["range"][0] <= value <= p["range"][1]:
+            errors.append(f"{name} = {value} is outside {p['range'][0]}-{p['range'][1]}")
+    for severity, cond, message in rules:
+        try:
+            holds = eval_expr(cond, values)
+        except ParamError:
+            continue
+        if not holds and severity == "error":
+            errors.append(message)
+        # Only warn about what the overrides changed, the shipped types.sv is known to work
+        elif not holds and eval_expr(cond, baseline):
+            warnings.append(message)
+    return errors, warnings
+
+def apply_overrides(text, overrides):
+    # Rewrite the expression of exactly the named localparams, nothing that merely shares a suffix
+    model = load_model(text)
+    edits = []
+    for key, value in overrides.items():
+        if key not in model["params"]:
+            raise ParamError(f"{key} is not a localparam in the params package")
+        edits.append((model["params"][key]["span"], str(value)))
+    for (start, end), value in sorted(edits, reverse=True):
+        text = text[:start] + value + text[end:]
+    return text
+
+def check_run(run, model=None):
+    model = load_model() if model is None else model
+    return validate(model, run.get("params") or {})
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ["-h", "--help"]:
+        print("Usage: python3 dse_params.py [--types types.sv] [KEY=VALUE ...]")
+        print("       python3 dse_params.py [--types types.sv] --runs dse_runs.json")
+        exit(1)
+    path = types_sv
+    if args[0] == "--types":
+        path = args[1]
+        args = args[2:]
+    with open(path) as f:
+        model = load_model(f.read())
+    if args and args[0] == "--runs":
+        with open(args[1]) as f:
+            runs = json.load(f)["runs"]
+        failed = False
+        for i, run in enumerate(runs):
+            errors, warnings = check_run(run, model)
+            for w in warnings:
+                print(f"run {i}: warning: {w}")
+            for e in errors:
+                print(f"run {i}: error: {e}")
+            failed |= bool(errors)
+        exit(1 if failed else 0)
+    overrides = {}
+    for a in args:
+        key, _, value = a.partition("=")
+        overrides[key] = int(value)
+    errors, warnings = validate(model, overrides)
+    if not errors:
+        for name, value in evaluate(model, overrides).items():
+            print(f"{name:28} {value}")
+    for w in warnings:
+        print(f"warning: {w}")
+    for e in errors:
+        print(f"error: {e}")
+    exit(1 if errors else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+from collections import defaultdict
+
+### PROFILE PATHS
+script_dir      = os.path.dirname(os.path.abspath(__file__))
+default_trace   = os.environ.get("DSE_TRACE", script_dir + "/dse_trace.jsonl")
+# us a stage may start before the one it waited for ended and still count as waiting for it
+tolerance       = 1000
+
+def load(path):
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A worker killed in the middle of a write
+                    continue
+    return events
+
+def to_chrome(events):
+    # Chrome's JSON object format, which chrome://tracing, ui.perfetto.dev and speedscope all open
+    meta = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"dse worker {pid}"}}
+            for pid in sorted({e["pid"] for e in events})]
+    return {"traceEvents": meta + sorted(events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+def end(e):
+    return e["ts"] + e["dur"]
+
+def children(events, parent):
+    # What ran inside parent on its thread: make targets in a stage, scripts in a make
+    return [e for e in events if e is not parent and e["pid"] == parent["pid"] and e["tid"] == parent["tid"]
+            and e["ts"] >= parent["ts"] and end(e) <= end(parent)]
+
+def critical_path(stages):
+    # Walk back from the stage that ended last, each time to the latest stage that ended before it started
+    path = []
+    current = max(stages, key=end, default=None)
+    while current is not None:
+        path.append(current)
+        before = [s for s in stages if end(s) <= current["ts"] + tolerance and s is not current and s not in path]
+        current = max(before, key=end, default=None)
+    return list(reversed(path))
+
+def by_run(events):
+    runs = defaultdict(list)
+    for e in events:
+        runs[(e["args"].get("session"), e["args"].get("run"))].append(e)
+    return runs
+
+def last_session(events):
+    sessions = [e for e in events if e["args"].get("session")]
+    return max(sessions, key=lambda e: e["ts"])["args"]["session"] if sessions else None
+
+def row(indent, e, critical=""):
+    args = e["args"]
+    cpu = f'{args["cpu_s"]:9.1f}' if "cpu_s" in args else f'{"":9}'
+    rss = f'{args["max_rss_mb"]:9.0f}' if "max_rss_mb" in args else f'{"":9}'
+    cached = " (cached)" if args.get("cached") else ""
+    return f'{critical:1} {"  " * indent + e["name"] + cached:<44}{e["dur"] / 1e6:9.1f}{cpu}{rss}'
+
+def run_summary(session, run, events):
+    stages = sorted([e for e in events if e["cat"] == "stage"], key=lambda e: e["ts"])
+    if not stages:
+        return []
+    path = critical_path(stages)
+    wall = (max(end(s) for s in stages) - min(s["ts"] for s in stages)) / 1e6
+    lines = [f"\nRun {run} ({session}): {wall:.1f}s, critical path: {' -> '.join(s['name'] for s in path)}",
+             f'  {"":44}{"wall s":>9}{"cpu s":>9}{"rss MB":>9}']
+    for stage in stages:
+        lines.append(row(0, stage, "*" if stage in path else ""))
+        inner = children(events, stage)
+        for make in sorted([e for e in inner if e["cat"] == "make"], key=lambda e: e["ts"]):
+            lines.append(row(1, make))
+            steps = sorted([e for e in children(inner, make) if e["cat"] == "step"], key=lambda e: e["ts"])
+            for step in steps:
+                lines.append(row(2, step))
+        # Cache restores, report copies and the like
+        other = stage["dur"] - sum(e["dur"] for e in inner if e["cat"] == "make")
+        lines.append(f'  {"  (outside make)":<44}{other / 1e6:9.1f}')
+    return lines
+
+def totals(events):
+    # Where the time went over every run: one line per stage, make target and script
+    agg = defaultdict(lambda: {"count": 0, "wall": 0, "cpu": 0.0, "rss": 0.0})
+    for e in events:
+        key = (e["cat"], e["name"].split(" PROG=")[0])
+        a = agg[key]
+        a["count"] += 1
+        a["wall"] += e["dur"]
+        a["cpu"] += e["args"].get("cpu_s", 0.0)
+        a["rss"] = max(a["rss"], e["args"].get("max_rss_mb", 0.0))
+    lines = ["\nTotals", f'  {"":44}{"count":>7}{"wall s":>10}{"mean s":>9}{"cpu s":>10}{"rss MB":>9}']
+    for (cat, name), a in sorted(agg.items(), key=lambda kv: -kv[1]["wall"]):
+        lines.append(f'  {cat + ": " + name:<44}{a["count"]:7}{a["wall"] / 1e6:10.1f}'
+                     f'{a["wall"] / 1e6 / a["count"]:9.2f}{a["cpu"]:10.1f}{a["rss"]:9.0f}')
+    return lines
+
+def summary(events, runs=None):
+    lines = []
+    for (session, run), run_events in by_run(events).items():
+        if run is None or (runs and run not in runs):
+            continue
+        lines += run_summary(session, run, run_events)
+    return lines + totals([e for e in events if not runs or e["args"].get("run") in runs])
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile DSE runs from the stage trace dse_func.py records")
+    parser.add_argument("-i", "--input", default=default_trace, help=f"trace lines (default: {default_trace})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("trace", help="write a trace for chrome://tracing, ui.perfetto.dev or speedscope")
+    p.add_argument("-o", "--output", default="dse_trace.json")
+    p = sub.add_parser("summary", help="per-run stage table with the critical path, plus totals")
+    p.add_argument("--run", action="append", default=None, help="only this run name, repeatable")
+    for p in sub.choices.values():
+        p.add_argument("--all", action="store_true", help="every recorded session, not just the latest")
+    args = parser.parse_args()
+
+    events = load(args.input)
+    if not args.all:
+        session = last_session(events)
+        events = [e for e in events if e["args"].get("session") == session]
+    if args.cmd == "trace":
+        with open(args.output, "w") as f:
+            json.dump(to_chrome(events), f)
+        print(f"{len(events)} events -> {args.output}")
+    else:
+        print("\n".join(summary(events, args.run)))
+
+if __name__ == "__main__":
+    main()
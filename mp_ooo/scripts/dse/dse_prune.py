@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import functools
+
+import dse_db
+import dse_func
+import dse_params
+
+### PRUNING VARS
+# Power is only known after sim + power, so its floor comes from completed runs:
+# the lowest power per unit area seen on the benchmark, scaled down by this margin.
+# Nothing guarantees a new config stays above it (clock gating, a smaller clock tree, ...),
+# so the score bound is a heuristic and pruning stays opt-in (--prune).
+power_margin    = 0.5
+
+def ipc_bound(run, types_text):
+    # IPC cannot exceed the dispatch width, whatever the rest of the config
+    values = dse_params.evaluate(dse_params.load_model(types_text), run["params"] or {})
+    return values["DISP_WIDTH"]
+
+def score_bound(bounds, run, synth_data):
+    # Lowest P*D^3*sqrt(A) this config can still reach once synth has given its area
+    ipc_max = bounds["ipc_max"] or ipc_bound(run, bounds["types"])
+    bench = bounds["benchmarks"][dse_db.benchmark_name(run["prog"])]
+    # delay is the stop time (ps) / 1e6, i.e. instructions * period / IPC / 1e6
+    delay = bench["instructions"] * dse_func.round_clock(run["clock"]) / (ipc_max * 10**6)
+    power = bench["power_per_area"] * synth_data["area"]
+    return dse_func.score_calculate(power, delay, synth_data["area"])
+
+def dominated(bounds, run, synth_data):
+    # Pruning policy for total_run: a reason string when sim and power cannot pay off, else None
+    bench = bounds["benchmarks"].get(dse_db.benchmark_name(run["prog"]))
+    if bench is None or synth_data["area"] is None:
+        return None
+    bound = score_bound(bounds, run, synth_data)
+    if bound > bench["best"]:
+        return (f"heuristic score bound {bound:.6g} > best {bench['best']:.6g} (power floor {bounds['margin']} x lowest "
+                f"recorded power/area, area {synth_data['area']}, clock {run['clock']})")
+    return None
+
+def make_policy(benchmarks, types_text, ipc_max=None, margin=power_margin):
+    # benchmarks: name -> {"best", "instructions", "power_per_area"}, power_per_area already scaled by margin
+    # functools.partial so the policy pickles into parallel_run's workers
+    bounds = {
+        "benchmarks": benchmarks,
+        "types": types_text,
+        "ipc_max": ipc_max,
+        "margin": margin,
+    }
+    return functools.partial(dominated, bounds)
+
+def policy_from_db(conn, types_text, margin=power_margin, ipc_max=None):
+    # Benchmarks without a completed run are never pruned, there is nothing to compare against
+    rows = conn.execute("SELECT benchmark, clock, area, delay, ipc, power, score FROM runs "
+                        "WHERE score IS NOT NULL AND ipc > 0 AND area > 0").fetchall()
+    benchmarks = {}
+    for r in rows:
+        # Dynamic instructions in the measured segment, the same for every config of the benchmark
+        instructions = r["delay"] * 10**6 * r["ipc"] / dse_func.round_clock(r["clock"])
+        power_per_area = margin * r["power"] / r["area"]
+        b = benchmarks.get(r["benchmark"])
+        if b is None:
+            benchmarks[r["benchmark"]] = {"best": r["score"], "instructions": instructions, "power_per_area": power_per_area}
+        else:
+            b["best"] = min(b["best"], r["score"])
+            b["instructions"] = min(b["instructions"], instructions)
+            b["power_per_area"] = min(b["power_per_area"], power_per_area)
+    return make_policy(benchmarks, types_text, ipc_max, margin)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+import argparse
+import fcntl
+import json
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import dse_db
+import dse_func
+import dse_parallel
+import dse_sched
+
+### QUEUE PATHS
+script_dir      = os.path.dirname(os.path.abspath(__file__))
+queue_path      = os.environ.get("DSE_QUEUE", script_dir + "/dse_queue.db")
+tree_lock       = script_dir + "/dse_queue.lock"
+### QUEUE VARS
+heartbeat_every = 60        # s
+stale_after     = 900       # s without a heartbeat before a job is taken back
+max_attempts    = 3
+poll_every      = 10        # s between looks at an empty queue when not draining
+
+schema = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    created     TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    kind        TEXT NOT NULL,
+    run         TEXT NOT NULL,
+    name        TEXT,
+    state       TEXT NOT NULL DEFAULT 'queued',
+    worker      TEXT,
+    claimed     REAL,
+    heartbeat   REAL,
+    finished    TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    result      TEXT,
+    error       TEXT,
+    UNIQUE (kind, run)
+);
+CREATE INDEX IF NOT EXISTS jobs_state_priority ON jobs(state, priority DESC, id);
+CREATE TABLE IF NOT EXISTS originals (
+    root        TEXT PRIMARY KEY,
+    params      TEXT NOT NULL,
+    options     TEXT NOT NULL
+);
+"""
+kinds = ["total", "synth"]
+
+def connect(path=None):
+    conn = sqlite3.connect(path or queue_path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Survive power loss, not just a killed process
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.executescript(schema)
+    return conn
+
+def run_key(run):
+    return json.dumps(run, sort_keys=True)
+
+def submit(conn, run, priority=0, kind="total", name=None):
+    # The same run of the same kind is queued once; done work is never redone
+    if kind not in kinds:
+        raise ValueError(f"job kind must be one of {kinds}")
+    conn.execute("INSERT OR IGNORE INTO jobs (created, priority, kind, run, name) VALUES (?, ?, ?, ?, ?)",
+                 (datetime.now().isoformat(timespec='seconds'), priority, kind, run_key(run), name))
+    row = conn.execute("SELECT id, state FROM jobs WHERE kind = ? AND run = ?", (kind, run_key(run))).fetchone()
+    if row["state"] == 'queued':
+        conn.execute("UPDATE jobs SET priority = MAX(priority, ?) WHERE id = ?", (priority, row["id"]))
+    return row["id"]
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def worker_dead(worker):
+    # Only a missing PID on this host is proof: a PID that exists may have been reused after a reboot or a wrap
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+def requeue_stale(conn):
+    # Jobs of dead workers go back to the queue (after a crash or a reboot), until they ran out of attempts
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for row in conn.execute("SELECT id, worker, heartbeat, attempts FROM jobs WHERE state = 'running'").fetchall():
+            # A dead local PID goes back at once, anything else needs a fresh heartbeat to keep its job
+            fresh = row["heartbeat"] is not None and now - row["heartbeat"] < stale_after
+            if fresh and not worker_dead(row["worker"]):
+                continue
+            if row["attempts"] >= max_attempts:
+                conn.execute("UPDATE jobs SET state = 'failed', error = ?, finished = ? WHERE id = ?",
+                             (f"worker {row['worker']} died {row['attempts']} times", datetime.now().isoformat(timespec='seconds'), row["id"]))
+            else:
+                conn.execute("UPDATE jobs SET state = 'queued', worker = NULL WHERE id = ?", (row["id"],))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+def claim(conn, worker=None):
+    # Highest priority first, oldest first within a priority; two workers never get the same job
+    worker = worker or worker_id()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE state = 'queued' ORDER BY priority DESC, id LIMIT 1").fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute("UPDATE jobs SET state = 'running', worker = ?, claimed = ?, heartbeat = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, now, now, row["id"]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if row is None:
+        return None
+    job = dict(row)
+    job["run"] = json.loads(job["run"])
+    return job
+
+def heartbeat(conn, job_id):
+    conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+def complete(conn, job_id, result):
+    conn.execute("UPDATE jobs SET state = 'done', result = ?, finished = ? WHERE id = ? AND state = 'running'",
+                 (json.dumps(result), datetime.now().isoformat(timespec='seconds'), job_id))
+
+def fail(conn, job_id, error):
+    conn.execute("UPDATE jobs SET state = 'failed', error = ?, finished = ? WHERE id = ? AND state = 'running'",
+                 (error, datetime.now().isoformat(timespec='seconds'), job_id))
+
+def release(conn, job_id):
+    # The worker is known to be gone (e.g. its connection dropped), no need to wait for the heartbeat to go stale
+    conn.execute("UPDATE jobs SET state = 'queued', worker = NULL WHERE id = ? AND state = 'running'", (job_id,))
+
+def retry(conn, job_id=None):
+    sql = "UPDATE jobs SET state = 'queued', worker = NULL, attempts = 0, error = NULL WHERE state = 'failed'"
+    args = []
+    if job_id is not None:
+        sql += " AND id = ?"
+        args.append(job_id)
+    return conn.execute(sql, args).rowcount
+
+def cancel(conn, job_id):
+    return conn.execute("DELETE FROM jobs WHERE id = ? AND state = 'queued'", (job_id,)).rowcount
+
+def counts(conn):
+    return {row["state"]: row["n"] for row in conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+
+### ORIGINAL TYPES.SV / OPTIONS.JSON
+def save_originals(conn, root):
+    # A row left behind means the last worker died with the tree modified: put the saved copy back first
+    row = conn.execute("SELECT * FROM originals WHERE root = ?", (root,)).fetchone()
+    if row is not None:
+        print(f"[QUEUE] restoring types.sv and options.json left modified in {root}")
+        write_originals(root, row["params"], row["options"])
+        return {"params": row["params"], "options": json.loads(row["options"])}
+    with open(os.path.join(root, "pkg/types.sv")) as f:
+        params = f.read()
+    with open(os.path.join(root, "options.json")) as f:
+        options = f.read()
+    conn.execute("INSERT INTO originals (root, params, options) VALUES (?, ?, ?)", (root, params, options))
+    return {"params": params, "options": json.loads(options)}
+
+def write_originals(root, params, options):
+    # Byte for byte what was there, written so a crash here cannot truncate either file
+    for rel, text in [("pkg/types.sv", params), ("options.json", options)]:
+        tmp = os.path.join(root, rel + ".tmp")
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, os.path.join(root, rel))
+
+def restore_originals(conn, root):
+    row = conn.execute("SELECT * FROM originals WHERE root = ?", (root,)).fetchone()
+    if row is None:
+        return
+    write_originals(root, row["params"], row["options"])
+    conn.execute("DELETE FROM originals WHERE root = ?", (root,))
+
+### WORKERS
+def run_job(job, copy, cache=False, pipelined=False):
+    run, name = job["run"], job["name"] or f"q{job['id']}"
+    if job["kind"] == "synth":
+        dse_func.update_options_and_params(run, copy)
+        return dse_func.collect_run_data(run, dse_func.synth_run(name, cache))
+    return dse_func.total_run(run, name, copy, cache, pipelined)
+
+def sandbox_job(job, copy, cache=False, pipelined=False):
+    # One whole job in its own sandbox (dse_farm.py workers run one job at a time)
+    path = dse_parallel.make_sandbox(job["name"] or f"q{job['id']}")
+    dse_func.set_root(path)
+    try:
+        return run_job(job, copy, cache, pipelined)
+    finally:
+        dse_parallel.remove_sandbox(path)
+
+def with_heartbeat(job, fn, *args):
+    # The claim stays ours while a multi-hour stage runs
+    stop = threading.Event()
+    def beat():
+        conn = connect()
+        while not stop.wait(heartbeat_every):
+            heartbeat(conn, job["id"])
+        conn.close()
+    t = threading.Thread(target=beat, daemon=True)
+    t.start()
+    try:
+        return fn(*args)
+    finally:
+        stop.set()
+
+def record(db, job, run_data, copy, out_file):
+    dse_db.record_run(db, job["run"], run_data, job["name"] or f"q{job['id']}", out_file,
+                      dse_db.effective_params(job["run"], copy["params"]))
+    dse_parallel.write_report(out_file, [job["run"]], [job["name"] or f"q{job['id']}"], [run_data])
+
+def work(conn, out_file, cache=False, pipelined=False, drain=True, jobs=1):
+    # jobs == 1 runs in the mp_ooo tree like the other scripts, more runs each job in a sandbox
+    db = dse_db.connect()
+    root = dse_func.root_dir
+    if jobs == 1:
+        lock = open(tree_lock, 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SystemExit(f"another queue worker is running in {root}, use -j N to run in sandboxes")
+        copy = save_originals(conn, root)
+    else:
+        with open(os.path.join(root, "pkg/types.sv")) as f:
+            copy = {"params": f.read()}
+        with open(os.path.join(root, "options.json")) as f:
+            copy["options"] = json.load(f)
+    # SIGTERM (shutdown, kill) unwinds through the restore below like Ctrl-C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: exit(128 + signum))
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    # In sandboxes each job's synth, sim and power are admitted as separate stages by their tokens
+    sched = dse_sched.make_scheduler(pool, None, dse_sched.expected_times(db)) if pool is not None else None
+    running = {}
+    beat = time.time()
+    try:
+        while True:
+            requeue_stale(conn)
+            # Claim only while every queued stage has started, a claimed job counts as running
+            while len(running) < jobs and (sched is None or not sched["queue"]):
+                job = claim(conn)
+                if job is None:
+                    break
+                running[job["id"]] = job
+                if sched is None:
+                    break
+                dse_parallel.submit_run(sched, job, job["run"], job["name"] or f"q{job['id']}", copy, cache=cache,
+                                        pipelined=pipelined, synth_only=job["kind"] == "synth")
+            if not running:
+                if drain:
+                    break
+                time.sleep(poll_every)
+                continue
+            if sched is None:
+                job = running.pop(next(iter(running)))
+                try:
+                    run_data = with_heartbeat(job, run_job, job, copy, cache, pipelined)
+                except Exception as e:
+                    fail(conn, job["id"], repr(e))
+                    continue
+                record(db, job, run_data, copy, out_file)
+                complete(conn, job["id"], run_data)
+                continue
+            for (kind, state), future in dse_sched.wait_any(sched, heartbeat_every):
+                run_data = dse_parallel.advance(sched, kind, state, future)
+                if run_data is None:
+                    continue
+                job = running.pop(state["tag"]["id"])
+                if "error" in run_data:
+                    fail(conn, job["id"], run_data["error"])
+                    continue
+                record(db, job, run_data, copy, out_file)
+                complete(conn, job["id"], run_data)
+            # The claims stay ours while multi-hour stages run
+            if time.time() - beat >= heartbeat_every:
+                for job_id in running:
+                    heartbeat(conn, job_id)
+                beat = time.time()
+    finally:
+        if pool is not None:
+            # Waiting is free once every job is done, and avoids the executor racing interpreter exit
+            pool.shutdown(wait=not running, cancel_futures=True)
+        if jobs == 1:
+            restore_originals(conn, root)
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent DSE job queue")
+    parser.add_argument("--queue", default=None, help=f"queue database (default: {queue_path})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("add", help="queue every run of a runs file")
+    p.add_argument("runs", nargs="?", default=script_dir + "/dse_runs.json")
+    p.add_argument("-p", "--priority", type=int, default=0, help="higher runs first")
+    p.add_argument("-k", "--kind", choices=kinds, default="total")
+    p = sub.add_parser("work", help="run queued jobs, resuming whatever a dead worker left")
+    p.add_argument("-j", "--jobs", type=int, default=1, help="concurrent jobs, more than 1 runs them in sandboxes")
+    p.add_argument("--cache", action="store_true", help="reuse synth/sim/power results from the stage cache")
+    p.add_argument("--pipelined", action="store_true", help="overlap each run's sim with its synth")
+    p.add_argument("--wait", action="store_true", help="keep polling for new jobs instead of exiting when empty")
+    sub.add_parser("status", help="job counts and the unfinished jobs")
+    p = sub.add_parser("retry", help="queue failed jobs again")
+    p.add_argument("id", type=int, nargs="?", default=None)
+    p = sub.add_parser("cancel", help="drop a queued job")
+    p.add_argument("id", type=int)
+    args = parser.parse_args()
+
+    conn = connect(args.queue)
+    if args.cmd == "add":
+        with open(args.runs) as f:
+            runs = json.load(f)["runs"]
+        ids = [submit(conn, run, args.priority, args.kind) for run in runs]
+        print(f"queued {len(ids)} {args.kind} jobs: {ids}")
+    elif args.cmd == "work":
+        dse_func.cdscriptdir()
+        outfilename = "queue_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
+        with open(outfilename, "w") as f:
+            f.write(f'Queue Report:')
+        work(conn, outfilename, args.cache, args.pipelined, not args.wait, args.jobs)
+    elif args.cmd == "status":
+        print(json.dumps(counts(conn)))
+        for row in conn.execute("SELECT id, priority, kind, state, worker, attempts, run, error FROM jobs "
+                                "WHERE state != 'done' ORDER BY state, priority DESC, id"):
+            print(f'{row["id"]:>6} {row["state"]:>8} p{row["priority"]} {row["kind"]} {row["worker"] or ""} '
+                  f'attempts {row["attempts"]} {row["run"]}' + (f' ERROR {row["error"]}' if row["error"] else ''))
+    elif args.cmd == "retry":
+        print(f"requeued {retry(conn, args.id)} jobs")
+    else:
+        print(f"cancelled {cancel(conn, args.id)} jobs")
+
+if __name__ == "__main__":
+    main()
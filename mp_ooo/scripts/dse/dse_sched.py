@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import argparse
+import heapq
+import json
+import math
+import os
+import statistics
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import dse_db
+
+### RESOURCE VARS
+# Licenses the server hands out and what the host has, override any of them with
+# DSE_RESOURCES='{"dc": 4, "vcs": 8, "mem_gb": 256}'. A resource not listed here is unlimited.
+dc_licenses     = int(os.environ.get("DSE_DC_LICENSES", 2))
+vcs_licenses    = int(os.environ.get("DSE_VCS_LICENSES", 2))
+dc_cores        = int(os.environ.get("ECE411_DC_CORES", 4))
+# Held for a stage's whole duration. synthesis.tcl runs with ECE411_DC_CORES cores,
+# power is dc_shell again (plus fsdb2saif), sim is one vcs process.
+demands = {
+    "synth"     : {"dc": 1, "mem_gb": 16, "cores": dc_cores},
+    "sim"       : {"vcs": 1, "mem_gb": 4, "cores": 1},
+    "power"     : {"dc": 1, "mem_gb": 16, "cores": 1},
+}
+# dse_func.synth_sim_overlapped runs sim next to synth, so its stage holds both
+demands["pipelined"] = {k: demands["synth"].get(k, 0) + demands["sim"].get(k, 0)
+                        for k in set(demands["synth"]) | set(demands["sim"])}
+# s, only used until dse_results.db or the scheduler itself has seen the stage run
+default_times = {"synth": 1800, "sim": 300, "power": 600}
+
+def host_mem_gb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // (1024 * 1024)
+    except OSError:
+        pass
+    return math.inf
+
+def default_resources():
+    resources = {"dc": dc_licenses, "vcs": vcs_licenses, "mem_gb": host_mem_gb(), "cores": os.cpu_count()}
+    resources.update(json.loads(os.environ.get("DSE_RESOURCES", "{}")))
+    return resources
+
+def expected_times(conn=None):
+    # Median recorded duration of each stage, so backfill knows what counts as short
+    times = dict(default_times)
+    if conn is not None:
+        for stage in default_times:
+            rows = conn.execute(f"SELECT {stage}_time FROM runs WHERE {stage}_time IS NOT NULL "
+                                f"AND fidelity IS NULL ORDER BY id DESC LIMIT 100").fetchall()
+            if rows:
+                times[stage] = statistics.median(r[0] for r in rows)
+    times["pipelined"] = max(times["synth"], times["sim"])
+    return times
+
+def make_scheduler(pool, resources=None, times=None):
+    # Admits jobs into pool only when the tokens their stage declares are free
+    resources = default_resources() if resources is None else resources
+    return {
+        "pool": pool,
+        "total": dict(resources),
+        "free": dict(resources),
+        "times": expected_times() if times is None else dict(times),
+        "queue": [],            # heap of (priority, seq, job)
+        "running": {},          # future -> job
+        "seq": 0,
+    }
+
+def fits(free, demand):
+    return all(free.get(k, math.inf) >= v for k, v in demand.items())
+
+def take(free, demand, sign=-1):
+    for k, v in demand.items():
+        if k in free:
+            free[k] += sign * v
+
+def stage_demand(stage, total):
+    # A stage asking for more than exists (16 GB on a laptop) gets all of it, and runs alone
+    return {k: min(v, total.get(k, math.inf)) for k, v in demands[stage].items()}
+
+def submit(sched, stage, tag, fn, *args, priority=0):
+    # Queued until the stage's tokens are free; lower priority runs first, then submit order.
+    # tag comes back from wait_any with the job's future.
+    demand = stage_demand(stage, sched["total"])
+    job = {"stage": stage, "tag": tag, "fn": fn, "args": args, "demand": demand}
+    heapq.heappush(sched["queue"], (priority, sched["seq"], job))
+    sched["seq"] += 1
+    admit(sched)
+
+def start(sched, job):
+    take(sched["free"], job["demand"])
+    job["started"] = time.monotonic()
+    job["ends"] = job["started"] + sched["times"][job["stage"]]
+    sched["running"][sched["pool"].submit(job["fn"], *job["args"])] = job
+
+def reservation(sched, demand, now):
+    # When demand can start, assuming running jobs end on time,
+    # and what is left over for others at that moment
+    free = dict(sched["free"])
+    for job in sorted(sched["running"].values(), key=lambda j: j["ends"]):
+        take(free, job["demand"], +1)
+        if fits(free, demand):
+            take(free, demand)
+            return max(job["ends"], now), free
+    return math.inf, free
+
+def admit(sched):
+    # Strict priority order, plus EASY backfill: while the head of the queue waits for tokens
+    # (a synth for a dc license), later jobs start if they fit now and cannot delay it,
+    # i.e. they end before the head's reserved start or only use tokens it will not need.
+    queue = sched["queue"]
+    while queue:
+        job = queue[0][2]
+        if fits(sched["free"], job["demand"]):
+            heapq.heappop(queue)
+            start(sched, job)
+            continue
+        now = time.monotonic()
+        shadow, spare = reservation(sched, job["demand"], now)
+        backfilled = []
+        for entry in sorted(queue)[1:]:
+            other = entry[2]
+            if not fits(sched["free"], other["demand"]):
+                continue
+            if now + sched["times"][other["stage"]] <= shadow:
+                backfilled.append(entry)
+                start(sched, other)
+            elif fits(spare, other["demand"]):
+                take(spare, other["demand"])
+                backfilled.append(entry)
+                start(sched, other)
+        for entry in backfilled:
+            queue.remove(entry)
+        heapq.heapify(queue)
+        return
+
+def pending(sched):
+    return len(sched["queue"]) + len(sched["running"])
+
+def wait_any(sched, timeout=None):
+    # Blocks until at least one job finishes (or timeout s pass), frees its tokens and admits more.
+    # Returns [(tag, future)] of the finished jobs.
+    if not sched["running"]:
+        if sched["queue"]:
+            raise RuntimeError("queued jobs can never be admitted")
+        return []
+    done, _ = wait(sched["running"], timeout=timeout, return_when=FIRST_COMPLETED)
+    finished = []
+    for future in done:
+        job = sched["running"].pop(future)
+        take(sched["free"], job["demand"], +1)
+        # Later backfill decisions use what this host actually takes
+        took = time.monotonic() - job["started"]
+        sched["times"][job["stage"]] = (sched["times"][job["stage"]] + took) / 2
+        finished.append((job["tag"], future))
+    admit(sched)
+    return finished
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the resource tokens and stage demands the DSE scheduler uses")
+    parser.parse_args()
+    resources = default_resources()
+    times = expected_times(dse_db.connect())
+    print("resources:")
+    for k, v in resources.items():
+        print(f"\t{k}: {v}")
+    print("stages:")
+    for stage, demand in demands.items():
+        print(f"\t{stage}: {json.dumps(demand, sort_keys=True)}, ~{times[stage]:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import dse_cache
+import dse_db
+import dse_func
+import dse_parallel
+import dse_params
+import dse_sched
+
+### SUITE VARS
+# The released leaderboard benchmarks, see docs/COMPETITION.md
+benchmarks = [
+    "../testcode/coremark_im.elf",
+    "../testcode/cp3_release_benches/aes_sha.c",
+    "../testcode/cp3_release_benches/fft.c",
+    "../testcode/cp3_release_benches/mergesort.c",
+    "../testcode/additional_testcases/compression_im.elf"
+]
+first_place_points  = 40
+# What power needs from synth in a benchmark sandbox
+synth_outputs       = ["outputs", "reports"]
+
+def design_synth(run, name, copy, cache=False):
+    # Runs inside a pool worker: one synth per design point, shared by every benchmark
+    path = dse_parallel.make_sandbox(name)
+    dse_func.set_root(path)
+    try:
+        dse_func.update_options_and_params(run, copy)
+        synth_data = dse_func.synth_run(name, cache)
+    except Exception:
+        dse_parallel.remove_sandbox(path)
+        raise
+    return path, synth_data
+
+def bench_sandbox(design_path, name):
+    # Own sim dir per benchmark, synth.ddc from the design point's sandbox
+    path = dse_parallel.make_sandbox(name, root=design_path)
+    for d in synth_outputs:
+        src = os.path.join(design_path, "synth", d)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(path, "synth", d), copy_function=dse_cache.reflink_copy,
+                            dirs_exist_ok=True)
+    return path
+
+def bench_sim(run, design_path, name, cache=False):
+    # Runs inside a pool worker: sim of one benchmark against an already synthesized design.
+    # Power is its own stage (it holds a dc license, not a vcs one) and reuses this sandbox.
+    path = bench_sandbox(design_path, name)
+    dse_func.set_root(path)
+    try:
+        sim_data = dse_func.sim_run(run, name, cache, dse_func.sim_reusable(run, cache))
+    except Exception:
+        dse_parallel.remove_sandbox(path)
+        raise
+    return path, sim_data
+
+def bench_power(run, synth_data, sim_data, path, name, cache=False, keep=False):
+    # Runs inside a pool worker: power from the dump bench_sim left in path
+    dse_func.set_root(path)
+    try:
+        power_data = dse_func.power_run(name, cache, run["prog"])
+        run_data = dse_func.collect_run_data(run, synth_data, sim_data, power_data)
+    finally:
+        if not keep:
+            dse_parallel.remove_sandbox(path)
+    run_data["sandbox"] = path if keep else None
+    return run_data
+
+def geomean(scores):
+    if not scores or any(s is None or s <= 0 for s in scores):
+        return None
+    return math.exp(sum(math.log(s) for s in scores) / len(scores))
+
+def rank_points(score, field):
+    # 40 - (rank - 1) on one benchmark's leaderboard, nothing for a failed benchmark
+    if score is None:
+        return 0
+    rank = 1 + sum(1 for s in field if s is not None and s < score)
+    return max(first_place_points - (rank - 1), 0)
+
+def aggregate(results, benches, field=None):
+    # Scores the other design points of the suite when no leaderboard field is given
+    names = [dse_db.benchmark_name(b) for b in benches]
+    for i, result in enumerate(results):
+        scores = [result["benchmarks"].get(n, {}).get("score") for n in names]
+        result["geomean"] = geomean(scores)
+        points = 0
+        for n, score in zip(names, scores):
+            if field is not None:
+                others = field.get(n, [])
+            else:
+                others = [r["benchmarks"].get(n, {}).get("score") for j, r in enumerate(results) if j != i]
+            points += rank_points(score, others)
+        result["points"] = points
+    return results
+
+def suite_run(runs, copy, benches=None, max_workers=None, names=None, keep=False, cache=False, field=None,
+              resources=None):
+    # Every design point synthesizes once, then each benchmark's sim and power run as their own stages.
+    # dse_sched admits a stage only when its licenses, memory and cores are free,
+    # and backfills short sims around waiting synths.
+    benches = benchmarks if benches is None else benches
+    if names is None:
+        names = [str(i) for i in range(len(runs))]
+    if len(set(names)) != len(names):
+        raise ValueError("Run names must be unique, they name the sandboxes and reports")
+    max_workers = max_workers or os.cpu_count()
+    model = dse_params.load_model(copy["params"])
+    results = [{"name": name, "synth": None, "benchmarks": {}, "error": None} for name in names]
+    design_paths = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        sched = dse_sched.make_scheduler(pool, resources, dse_sched.expected_times(dse_db.connect()))
+        for i, (run, name) in enumerate(zip(runs, names)):
+            errors, warnings = dse_params.validate(model, run["params"] or {})
+            if errors:
+                results[i]["error"] = "invalid params: " + "; ".join(errors)
+                continue
+            # Earlier design points first, so whole designs finish instead of every design half done
+            dse_sched.submit(sched, "synth", ("synth", i, None), design_synth, run, name, copy, cache, priority=i)
+        while dse_sched.pending(sched):
+            for (kind, i, prog), future in dse_sched.wait_any(sched):
+                bench = dse_db.benchmark_name(prog)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    if kind == "synth":
+                        results[i]["error"] = repr(e)
+                    else:
+                        results[i]["benchmarks"][bench] = {"clock": runs[i]["clock"], "error": repr(e)}
+                    continue
+                run = dict(runs[i], prog=prog)
+                if kind == "power":
+                    results[i]["benchmarks"][bench] = value
+                elif kind == "sim":
+                    path, sim_data = value
+                    dse_sched.submit(sched, "power", ("power", i, prog), bench_power, run, results[i]["synth"],
+                                     sim_data, path, f"{names[i]}_{bench}", cache, keep, priority=i)
+                else:
+                    design_paths[i], synth_data = value
+                    results[i]["synth"] = synth_data
+                    if synth_data["timingmet"] != True:
+                        continue
+                    for prog in benches:
+                        dse_sched.submit(sched, "sim", ("sim", i, prog), bench_sim, dict(runs[i], prog=prog),
+                                         design_paths[i], f"{names[i]}_{dse_db.benchmark_name(prog)}", cache,
+                                         priority=i)
+    for i, path in design_paths.items():
+        if not keep:
+            dse_parallel.remove_sandbox(path)
+        results[i]["sandbox"] = path if keep else None
+    return aggregate(results, benches, field)
+
+def write_report(out_file, runs, results, benches=None):
+    benches = benchmarks if benches is None else benches
+    with open(out_file, "a") as f:
+        for run, result in zip(runs, results):
+            f.write(f'\n')
+            f.write(f"\nDesign {result['name']}")
+            f.write(f'\nclock: {run["clock"]}')
+            f.write(f'\nungroup: {run["ungroup"]}')
+            f.write(f'\ngate_clock: {run["gate_clock"]}')
+            if (not run['params']):
+                f.write(f'\nparams: none')
+            else:
+                f.write(f'\nparams: ')
+                for key in run['params']:
+                    f.write(f'\n\t{key}: {run["params"][key]}')
+            if result["error"] is not None:
+                f.write(f'\n -> ERROR: {result["error"]}')
+            synth_data = result["synth"] or {}
+            for key in ["area", "slack", "timingmet"]:
+                if key in synth_data:
+                    f.write(f'\n -> {key.upper()}: {synth_data[key]}')
+            for prog in benches:
+                bench = dse_db.benchmark_name(prog)
+                if bench not in result["benchmarks"]:
+                    continue
+                run_data = result["benchmarks"][bench]
+                f.write(f'\n -> {bench}:')
+                for key in ["delay", "ipc", "power", "score", "error"]:
+                    if key in run_data:
+                        f.write(f' {key.upper()}: {run_data[key]}')
+            f.write(f'\n -> GEOMEAN: {result["geomean"]}')
+            f.write(f'\n -> POINTS: {result["points"]}')
+
+def record_results(db, runs, results, copy, sweep, benches=None):
+    # One row per benchmark, so dse_db.py best ranks them like the leaderboard does
+    benches = benchmarks if benches is None else benches
+    for run, result in zip(runs, results):
+        params = dse_db.effective_params(run, copy["params"])
+        if not result["benchmarks"]:
+            # Failed timing (or never synthesized), one row says it for every benchmark
+            run_data = result["synth"] or {"timingmet": 'Error', "error": result["error"]}
+            dse_db.record_run(db, run, run_data, result["name"], sweep, params)
+            continue
+        for prog in benches:
+            bench = dse_db.benchmark_name(prog)
+            if bench in result["benchmarks"]:
+                dse_db.record_run(db, dict(run, prog=prog), result["benchmarks"][bench],
+                                  f"{result['name']}_{bench}", sweep, params)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every design point in dse_runs.json against the whole benchmark suite")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="max concurrent stages (default: cpu count)")
+    parser.add_argument("--keep", action="store_true", help="keep sandboxes after the runs finish")
+    parser.add_argument("--cache", action="store_true", help="reuse synth/sim/power results from the stage cache")
+    parser.add_argument("--bench", action="append", default=None, help="benchmark program, repeatable (default: the released suite)")
+    parser.add_argument("--field", default=None,
+                        help="json file mapping benchmark -> other teams' scores, to estimate leaderboard points")
+    args = parser.parse_args()
+
+    runs = dse_func.load_runs()
+    copy = dse_func.make_copy_options_and_params()
+    benches = args.bench or benchmarks
+    field = None
+    if args.field:
+        with open(args.field) as f:
+            field = json.load(f)
+
+    sweep = "suite_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    outfilename = sweep + ".log"
+    with open(outfilename, "w") as f:
+        f.write(f'Suite Report ({len(runs)} designs, {len(benches)} benchmarks):')
+
+    names = [f"{sweep}_{i}" for i in range(len(runs))]
+    results = suite_run(runs, copy, benches, args.jobs, names, args.keep, args.cache, field)
+    dse_func.cdscriptdir()
+    write_report(outfilename, runs, results, benches)
+    record_results(dse_db.connect(), runs, results, copy, sweep, benches)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import math
+import random
+
+import dse_db
+import dse_func
+
+### SURROGATE VARS
+# Gaussian-process regression in plain Python: the fit is O(n^3), so only this many runs are used
+max_points      = 250
+min_points      = 12
+length_scales   = [0.5, 1.0, 2.0]       # over features scaled to [0, 1], picked by marginal likelihood
+noise_levels    = [1e-4, 1e-2, 1e-1]    # fraction of the (standardized) target variance
+# z of a one-sided ~97.5% bound, "confidently bad" has to hold at this bound
+confidence      = 2.0
+targets         = ["area", "slack", "ipc", "score"]
+
+def cholesky(a):
+    n = len(a)
+    L = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        Li = L[i]
+        for j in range(i + 1):
+            Lj = L[j]
+            s = a[i][j] - sum(Li[k] * Lj[k] for k in range(j))
+            if i == j:
+                if s <= 0:
+                    raise ValueError("kernel matrix is not positive definite")
+                Li[i] = math.sqrt(s)
+            else:
+                Li[j] = s / Lj[j]
+    return L
+
+def solve_lower(L, b):
+    x = []
+    for i, Li in enumerate(L):
+        x.append((b[i] - sum(Li[k] * x[k] for k in range(i))) / Li[i])
+    return x
+
+def solve_upper_t(L, b):
+    # Solves L^T x = b
+    n = len(L)
+    x = [0.0] * n
+    for i in reversed(range(n)):
+        x[i] = (b[i] - sum(L[k][i] * x[k] for k in range(i + 1, n))) / L[i][i]
+    return x
+
+def rbf(a, b, length):
+    return math.exp(-sum((p - q) ** 2 for p, q in zip(a, b)) / (2 * length * length))
+
+def fit(X, y, keys=None):
+    # X: list of feature rows, y: targets; returns a model dict usable by predict()
+    lo = [min(col) for col in zip(*X)]
+    hi = [max(col) for col in zip(*X)]
+    Xs = [scale(x, lo, hi) for x in X]
+    mean = sum(y) / len(y)
+    std = math.sqrt(sum((v - mean) ** 2 for v in y) / len(y)) or 1.0
+    ys = [(v - mean) / std for v in y]
+    best = None
+    for length in length_scales:
+        K = [[rbf(a, b, length) for b in Xs] for a in Xs]
+        for noise in noise_levels:
+            Kn = [[K[i][j] + (noise if i == j else 0.0) for j in range(len(Xs))] for i in range(len(Xs))]
+            try:
+                L = cholesky(Kn)
+            except ValueError:
+                continue
+            alpha = solve_upper_t(L, solve_lower(L, ys))
+            # log marginal likelihood, without the constant
+            lml = -0.5 * sum(a * b for a, b in zip(ys, alpha)) - sum(math.log(L[i][i]) for i in range(len(L)))
+            if best is None or lml > best["lml"]:
+                best = {"lml": lml, "length": length, "noise": noise, "L": L, "alpha": alpha}
+    if best is None:
+        raise ValueError("could not fit the surrogate")
+    return {"keys": keys, "X": Xs, "lo": lo, "hi": hi, "mean": mean, "std": std, "n": len(y),
+            "length": best["length"], "noise": best["noise"], "L": best["L"], "alpha": best["alpha"]}
+
+def scale(x, lo, hi):
+    return [(v - l) / (h - l) if h > l else 0.0 for v, l, h in zip(x, lo, hi)]
+
+def predict(model, x):
+    # (mean, standard deviation) in the target's own units
+    xs = scale(x, model["lo"], model["hi"])
+    k = [rbf(xs, xi, model["length"]) for xi in model["X"]]
+    mean = sum(a * b for a, b in zip(k, model["alpha"]))
+    v = solve_lower(model["L"], k)
+    var = max(1.0 + model["noise"] - sum(a * a for a in v), 1e-12)
+    return model["mean"] + model["std"] * mean, model["std"] * math.sqrt(var)
+
+def config_features(config, keys, params=None):
+    # config: knob -> value incl. "clock"; params fills knobs the config leaves at their default
+    params = params or {}
+    return [float(config["clock"] if k == "clock" else config.get(k, params.get(k))) for k in keys]
+
+def training_rows(conn, benchmark=None):
+    sql = "SELECT * FROM runs WHERE area IS NOT NULL"
+    args = []
+    if benchmark is not None:
+        sql += " AND (benchmark = ? OR score IS NULL)"
+        args.append(benchmark)
+    # Newest runs last, they describe the current RTL best
+    return [dse_db.to_dict(row) for row in conn.execute(sql + " ORDER BY id", args)]
+
+def target_value(row, target):
+    if target == "score":
+        # Fitted in log space, scores span orders of magnitude
+        return math.log(row["score"]) if row["score"] else None
+    return row[target]
+
+def dataset(rows, keys, target, benchmark=None):
+    # (features, value) pairs, one per design point: a suite writes the same synth into every benchmark's row
+    points = {}
+    for row in rows:
+        if target in ["ipc", "score"] and benchmark is not None and row["benchmark"] != benchmark:
+            continue
+        # A cheaper rung's synth is real, its sim was cut short or a different program
+        if target == "ipc" and row.get("fidelity"):
+            continue
+        value = target_value(row, target)
+        x = config_features(dict(row["params"], clock=row["clock"]), keys)
+        if value is None or None in x:
+            continue
+        points.pop(tuple(x), None)
+        points[tuple(x)] = value
+    return [(list(x), value) for x, value in points.items()][-max_points:]
+
+def train(conn, keys, benchmark=None, which=None):
+    # One model per target from the newest runs that have it; a target without enough runs is left out
+    rows = training_rows(conn, benchmark)
+    models = {}
+    for target in (which or targets):
+        data = dataset(rows, keys, target, benchmark)
+        if len(data) >= min_points:
+            models[target] = fit([d[0] for d in data], [d[1] for d in data], keys)
+    return models
+
+def estimate(models, config, params=None):
+    # target -> (mean, std) for every target that has a model
+    out = {}
+    for target, model in models.items():
+        out[target] = predict(model, config_features(config, model["keys"], params))
+    return out
+
+def verdict(est, best_score=None, k=confidence):
+    # A reason when the config is confidently bad, else None
+    if "slack" in est:
+        mean, std = est["slack"]
+        if mean + k * std < 0:
+            return f"predicted slack {mean:.3f} +- {std:.3f} ns misses timing"
+    if "score" in est and best_score:
+        mean, std = est["score"]
+        if mean - k * std > math.log(best_score):
+            return f"predicted score {math.exp(mean):.4g} (>= {math.exp(mean - k * std):.4g}) is worse than best {best_score:.4g}"
+    return None
+
+def rank(models, configs, best_score=None, params=None, k=confidence):
+    # Keeps configs that may still win, most promising (lowest optimistic score) first
+    kept, skipped = [], []
+    for config in configs:
+        est = estimate(models, config, params)
+        reason = verdict(est, best_score, k)
+        if reason is not None:
+            skipped.append((config, reason))
+            continue
+        if "score" in est:
+            mean, std = est["score"]
+            kept.append((mean - k * std, config))
+        else:
+            kept.append((0.0, config))
+    kept.sort(key=lambda c: c[0])
+    return [c for _, c in kept], skipped
+
+def cross_validate(conn, keys, benchmark=None, folds=5, seed=0):
+    # Held-out RMSE and how often the truth fell inside mean +- confidence*std, per target
+    rows = training_rows(conn, benchmark)
+    report = {}
+    for target in targets:
+        data = dataset(rows, keys, target, benchmark)
+        if len(data) < min_points:
+            continue
+        random.Random(seed).shuffle(data)
+        errors, covered = [], 0
+        for f in range(folds):
+            test = data[f::folds]
+            train_set = [d for i, d in enumerate(data) if i % folds != f]
+            model = fit([d[0] for d in train_set], [d[1] for d in train_set], keys)
+            for x, y in test:
+                mean, std = predict(model, x)
+                errors.append((mean - y) ** 2)
+                covered += abs(mean - y) <= confidence * std
+        report[target] = {"n": len(data), "rmse": math.sqrt(sum(errors) / len(errors)), "coverage": covered / len(data)}
+    return report
+
+def main():
+    import dse_optimize
+    parser = argparse.ArgumentParser(description="Predict area, slack, IPC and score from types.sv knobs and the clock")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("-b", "--benchmark", default="coremark_im")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("predict", help="e.g. predict clock=1800 NUM_ROB_ENTRIES=16")
+    p.add_argument("conds", nargs="+")
+    sub.add_parser("cv", help="cross-validated error of each model")
+    args = parser.parse_args()
+
+    conn = dse_db.connect(args.db)
+    keys = list(dse_optimize.default_space)
+    if args.cmd == "cv":
+        print(json.dumps(cross_validate(conn, keys, args.benchmark), indent=4))
+        return
+    config = {}
+    for c in args.conds:
+        key, _, value = c.partition("=")
+        config[key] = float(value)
+    config.setdefault("clock", dse_optimize.base_run["clock"])
+    base = dse_db.effective_params(dse_optimize.base_run, dse_func.make_copy_options_and_params()["params"])
+    models = train(conn, keys, args.benchmark)
+    for target, (mean, std) in estimate(models, config, base).items():
+        if target == "score":
+            print(f"{target:>6}: {math.exp(mean):.6g} (x/ {math.exp(std):.3g})")
+        else:
+            print(f"{target:>6}: {mean:.6g} +- {std:.3g}")
+    best = conn.execute("SELECT MIN(score) FROM runs WHERE benchmark = ?", (args.benchmark,)).fetchone()[0]
+    print(f"verdict: {verdict(estimate(models, config, base), best) or 'worth running'}")
+
+if __name__ == "__main__":
+    main()
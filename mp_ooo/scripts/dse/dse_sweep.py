@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+import argparse
+import itertools
+import json
+import random
+
+import dse_db
+import dse_func
+import dse_params
+
+### SWEEP VARS
+# Keys of a run that are not types.sv localparams
+run_keys = ["clock", "ungroup", "gate_clock", "prog"]
+methods = ["grid", "random", "lhs", "sobol"]
+# Sobol direction numbers (Joe & Kuo, new-joe-kuo-6.21201): degree s, coefficients a, initial m_1..m_s
+# of dimensions 2..21; dimension 1 is the van der Corput sequence
+sobol_table = [
+    (1, 0,  [1]),
+    (2, 1,  [1, 3]),
+    (3, 1,  [1, 3, 1]),
+    (3, 2,  [1, 1, 1]),
+    (4, 1,  [1, 1, 3, 3]),
+    (4, 4,  [1, 3, 5, 13]),
+    (5, 2,  [1, 1, 5, 5, 17]),
+    (5, 4,  [1, 1, 5, 5, 5]),
+    (5, 7,  [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1,  [1, 3, 3, 9, 7, 49]),
+    (6, 13, [1, 1, 1, 15, 21, 21]),
+    (6, 16, [1, 3, 1, 13, 27, 49]),
+    (6, 19, [1, 1, 1, 15, 7, 5]),
+    (6, 22, [1, 3, 1, 15, 13, 25]),
+    (6, 25, [1, 1, 5, 5, 19, 61]),
+    (7, 1,  [1, 3, 7, 11, 23, 15, 103]),
+    (7, 4,  [1, 3, 7, 13, 13, 15, 69]),
+]
+sobol_bits = 32
+
+# A spec, e.g. dse_sweep.json:
+# {
+#     "base"        : { "clock": 1750, "ungroup": false, "gate_clock": true, "prog": "...", "params": {} },
+#     "space"       : { "NUM_ROB_ENTRIES": [8, 16, 32], "clock": {"range": [1400, 2400], "step": 50} },
+#     "sampling"    : "grid" or { "method": "random" | "lhs" | "sobol", "count": 256, "seed": 0 },
+#     "constraints" : [ "ISQ_ALU_SIZE <= NUM_ROB_ENTRIES / 2", "is_pow2(NUM_ROB_ENTRIES)" ],
+#     "skip_existing": true
+# }
+# Constraints are SV-style expressions (dse_params) over every effective types.sv value plus the run keys.
+
+def load_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+    sampling = spec.get("sampling", "grid")
+    if isinstance(sampling, str):
+        sampling = {"method": sampling}
+    if sampling["method"] not in methods:
+        raise ValueError(f"sampling method must be one of {methods}")
+    if sampling["method"] != "grid" and "count" not in sampling:
+        raise ValueError(f"{sampling['method']} sampling needs a count")
+    spec["sampling"] = sampling
+    spec["space"] = {key: axis_values(key, axis) for key, axis in spec["space"].items()}
+    spec.setdefault("constraints", [])
+    spec.setdefault("skip_existing", True)
+    return spec
+
+def axis_values(key, axis):
+    # A list of values, or {"range": [lo, hi], "step": s} with hi included
+    if isinstance(axis, list):
+        values = axis
+    elif "range" in axis:
+        lo, hi = axis["range"]
+        values = list(range(lo, hi + 1, axis.get("step", 1)))
+    else:
+        raise ValueError(f"{key}: give a list of values or a range")
+    if not values:
+        raise ValueError(f"{key} has no values")
+    return values
+
+def space_size(space):
+    size = 1
+    for values in space.values():
+        size *= len(values)
+    return size
+
+### SAMPLERS
+# Each yields index tuples into the axes, never the whole space
+
+def grid(sizes, sampling):
+    return itertools.product(*[range(n) for n in sizes])
+
+def random_points(sizes, sampling):
+    rng = random.Random(sampling.get("seed"))
+    for _ in range(sampling["count"]):
+        yield tuple(rng.randrange(n) for n in sizes)
+
+def lhs(sizes, sampling):
+    # Latin hypercube: every axis is cut into count strata and each stratum is used exactly once
+    rng = random.Random(sampling.get("seed"))
+    count = sampling["count"]
+    strata = []
+    for _ in sizes:
+        column = list(range(count))
+        rng.shuffle(column)
+        strata.append(column)
+    for i in range(count):
+        yield tuple(min(int((strata[d][i] + rng.random()) / count * n), n - 1) for d, n in enumerate(sizes))
+
+def sobol_directions(dims):
+    directions = [[1 << (sobol_bits - 1 - k) for k in range(sobol_bits)]]
+    for s, a, m in sobol_table[:dims - 1]:
+        v = [m[k] << (sobol_bits - 1 - k) for k in range(s)]
+        for k in range(s, sobol_bits):
+            x = v[k - s] ^ (v[k - s] >> s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    x ^= v[k - j]
+            v.append(x)
+        directions.append(v)
+    return directions
+
+def sobol(sizes, sampling):
+    # Gray-code Sobol sequence; a count that is a power of two keeps it balanced.
+    # A seed XORs each axis with a random digital shift, which keeps that balance.
+    if len(sizes) > len(sobol_table) + 1:
+        raise ValueError(f"sobol sampling supports up to {len(sobol_table) + 1} axes, use lhs")
+    directions = sobol_directions(len(sizes))
+    seed = sampling.get("seed")
+    rng = random.Random(seed)
+    shift = [rng.getrandbits(sobol_bits) if seed is not None else 0 for _ in sizes]
+    x = [0] * len(sizes)
+    for i in range(sampling["count"]):
+        yield tuple(min(int((x[d] ^ shift[d]) / 2**sobol_bits * n), n - 1) for d, n in enumerate(sizes))
+        # Flip the direction number of the lowest zero bit of i
+        c = (~i & (i + 1)).bit_length() - 1
+        for d in range(len(sizes)):
+            x[d] ^= directions[d][c]
+
+samplers = {"grid": grid, "random": random_points, "lhs": lhs, "sobol": sobol}
+
+### EXPANSION
+
+def point_run(base, keys, values):
+    run = json.loads(json.dumps(base))
+    run["params"] = dict(run.get("params") or {})
+    for key, value in zip(keys, values):
+        if key in run_keys:
+            run[key] = value
+        else:
+            run["params"][key] = value
+    return run
+
+def existing_keys(conn):
+    # Design points already fully run in dse_results.db, in the form point_key gives
+    return {(row["benchmark"], float(row["clock"]), bool(row["ungroup"]), bool(row["gate_clock"]), row["params"])
+            for row in conn.execute("SELECT benchmark, clock, ungroup, gate_clock, params FROM runs "
+                                    "WHERE fidelity IS NULL")}
+
+def point_key(run, values):
+    return (dse_db.benchmark_name(run.get("prog")), float(run["clock"]), bool(run.get("ungroup")),
+            bool(run.get("gate_clock")), json.dumps(values, sort_keys=True))
+
+def expand(spec, model, existing=None, stats=None):
+    # Lazily yields every run of the spec that is legal, satisfies the constraints and is new.
+    # stats, if given, counts why points were dropped.
+    stats = {} if stats is None else stats
+    for k in ["sampled", "invalid", "constrained", "duplicate", "existing", "kept"]:
+        stats.setdefault(k, 0)
+    keys = list(spec["space"])
+    axes = [spec["space"][k] for k in keys]
+    seen = set()
+    sampling = spec["sampling"]
+    for index in samplers[sampling["method"]]([len(a) for a in axes], sampling):
+        stats["sampled"] += 1
+        run = point_run(spec["base"], keys, [axis[i] for axis, i in zip(axes, index)])
+        errors, warnings = dse_params.validate(model, run["params"])
+        if errors:
+            stats["invalid"] += 1
+            continue
+        values = dse_params.evaluate(model, run["params"])
+        env = dict(values, **{k: int(run[k]) for k in ["clock", "ungroup", "gate_clock"]})
+        if not all(dse_params.eval_expr(c, env) for c in spec["constraints"]):
+            stats["constrained"] += 1
+            continue
+        key = point_key(run, values)
+        # Random, LHS and Sobol draws can land on the same grid point twice
+        if key in seen:
+            stats["duplicate"] += 1
+            continue
+        seen.add(key)
+        if existing is not None and key in existing:
+            stats["existing"] += 1
+            continue
+        stats["kept"] += 1
+        yield run
+
+def expand_spec(spec, conn=None, stats=None, params_text=None):
+    model = dse_params.load_model(params_text)
+    existing = None
+    if spec["skip_existing"]:
+        existing = existing_keys(conn if conn is not None else dse_db.connect())
+    return expand(spec, model, existing, stats)
+
+def main():
+    import dse_queue
+    parser = argparse.ArgumentParser(description="Expand a sweep spec into runs, lazily")
+    parser.add_argument("spec", help="sweep spec json")
+    parser.add_argument("--db", default=None)
+    parser.add_argument("-n", "--limit", type=int, default=None, help="stop after this many runs")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("count", help="how many runs the spec expands to, and why the others were dropped")
+    p = sub.add_parser("runs", help="write the runs as a dse_runs.json")
+    p.add_argument("-o", "--output", default="dse_runs.json")
+    p = sub.add_parser("queue", help="stream the runs into dse_queue.py")
+    p.add_argument("--queue", default=None)
+    p.add_argument("-p", "--priority", type=int, default=0)
+    p.add_argument("-k", "--kind", choices=dse_queue.kinds, default="total")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    # Constraints see the params as types.sv has them now
+    params_text = dse_func.make_copy_options_and_params()["params"]
+    stats = {}
+    runs = itertools.islice(expand_spec(spec, dse_db.connect(args.db), stats, params_text), args.limit)
+    if args.cmd == "count":
+        count = sum(1 for _ in runs)
+    elif args.cmd == "runs":
+        runs = list(runs)
+        count = len(runs)
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs}, f, indent=4)
+    else:
+        conn = dse_queue.connect(args.queue)
+        count = 0
+        for run in runs:
+            dse_queue.submit(conn, run, args.priority, args.kind)
+            count += 1
+    print(f"space: {space_size(spec['space'])} points, sampling: {spec['sampling']['method']}")
+    print(", ".join(f"{k}: {v}" for k, v in stats.items()))
+    print(f"{count} runs")
+
+if __name__ == "__main__":
+    main()
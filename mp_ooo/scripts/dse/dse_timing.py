@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import fcntl
+import hashlib
+import json
+import os
+
+import dse_cache
+import dse_func
+
+### TIMING CLOSURE VARS
+fmax_file   = dse_func.script_dir + "/fmax.json"
+tolerance   = 20    # ps, stop once the best passing period is this close to Fmax
+max_iters   = 7
+
+def fmax_key(root):
+    # Same RTL, params and synth options except the clock -> same Fmax
+    with open(os.path.join(root, "options.json")) as f:
+        options = json.load(f)
+    synth = dict(options["synth"])
+    h = hashlib.sha256(b"fmax")
+    h.update(dse_cache.design_hash(root).encode())
+    h.update(json.dumps(synth, sort_keys=True).encode())
+    return h.hexdigest()
+
+def load_fmax():
+    if not os.path.isfile(fmax_file):
+        return {}
+    with open(fmax_file) as f:
+        return json.load(f)
+
+def save_fmax(key, clock, slack):
+    # Several sandboxes may finish at once, serialize the read-modify-write
+    with open(fmax_file + ".lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        table = load_fmax()
+        old = table.get(key)
+        if old is None or clock < old["clock"]:
+            table[key] = {"clock": clock, "slack": slack}
+            with open(fmax_file + ".tmp", 'w') as f:
+                json.dump(table, f, indent=4)
+            os.replace(fmax_file + ".tmp", fmax_file)
+
+def predict_clock(history, passing, failing, margin):
+    # slack is in ns (the sdc converts the ps period), clock in ps
+    clock, slack = history[-1]
+    guess = clock - 1000 * slack + margin
+    if len(history) >= 2:
+        last_clock, last_slack = history[-2]
+        if slack != last_slack and clock != last_clock:
+            # Secant on the last two synths, DC's slack is not exactly 1:1 with the period
+            guess = clock - (1000 * slack - margin) * (clock - last_clock) / (1000 * (slack - last_slack))
+    if passing is not None and failing is not None:
+        if not failing[0] < guess < passing[0]:
+            guess = (failing[0] + passing[0]) / 2
+    elif passing is not None and guess >= passing[0]:
+        guess = passing[0] - tolerance
+    elif failing is not None and guess <= failing[0]:
+        guess = failing[0] + max(tolerance, -1000 * failing[1])
+    return guess
+
+def timing_closure(run, copy, name="tc", out_file=None, cache=False, margin=0, tol=None, iters=None, warm=False):
+    # warm: every synth after the first is an incremental compile from the closest clock tried so far
+    tol = tolerance if tol is None else tol
+    iters = max_iters if iters is None else iters
+    run = dict(run)
+    dse_func.update_options_and_params(run, copy)
+    key = fmax_key(dse_func.root_dir)
+    known = load_fmax().get(key)
+    clock = dse_func.round_clock(known["clock"] if known else run["clock"])
+
+    history = []
+    tried = set()
+    passing = None      # (clock, slack) of the fastest period that met timing
+    failing = None      # (clock, slack) of the slowest period that did not
+    for i in range(iters):
+        run["clock"] = clock
+        tried.add(clock)
+        dse_func.update_options_and_params(run, copy)
+        synth_data = dse_func.synth_run(f"{name}{i}", cache, warm)
+        slack = synth_data["slack"]
+        met = synth_data["timingmet"]
+        if out_file is not None:
+            with open(out_file, "a") as f:
+                f.write(f'\n[{name}{i}] clock: {clock} -> SLACK: {slack} TIMING MET: {met}')
+                if synth_data.get("warm"):
+                    f.write(f' WARM: {synth_data["warm"]}')
+        if slack is None or not isinstance(met, bool):
+            break
+        history.append((clock, slack))
+        if met and (passing is None or clock < passing[0]):
+            passing = (clock, slack)
+        if not met and (failing is None or clock > failing[0]):
+            failing = (clock, slack)
+
+        if passing is not None and 1000 * passing[1] - margin <= tol:
+            break
+        if passing is not None and failing is not None and passing[0] - failing[0] <= tol:
+            break
+        clock = dse_func.round_clock(predict_clock(history, passing, failing, margin))
+        if clock in tried:
+            if passing is None or failing is None:
+                break
+            clock = dse_func.round_clock((passing[0] + failing[0]) / 2)
+            if clock in tried:
+                break
+
+    if passing is not None:
+        save_fmax(key, passing[0], passing[1])
+    return {
+        "clock": passing[0] if passing else None,
+        "slack": passing[1] if passing else None,
+        "synths": len(history),
+        "history": history,
+    }
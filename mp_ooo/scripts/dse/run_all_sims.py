@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
-import re
 from datetime import datetime
-from dse_func import sim_run, make_copy_options_and_params, update_options_and_params
+from dse_func import make_copy_options_and_params, cdscriptdir
+from dse_suite import suite_run, write_report, record_results
+from dse_db import connect
 
 run =       {
     "clock" : 2000,
@@ -21,29 +22,18 @@ tbs = [
 ]
 
 copy = make_copy_options_and_params()
-update_options_and_params(run, copy)
+
+db = connect()
 
 # Create output file
 outfilename = "all_sims_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
 with open(outfilename, "w") as f:
     f.write(f'Report:')
 
-for tb in tbs:
-
-    match = re.search(r'[^/\\]+$', tb)
-    if match:
-        name = match.group(0)
-    
-    run["prog"] = tb
-
-    sim_data = sim_run(run, name)
-
-    # record the data
-    with open(outfilename, "w") as f:
-        f.write(f'\n')
-        f.write(f"\nStarting run {name}")
-        f.write(f'\n -> DELAY: {sim_data["delay"]}')
-        f.write(f'\n -> IPC: {sim_data["ipc"]}')
-
-
+# One synth, then every benchmark's sim + power in its own sandbox, all at once
+results = suite_run([run], copy, tbs, names=["all_sims"])
 
+# record the data
+cdscriptdir()
+write_report(outfilename, [run], results, tbs)
+record_results(db, [run], results, copy, outfilename, tbs)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
-from dse_func import score_calculate, power_run, sim_run,  synth_run, load_runs, make_copy_options_and_params, update_options_and_params
+from dse_func import score_calculate, power_run, sim_run,  synth_run, load_runs, make_copy_options_and_params, update_options_and_params, collect_run_data
+from dse_db import connect, record_run, effective_params
 
 # Get runs from dse_runs.json
 runs = load_runs()
@@ -9,6 +10,9 @@ runs = load_runs()
 # Make copy of original params and options
 copy = make_copy_options_and_params()
 
+# Every run also goes to the results database
+db = connect()
+
 # Create output file
 outfilename = "simple_run_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
 with open(outfilename, "w") as f:
@@ -33,9 +37,13 @@ for run in runs:
         power_data = power_run(name)
         # calculate the score
         score = score_calculate(power_data["power"], sim_data["delay"], synth_data["area"])
+        run_data = collect_run_data(run, synth_data, sim_data, power_data)
+    else:
+        run_data = collect_run_data(run, synth_data)
+    record_run(db, run, run_data, name, outfilename, effective_params(run, copy["params"]))
 
     # record the data
-    with open(outfilename, "w") as f:
+    with open(outfilename, "a") as f:
         f.write(f'\n')
         f.write(f"\nStarting run {name}")
         f.write(f'\nclock: {run["clock"]}')
@@ -58,5 +66,7 @@ for run in runs:
             f.write(f'\n -> POWER: {power_data["power"]}')
             f.write(f'\n -> SCORE: {score}')
 
+    index += 1
+
 
 
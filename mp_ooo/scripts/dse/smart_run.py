@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
-from dse_func import total_run_report, load_runs, make_copy_options_and_params
+from dse_func import total_run_report, make_copy_options_and_params
+from dse_timing import timing_closure
+from dse_db import connect, record_run, effective_params
 
-# Get runs from dse_runs.json
-run =  { 
+# Starting guess, replaced by the remembered Fmax when this design was closed before
+run =  {
             "clock" : 1900.0,
             "ungroup" : False,
             "gate_clock" : True,
@@ -20,29 +22,14 @@ outfilename = "qs_run_" + datetime.now().strftime('%Y-%m-%d_%H-%M-%S') + ".log"
 with open(outfilename, "w") as f:
     f.write(f'Queued Report:')
 
-# Adjust based on previous runs
-lasttimingmet = False
-lastclock = 1600.0
-# Adjust based on previous runs
-
-delta = abs(lastclock - run["clock"])
-
-for run_idx in range(7):
-
-    # Execute run
-    run_data = total_run_report(run, f"{run_idx}", outfilename, copy)
-
-    # Adjust based on last runs
-    if (lasttimingmet and run_data["timingmet"]):
-        newclock = run["clock"] - delta
-    elif (not lasttimingmet and not run_data["timingmet"]):
-        newclock = run["clock"] + delta
-    else:
-        newclock = (run["clock"] + lastclock) / 2
-    lastclock = run["clock"]
-    lasttimingmet = run_data["timingmet"]
-    delta = abs(newclock - lastclock)
-    run["clock"] = newclock
-
+# Walk the clock to Fmax using the measured slack (synth only), each point warm-started from the last
+closure = timing_closure(run, copy, "tc", outfilename, cache=True, warm=True)
 
+with open(outfilename, "a") as f:
+    f.write(f'\nFmax period: {closure["clock"]} ({closure["synths"]} synths)')
 
+# Full run at the closed clock, synth comes from the stage cache
+if closure["clock"] is not None:
+    run["clock"] = closure["clock"]
+    run_data = total_run_report(run, "fmax", outfilename, copy, cache=True, warm=True)
+    record_run(connect(), run, run_data, "fmax", outfilename, effective_params(run, copy["params"]))
@@ -11,6 +11,12 @@ if [ $retval -eq "0" ]; then
 else
     echo -e "\033[0;31mSpike diff Failed \033[0m"
     echo "first 10 lines of spike diff:"
-    head -n 10 spike/diff.log
+    # With the instruction and function at each pc, from the index generate_memory_file.py wrote
+    idx=$(ls -t bin/*.idx 2>/dev/null | head -n 1)
+    if [ -n "$idx" ]; then
+        head -n 10 spike/diff.log | python3 ../bin/disasm.py $idx annotate || head -n 10 spike/diff.log
+    else
+        head -n 10 spike/diff.log
+    fi
     exit $retval
 fi
@@ -5,6 +5,10 @@ import os
 import sys
 import string
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../bin"))
+import flow_trace
+flow_trace.step()
+
 allowed_sv_tasks = [
     "signed",
     "unsigned",
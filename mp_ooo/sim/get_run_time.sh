@@ -2,5 +2,4 @@
 
 set -e
 
-cd vcs
-sed -nr 's/Monitor: (Total|Segment) Time: +?([0-9]+?)$$/\2/p' simulation.log
+python3 $(dirname $0)/../bin/parse_reports.py time vcs/simulation.log
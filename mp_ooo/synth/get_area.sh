@@ -2,4 +2,5 @@
 
 set -e
 
-sed -nr 's/Total cell area: +?([0-9]+?)\.[0-9]+?$$/\1/p' reports/area.rpt
+# Integer part, callers compare it with -gt
+python3 $(dirname $0)/../bin/parse_reports.py area reports/area.rpt | cut -d. -f1
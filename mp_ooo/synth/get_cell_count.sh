@@ -2,4 +2,4 @@
 
 set -e
 
-sed -nr 's/Number of cells: +?([0-9]+?)$$/\1/p' reports/area.rpt
+python3 $(dirname $0)/../bin/parse_reports.py cells reports/area.rpt
@@ -1,4 +1,4 @@
 #/bin/bash
 
 set -e
-sed -nr 's/ +slack \([A-Z]+\) +(-?[0-9]+?\.[0-9]+?)$$/\1/p' reports/timing.rpt
+python3 $(dirname $0)/../bin/parse_reports.py slack reports/timing.rpt
@@ -29,18 +29,25 @@ if {$sram_library eq ""} {
 get_license DC-Ultra-Features
 get_license DC-Ultra-Opt
 
-set pkg_src [getenv PKG_SRCS]
+set warm_start [getenv ECE411_WARM_START]
 
-if {$pkg_src ne ""} {
-   analyze -library WORK -format sverilog $pkg_src
-}
+if {$warm_start ne ""} {
+   # Mapped design of the same RTL at another clock, only an incremental compile is left to do
+   read_ddc $warm_start
+} else {
+   set pkg_src [getenv PKG_SRCS]
 
-set modules [split [getenv HDL_SRCS] " "]
-foreach module $modules {
-   analyze -library WORK -format sverilog "${module}"
-}
+   if {$pkg_src ne ""} {
+      analyze -library WORK -format sverilog $pkg_src
+   }
+
+   set modules [split [getenv HDL_SRCS] " "]
+   foreach module $modules {
+      analyze -library WORK -format sverilog "${module}"
+   }
 
-elaborate $design_toplevel
+   elaborate $design_toplevel
+}
 current_design $design_toplevel
 
 change_names -rules verilog -hierarchy
@@ -54,7 +61,11 @@ source constraints.sdc
 
 link
 
-eval [getenv ECE411_COMPILE_CMD]
+if {$warm_start ne ""} {
+   eval [getenv ECE411_COMPILE_CMD_INC]
+} else {
+   eval [getenv ECE411_COMPILE_CMD]
+}
 for {set i 0} {$i < [getenv ECE411_COMPILE_ITER]} {incr i} {
     eval [getenv ECE411_COMPILE_CMD_INC]
 }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# bin/ and scripts/dse import each other by module name, as when run from their own directory
+mp_ooo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(mp_ooo_dir, "bin"), os.path.join(mp_ooo_dir, "scripts/dse")]
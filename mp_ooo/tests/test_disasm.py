@@ -0,0 +1,81 @@
+import os
+import shutil
+
+import pytest
+
+import disasm
+import elf_loader
+
+testcode = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testcode")
+coremark = os.path.join(testcode, "coremark_im.elf")
+
+# In the format of riscv64-unknown-elf-objdump -d -Mnumeric
+gnu_output = """
+prog.elf:     file format elf32-littleriscv
+
+
+Disassembly of section .text:
+
+80000000 <_start>:
+80000000:	00000093          	addi	x1,x0,0
+80000004:	4501                	c.li	x10,0
+
+80000006 <loop>:
+80000006:	0085a583          	lw	x11,8(x11)
+8000000a:	fe059ee3          	bne	x11,x0,80000006 <loop>
+8000000e:	00000013 00000000 	.word	0x00000013
+80000016:	00000000          
+"""
+
+def small_index():
+    idx = {"sections": [{"name": ".text", "addr": 0x80000000, "size": 0x1a}],
+           "symbols": [[0x80000000, 0, elf_loader.STT_FUNC, 1, "_start"], [0x80000006, 0, 0, 0, "loop"]],
+           "path": "prog.elf", "windows": {}}
+    idx["addrs"] = [s[0] for s in idx["symbols"]]
+    return idx
+
+def test_parse_objdump():
+    insns = disasm.parse_objdump(small_index(), gnu_output)
+    assert [(i.addr, i.size) for i in insns] == [(0x80000000, 4), (0x80000004, 2), (0x80000006, 4),
+                                                 (0x8000000a, 4), (0x8000000e, 12)]
+    assert insns[1].raw == 0x4501 and insns[1].text == "c.li\tx10,0"
+    assert (insns[3].symbol, insns[3].offset) == ("loop", 4)
+    # Two byte-order groups and a continuation line are one .word run
+    assert insns[4].raw == 0x13
+    assert disasm.format_insn(insns[1]) == "80000004:\t4501                \tc.li\tx10,0"
+
+def test_parse_llvm_objdump():
+    text = "80000000: 93 00 00 00  \tli\tx1, 0\n80000004: 01 45        \tli\tx10, 0\n"
+    insns = disasm.parse_objdump(small_index(), text)
+    assert [(i.raw, i.size, i.text) for i in insns] == [(0x93, 4, "li\tx1, 0"), (0x4501, 2, "li\tx10, 0")]
+
+def test_lookup_disassembles_each_window_once(monkeypatch):
+    calls = []
+    def fake_objdump(path, args):
+        calls.append(args)
+        return gnu_output
+    monkeypatch.setattr(disasm, "objdump", fake_objdump)
+    idx = small_index()
+    assert disasm.window(idx, 0x8000000a) == (0x80000006, 0x8000001a)
+    assert disasm.lookup(idx, 0x80000008).addr == 0x80000006
+    assert disasm.lookup(idx, 0x8000000a).text.startswith("bne")
+    assert disasm.lookup(idx, 0x90000000) is None
+    assert calls == [["-d", "--start-address=0x80000006", "--stop-address=0x8000001a"]]
+
+def test_build_index(tmp_path):
+    idx = disasm.build_index(elf_loader.load(coremark), coremark)
+    assert all(s["name"] in (".init", ".text") for s in idx["sections"])
+    names = [s[4] for s in idx["symbols"]]
+    assert "crcu16" in names and not any(n.startswith("$") for n in names)
+    assert [s[0] for s in idx["symbols"]] == sorted(s[0] for s in idx["symbols"])
+    disasm.save_index(idx, tmp_path / "coremark_im.idx")
+    reopened = disasm.open_index(tmp_path / "coremark_im.idx")
+    assert reopened["symbols"] == idx["symbols"] and reopened["path"] == coremark
+
+@pytest.mark.skipif(not any(shutil.which(t) for t in disasm.objdump_names) and not os.environ.get("RISCV_OBJDUMP"),
+                    reason="no RISC-V objdump")
+def test_lookup_matches_full_disassembly():
+    idx = disasm.open_index(coremark)
+    start, end = disasm.function_range(idx, "crcu16")
+    full = [i for i in disasm.parse_objdump(idx, disasm.objdump(coremark, ["-d"])) if start <= i.addr < end]
+    assert full and [disasm.lookup(idx, i.addr) for i in full] == full
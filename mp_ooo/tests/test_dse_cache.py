@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+
+import dse_cache
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    # The smallest tree the keys read: RTL, types.sv, synth scripts, testbench, options and two programs
+    monkeypatch.setattr(dse_cache, "cache_dir", str(tmp_path / "cache"))
+    root = str(tmp_path / "mp_ooo")
+    write(f"{root}/hdl/cpu.sv", "module cpu; endmodule\n")
+    write(f"{root}/pkg/types.sv", "localparam NUM_ROB_ENTRIES = 20;\n")
+    write(f"{root}/synth/synthesis.tcl", "compile_ultra\n")
+    write(f"{root}/synth/power.tcl", "report_power\n")
+    write(f"{root}/hvl/top_tb.sv", "module top_tb; endmodule\n")
+    write(f"{root}/options.json", json.dumps({"clock": 1000, "dw_ip": [], "bmem_0_on_x": 1}))
+    write(f"{root}/sim/a.elf", "program a")
+    write(f"{root}/sim/b.elf", "program b")
+    return root
+
+def test_sim_key_separates_programs(root):
+    assert dse_cache.sim_key(root, "a.elf") != dse_cache.sim_key(root, "b.elf")
+    assert dse_cache.power_key(root, "a.elf") != dse_cache.power_key(root, "b.elf")
+    # Keyed by the program's bytes, not its name
+    before = dse_cache.sim_key(root, "a.elf")
+    write(f"{root}/sim/a.elf", "program a, rebuilt")
+    assert dse_cache.sim_key(root, "a.elf") != before
+
+def test_keys_follow_the_design(root):
+    synth, sim = dse_cache.synth_key(root), dse_cache.sim_key(root, "a.elf")
+    write(f"{root}/pkg/types.sv", "localparam NUM_ROB_ENTRIES = 32;\n")
+    assert dse_cache.synth_key(root) != synth
+    assert dse_cache.sim_key(root, "a.elf") != sim
+
+def test_options_only_reach_their_stage(root):
+    synth, sim = dse_cache.synth_key(root), dse_cache.sim_key(root, "a.elf")
+    with open(f"{root}/options.json") as f:
+        options = json.load(f)
+    options["bmem_0_on_x"] = 0
+    write(f"{root}/options.json", json.dumps(options))
+    assert dse_cache.synth_key(root) == synth
+    assert dse_cache.sim_key(root, "a.elf") != sim
+
+def test_store_restore(root, tmp_path):
+    stage_dir = str(tmp_path / "sim_a")
+    write(f"{stage_dir}/vcs/simulation.log", "Monitor: Segment IPC: 0.5\n")
+    key = dse_cache.sim_key(root, "a.elf")
+    assert dse_cache.lookup("sim", key) is None
+    dse_cache.store("sim", key, stage_dir, {"ipc": 0.5})
+    assert dse_cache.contains("sim", key)
+    assert not dse_cache.contains("sim", dse_cache.sim_key(root, "b.elf"))
+
+    out = str(tmp_path / "sim_b")
+    assert dse_cache.restore("sim", key, out) == {"ipc": 0.5}
+    with open(f"{out}/vcs/simulation.log") as f:
+        assert f.read() == "Monitor: Segment IPC: 0.5\n"
+    # Files the stage did not leave behind are not invented
+    assert not os.path.exists(f"{out}/vcs/time.txt")
+
+def test_store_keeps_the_first_entry(root, tmp_path):
+    stage_dir = str(tmp_path / "sim_a")
+    write(f"{stage_dir}/vcs/simulation.log", "first\n")
+    key = dse_cache.sim_key(root, "a.elf")
+    dse_cache.store("sim", key, stage_dir, {"ipc": 0.5})
+    dse_cache.store("sim", key, stage_dir, {"ipc": 0.7})
+    assert dse_cache.lookup("sim", key)["result"] == {"ipc": 0.5}
+
+def test_warm_netlist_is_cached_apart(root):
+    assert dse_cache.synth_key(root, warm=True) != dse_cache.synth_key(root)
+    assert dse_cache.power_key(root, "a.elf", warm=True) != dse_cache.power_key(root, "a.elf")
+    assert dse_cache.power_key(root, "a.elf") == dse_cache.power_key(root, "a.elf", warm=False)
+
+def test_warm_key_ignores_the_clock(root):
+    warm, synth = dse_cache.warm_key(root), dse_cache.synth_key(root)
+    write(f"{root}/options.json", json.dumps({"clock": 800, "dw_ip": [], "bmem_0_on_x": 1}))
+    assert dse_cache.warm_key(root) == warm
+    assert dse_cache.synth_key(root) != synth
+
+def test_cut_short_sims_are_cached_apart(root):
+    full = dse_cache.sim_key(root, "a.elf")
+    assert dse_cache.sim_key(root, "a.elf", timeout=None) == full
+    assert dse_cache.sim_key(root, "a.elf", timeout=100000) != full
+    assert dse_cache.sim_key(root, "a.elf", timeout=100000) != dse_cache.sim_key(root, "a.elf", timeout=200000)
@@ -0,0 +1,78 @@
+import pytest
+
+import dse_db
+
+types_text = """package params;
+    localparam int unsigned NUM_ROB_ENTRIES = 16;
+    localparam int unsigned NUM_PHYSICAL_REGISTERS = 32 + NUM_ROB_ENTRIES;
+    localparam int unsigned DIV_WIDTH = 3;      // Max 8
+endpackage
+"""
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = dse_db.connect(str(tmp_path / "dse_results.db"))
+    yield conn
+    conn.close()
+
+def run_of(prog="../testcode/coremark_im.elf", clock=1000, **params):
+    return {"clock": clock, "ungroup": False, "gate_clock": True, "prog": prog, "params": params}
+
+def record(conn, run, name=None, **run_data):
+    return dse_db.record_run(conn, run, run_data, name, "sweep.log", dse_db.effective_params(run, types_text))
+
+def test_effective_params():
+    params = dse_db.effective_params(run_of(NUM_ROB_ENTRIES=32), types_text)
+    assert params == {"NUM_ROB_ENTRIES": 32, "NUM_PHYSICAL_REGISTERS": 64, "DIV_WIDTH": 3}
+    # Plain literals when the model cannot evaluate the override
+    params = dse_db.effective_params(run_of(NOT_A_PARAM=1), types_text)
+    assert params == {"NUM_ROB_ENTRIES": 16, "DIV_WIDTH": 3, "NOT_A_PARAM": 1}
+
+def test_record_run(conn):
+    run = run_of(NUM_ROB_ENTRIES=32)
+    run_id = record(conn, run, "r0", area=1000.0, slack=0.1, timingmet=True, ipc=0.8, delay=0.5, power=4.0,
+                    score=2.0, times={"synth": 10.0, "sim": 5.0}, reports={"synth": {"reports/area.rpt": "ab"}})
+    row = dse_db.get_run(conn, run_id)
+    assert (row["name"], row["sweep"], row["benchmark"], row["clock"]) == ("r0", "sweep.log", "coremark_im", 1000)
+    assert (row["timingmet"], row["synth_time"], row["sim_time"], row["power_time"]) == (1, 10.0, 5.0, None)
+    assert row["overrides"] == {"NUM_ROB_ENTRIES": 32}
+    assert row["params"]["NUM_PHYSICAL_REGISTERS"] == 64
+    assert row["reports"] == {"synth": {"reports/area.rpt": "ab"}}
+    # An errored run keeps no timingmet
+    row = dse_db.get_run(conn, record(conn, run, timingmet='Error'))
+    assert row["timingmet"] is None and row["score"] is None
+    assert dse_db.get_run(conn, 1000) is None
+
+def test_best_per_benchmark(conn):
+    record(conn, run_of(), "a", score=3.0)
+    record(conn, run_of(), "b", score=2.0)
+    record(conn, run_of(), "c", score=2.0)
+    record(conn, run_of(prog="fft.c"), "d", score=5.0)
+    record(conn, run_of(prog="fft.c"), "e")
+    best = dse_db.best_per_benchmark(conn)
+    # One per benchmark, the first recorded on a tie
+    assert [(r["benchmark"], r["name"]) for r in best] == [("coremark_im", "b"), ("fft", "d")]
+
+def test_runs_where(conn):
+    record(conn, run_of(NUM_ROB_ENTRIES=32), "a")
+    record(conn, run_of(NUM_ROB_ENTRIES=32, DIV_WIDTH=4), "b")
+    record(conn, run_of(prog="fft.c", NUM_ROB_ENTRIES=32), "c")
+    record(conn, run_of(), "d")
+    names = lambda rows: [r["name"] for r in rows]
+    assert names(dse_db.runs_where(conn, NUM_ROB_ENTRIES=32)) == ["a", "b", "c"]
+    # Derived and defaulted values are queryable too
+    assert names(dse_db.runs_where(conn, NUM_PHYSICAL_REGISTERS=48)) == ["d"]
+    assert names(dse_db.runs_where(conn, NUM_ROB_ENTRIES=32, DIV_WIDTH=3)) == ["a", "c"]
+    assert names(dse_db.runs_where(conn, "fft", NUM_ROB_ENTRIES=32)) == ["c"]
+    assert dse_db.runs_where(conn, NUM_ROB_ENTRIES=64) == []
+
+def test_pareto_front(conn):
+    points = {"a": (1, 5, 5), "b": (5, 1, 5), "c": (2, 6, 5), "d": (1, 5, 6), "e": (3, 3, 3), "f": (1, 5, 5)}
+    for name, (power, delay, area) in points.items():
+        record(conn, run_of(), name, power=power, delay=delay, area=area, score=power * delay * area)
+    record(conn, run_of(), "incomplete", power=0.1, delay=0.1, area=0.1)
+    record(conn, run_of(prog="fft.c"), "other", power=0.5, delay=0.5, area=0.5, score=0.1)
+    front = dse_db.pareto_front(conn, "coremark_im")
+    # c and d are dominated by a; a and f are the same point, neither dominates the other
+    assert sorted(r["name"] for r in front) == ["a", "b", "e", "f"]
+    assert [r["name"] for r in dse_db.pareto_front(conn)] == ["other"]
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import dse_artifacts
+import dse_cache
+import dse_db
+import dse_farm
+import dse_func
+import dse_queue
+
+@pytest.fixture
+def farm(tmp_path, monkeypatch):
+    # Coordinator on a Unix socket, queue, results and artifacts all under tmp_path
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dse_db, "db_path", str(tmp_path / "dse_results.db"))
+    monkeypatch.setattr(dse_artifacts, "artifact_dir", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(dse_farm, "farm_dir", str(tmp_path / "farm"))
+    monkeypatch.setattr(dse_farm, "idle_retry", 0.05)
+    farm = {"address": f"unix:{tmp_path}/farm.sock", "queue": str(tmp_path / "queue.db"),
+            "out": str(tmp_path / "farm.log"), "ran": [], "tmp": tmp_path}
+    lock = threading.Lock()
+    def sandbox_job(job, copy, cache=False, pipelined=False):
+        # What a real sandbox leaves: a run_data whose reports are digests in this host's artifacts
+        with lock:
+            farm["ran"].append(job["id"])
+        sim_dir = tmp_path / "sandboxes" / str(job["id"]) / "sim"
+        (sim_dir / "vcs").mkdir(parents=True)
+        (sim_dir / "vcs/simulation.log").write_text(f"Monitor: Segment IPC: 0.{job['id']}\n")
+        reports = {"sim": dse_artifacts.store_files(job["name"], "sim", str(sim_dir), ["vcs/simulation.log"])}
+        time.sleep(0.05)
+        return {"area": 1000.0 + job["id"], "timingmet": True, "ipc": job["id"] / 10, "score": job["id"],
+                "reports": reports}
+    monkeypatch.setattr(dse_queue, "sandbox_job", sandbox_job)
+    return farm
+
+def submit(farm, n):
+    conn = dse_queue.connect(farm["queue"])
+    ids = [dse_queue.submit(conn, {"clock": 1000, "ungroup": False, "gate_clock": True,
+                                   "prog": "../testcode/coremark_im.elf", "params": {"NUM_ROB_ENTRIES": 8 + i}},
+                            name=f"job{i}") for i in range(n)]
+    conn.close()
+    return ids
+
+def start_coordinator(farm):
+    thread = threading.Thread(target=dse_farm.serve, args=(farm["address"], farm["out"], farm["queue"]))
+    thread.start()
+    sock = farm["address"][len("unix:"):]
+    for _ in range(200):
+        if os.path.exists(sock):
+            break
+        time.sleep(0.01)
+    return thread
+
+def run_workers(farm, n):
+    workers = [threading.Thread(target=dse_farm.worker, args=(farm["address"],)) for _ in range(n)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(30)
+        assert not w.is_alive()
+
+class Client:
+    # A worker driven by hand, to misbehave
+    def __init__(self, farm):
+        self.sock = dse_farm.connect(farm["address"])
+        self.rfile = self.sock.makefile('rb')
+        self.wfile = self.sock.makefile('wb')
+        self.send({"type": "hello", "worker": dse_queue.worker_id(), "token": dse_farm.token,
+                   "design": dse_cache.design_hash(dse_func.root_dir)})
+
+    def send(self, msg):
+        dse_farm.send(self.wfile, msg)
+
+    def recv(self):
+        return dse_farm.recv(self.rfile)
+
+    def close(self):
+        self.rfile.close()
+        self.wfile.close()
+        self.sock.close()
+
+def wait_state(farm, job_id, state):
+    conn = dse_queue.connect(farm["queue"])
+    try:
+        for _ in range(200):
+            row = conn.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row["state"] == state:
+                return
+            time.sleep(0.01)
+        raise AssertionError(f"job {job_id} stayed {row['state']}")
+    finally:
+        conn.close()
+
+def check_done(farm, ids):
+    queue = dse_queue.connect(farm["queue"])
+    assert dse_queue.counts(queue) == {"done": len(ids)}
+    db = dse_db.connect()
+    runs = {r["name"]: r for r in (dse_db.to_dict(row) for row in db.execute("SELECT * FROM runs"))}
+    artifacts = dse_artifacts.connect()
+    for job in queue.execute("SELECT * FROM jobs").fetchall():
+        result = json.loads(job["result"])
+        assert result["score"] == job["id"]
+        run = runs[job["name"]]
+        assert run["score"] == job["id"] and run["params"]["NUM_ROB_ENTRIES"] == 8 + job["id"] - 1
+        # Reports arrive as digests the coordinator can read back
+        assert run["reports"] == result["reports"]
+        digest = run["reports"]["sim"]["vcs/simulation.log"]
+        with dse_artifacts.open_object(artifacts, digest) as f:
+            assert f.read() == f"Monitor: Segment IPC: 0.{job['id']}\n".encode()
+    assert len(runs) == len(ids)
+    for conn in (queue, db, artifacts):
+        conn.close()
+
+def test_local_workers(farm):
+    ids = submit(farm, 6)
+    coordinator = start_coordinator(farm)
+    run_workers(farm, 3)
+    coordinator.join(30)
+    assert not coordinator.is_alive()
+    # Every job claimed exactly once
+    assert sorted(farm["ran"]) == ids
+    check_done(farm, ids)
+
+def test_dropped_worker_job_is_handed_on(farm):
+    ids = submit(farm, 3)
+    coordinator = start_coordinator(farm)
+    client = Client(farm)
+    client.send({"type": "request"})
+    msg = client.recv()
+    assert msg["type"] == "job"
+    dropped = msg["job"]["id"]
+    wait_state(farm, dropped, "running")
+    client.close()
+    wait_state(farm, dropped, "queued")
+    run_workers(farm, 2)
+    coordinator.join(30)
+    assert sorted(farm["ran"]) == ids
+    check_done(farm, ids)
+
+@pytest.mark.parametrize("msg", [
+    {"type": "result", "job": 1, "run_data": {}},
+    {"type": "error", "job": 1, "error": "boom"},
+    {"type": "heartbeat", "job": 1},
+])
+def test_messages_without_a_job_are_refused(farm, msg):
+    ids = submit(farm, 1)
+    coordinator = start_coordinator(farm)
+    client = Client(farm)
+    client.send(msg)
+    assert client.recv()["type"] == "stop"
+    client.close()
+    run_workers(farm, 1)
+    coordinator.join(30)
+    check_done(farm, ids)
+
+def test_messages_for_another_job_are_refused(farm):
+    ids = submit(farm, 2)
+    coordinator = start_coordinator(farm)
+    client = Client(farm)
+    client.send({"type": "request"})
+    held = client.recv()["job"]["id"]
+    client.send({"type": "result", "job": 3 - held, "run_data": {}})
+    assert client.recv()["type"] == "stop"
+    client.close()
+    # Nothing was recorded for either job, and the held one goes back to the queue
+    wait_state(farm, held, "queued")
+    run_workers(farm, 1)
+    coordinator.join(30)
+    assert sorted(farm["ran"]) == ids
+    check_done(farm, ids)
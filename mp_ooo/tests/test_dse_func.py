@@ -0,0 +1,108 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+import dse_artifacts
+import dse_func
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    # dse_func pointed at an empty sandbox, every make stubbed
+    root = tmp_path / "mp_ooo"
+    for d in ["sim/vcs", "synth/reports", "pkg"]:
+        (root / d).mkdir(parents=True)
+    for var, rel in [("root_dir", ""), ("synth_dir", "/synth"), ("sim_dir", "/sim"), ("options_dir", ""),
+                     ("params_dir", "/pkg")]:
+        monkeypatch.setattr(dse_func, var, f"{root}{rel}")
+    monkeypatch.setattr(dse_artifacts, "artifact_dir", str(tmp_path / "artifacts"))
+    return root
+
+class Make:
+    # run_make stand-in: every target is a sleep that only a kill ends early
+    def __init__(self, root, duration=30):
+        self.root = root
+        self.duration = duration
+        self.procs = []
+        self.targets = []
+        self.running = threading.Event()
+
+    def __call__(self, target, cwd, started=None, name=None):
+        self.targets.append(target)
+        proc = subprocess.Popen(["sleep", str(self.duration)], start_new_session=True)
+        self.procs.append(proc)
+        if started is not None:
+            started(proc)
+        self.running.set()
+        proc.wait()
+        if proc.returncode == 0 and target.startswith("run_vcs_top_tb"):
+            (self.root / "sim/vcs/simulation.log").write_text(
+                "Monitor: Segment IPC: 0.5\nMonitor: Power Stop time is 2000000\n")
+        return proc.returncode
+
+def synth(timingmet, make=None):
+    def synth_run(name, cache=False, warm=False):
+        if make is not None:
+            # Synth ends while the sim's make is running
+            assert make.running.wait(10)
+        return {"area": 1000.0, "slack": 0.1 if timingmet else -0.1, "timingmet": timingmet,
+                "cached": False, "time": 1, "reports": {}}
+    return synth_run
+
+run = {"clock": 1000, "prog": "../testcode/coremark_im.elf", "params": {}}
+
+def test_overlapped_cancels_running_sim(tree, monkeypatch):
+    make = Make(tree)
+    monkeypatch.setattr(dse_func, "run_make", make)
+    monkeypatch.setattr(dse_func, "synth_run", synth(False, make))
+    start = time.time()
+    synth_data, sim_data = dse_func.synth_sim_overlapped(run, "r0")
+    assert time.time() - start < 10
+    assert synth_data["timingmet"] is False and sim_data is None
+    # The compile was killed and nothing ran after it
+    assert make.targets == ["vcs/top_tb"]
+    assert make.procs[0].returncode < 0
+
+def test_overlapped_cancels_before_make(tree, monkeypatch):
+    # Synth fails before the sim thread reaches make: its make is killed as soon as it starts
+    make = Make(tree)
+    monkeypatch.setattr(dse_func, "run_make", make)
+    monkeypatch.setattr(dse_func, "synth_run", synth(False))
+    start = time.time()
+    assert dse_func.synth_sim_overlapped(run, "r0")[1] is None
+    assert time.time() - start < 10
+    assert len(make.targets) <= 1
+    assert all(p.returncode != 0 for p in make.procs)
+
+def test_overlapped_pruned(tree, monkeypatch):
+    make = Make(tree)
+    monkeypatch.setattr(dse_func, "run_make", make)
+    monkeypatch.setattr(dse_func, "synth_run", synth(True, make))
+    synth_data, sim_data = dse_func.synth_sim_overlapped(run, "r0", prune=lambda run, synth_data: "too big")
+    assert synth_data["pruned"] == "too big" and sim_data is None
+    assert make.targets == ["vcs/top_tb"]
+
+def test_overlapped_keeps_sim(tree, monkeypatch):
+    make = Make(tree, duration=0)
+    monkeypatch.setattr(dse_func, "run_make", make)
+    monkeypatch.setattr(dse_func, "synth_run", synth(True, make))
+    synth_data, sim_data = dse_func.synth_sim_overlapped(run, "r0")
+    assert make.targets == ["vcs/top_tb", "run_vcs_top_tb PROG=../testcode/coremark_im.elf"]
+    assert sim_data["ipc"] == 0.5 and sim_data["delay"] == 2.0
+    assert list(sim_data["reports"]) == ["vcs/simulation.log"]
+
+@pytest.mark.parametrize("seed", [None, ({"clock": 1100, "depth": 0, "area": 1000.0, "slack": 0.1}, "seed.ddc")])
+def test_warm_synth_fails_on_make_errors(tree, monkeypatch, seed):
+    # Neither the incremental compile nor the cold one behind it may hand back the last run's reports
+    (tree / "synth/reports/area.rpt").write_text("Total cell area: 1.000000\n")
+    (tree / "synth/reports/timing.rpt").write_text("slack (MET) 0.10\n")
+    targets = []
+    monkeypatch.setattr(dse_func, "run_make", lambda target, cwd, started=None, name=None: targets.append(target) or 2)
+    monkeypatch.setattr(dse_func, "current_clock", lambda: 1000)
+    monkeypatch.setattr(dse_func.dse_cache, "warm_key", lambda root: "key")
+    monkeypatch.setattr(dse_func.dse_cache, "nearest_seed", lambda key, clock, depth: seed)
+    with pytest.raises(dse_func.StageError):
+        dse_func.warm_synth("r0")
+    assert targets == (["synth WARM_START=seed.ddc", "synth"] if seed else ["synth"])
+    assert not (tree / "synth/reports/area.rpt").exists()
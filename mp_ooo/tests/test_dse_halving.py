@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+import dse_func
+import dse_halving
+import dse_parallel
+
+def ranked(proxies):
+    return [(p, {"clock": 1000 + i}, {}) for i, p in enumerate(proxies)]
+
+def test_promoted():
+    promoted = dse_halving.promoted(ranked([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]))
+    assert [p for p, _, _ in promoted] == [1.0, 2.0]
+    # At least one moves up, but never a failed one
+    assert [p for p, _, _ in dse_halving.promoted(ranked([1.0, 2.0]))] == [1.0]
+    assert dse_halving.promoted(ranked([math.inf, math.inf, math.inf])) == []
+    assert [p for p, _, _ in dse_halving.promoted(ranked([1.0, math.inf, math.inf, math.inf]), eta=2)] == [1.0]
+
+def test_proxy_score():
+    run = {"clock": 1000}
+    assert dse_halving.proxy_score(run, {"timingmet": False, "score": 1.0}) == math.inf
+    assert dse_halving.proxy_score(run, {"timingmet": True, "score": 2.5}) == 2.5
+    assert dse_halving.proxy_score(run, {"timingmet": True, "delay": 2.0, "area": 4.0}) == 16.0
+    # A cut short sim has only its IPC: delay from the clock
+    proxy = dse_halving.proxy_score(run, {"timingmet": True, "ipc": 0.5, "area": 4.0})
+    assert proxy == pytest.approx((dse_func.round_clock(1000) / 0.5 / 1e6) ** 3 * 2)
+    assert dse_halving.proxy_score(run, {"timingmet": True, "area": 4.0}) == math.inf
+
+@pytest.fixture
+def rung_runs(monkeypatch):
+    # parallel_run stubbed: a run's proxy is its clock, anything at clock 1003 fails timing
+    calls = []
+    def parallel_run(runs, copy, max_workers=None, names=None, fidelity=None, **kwargs):
+        calls.append({"runs": runs, "names": names, "fidelity": fidelity})
+        return [{"timingmet": run["clock"] != 1003, "score": float(run["clock"])} for run in runs]
+    monkeypatch.setattr(dse_parallel, "parallel_run", parallel_run)
+    monkeypatch.setattr(dse_func, "cdscriptdir", lambda: None)
+    return calls
+
+def runs(n, start=0):
+    return [{"clock": 1000 + start + i, "prog": None, "params": {}} for i in range(n)]
+
+def test_successive_halving(rung_runs):
+    recorded = []
+    final = dse_halving.successive_halving(runs(10), {}, "sh", record=lambda rung, *args: recorded.append(rung["name"]))
+    assert [len(c["runs"]) for c in rung_runs] == [10, 3, 1]
+    assert recorded == ["short", "coremark", "full"]
+    # Every rung runs its own program and fidelity; the last one is a full run
+    assert [c["fidelity"] and c["fidelity"]["name"] for c in rung_runs] == ["short", "coremark", None]
+    assert all(run["prog"] == dse_halving.rungs[i]["prog"] for i, c in enumerate(rung_runs) for run in c["runs"])
+    assert rung_runs[1]["names"] == ["sh_coremark_0", "sh_coremark_1", "sh_coremark_2"]
+    # The failed run is never promoted
+    assert [run["clock"] for run in rung_runs[1]["runs"]] == [1000, 1001, 1002]
+    assert [(p, run["clock"]) for p, run, _ in final] == [(1000.0, 1000)]
+
+def test_successive_halving_from_a_later_rung(rung_runs):
+    dse_halving.successive_halving(runs(4), {}, "sh", start=1)
+    assert [len(c["runs"]) for c in rung_runs] == [4, 1]
+    assert rung_runs[0]["fidelity"]["name"] == "coremark"
+
+def test_hyperband(rung_runs):
+    drawn = []
+    def draw(n):
+        drawn.append(n)
+        return runs(n, 100 * len(drawn))
+    final = dse_halving.hyperband(draw, {}, "hb")
+    # Brackets from eta^s_max configs on the cheapest rung to a few straight at full fidelity
+    assert drawn == [9, 5, 3]
+    assert [len(c["runs"]) for c in rung_runs] == [9, 3, 1, 5, 1, 3]
+    assert [p for p, _, _ in final] == sorted(p for p, _, _ in final)
+    assert len(final) == 1 + 1 + 3
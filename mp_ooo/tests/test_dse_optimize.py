@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+import dse_optimize
+import dse_params
+
+# Room for illegal points: IC_PREFETCH_DEGREE ranges from 1-3 and NUM_EBR_CHECKPOINT (3) must fit every ISQ
+space = {
+    "NUM_ROB_ENTRIES"       : [8, 16, 32],
+    "ISQ_BMD_SIZE"          : [1, 2, 3, 4, 6],
+    "IC_PREFETCH_DEGREE"    : [1, 2, 3, 4],
+    "clock"                 : [1500, 1750, 2000],
+}
+
+@pytest.fixture(scope="module")
+def model():
+    return dse_params.load_model()
+
+def test_mutate_and_crossover_stay_in_space():
+    rng = random.Random(0)
+    a, b = dse_optimize.random_config(space, rng), dse_optimize.random_config(space, rng)
+    for _ in range(200):
+        child = dse_optimize.mutate(dse_optimize.crossover(a, b, rng), space, rng)
+        assert set(child) == set(space)
+        assert all(child[k] in values for k, values in space.items())
+        a, b = b, child
+
+def test_mutate_is_seeded():
+    config = {"NUM_ROB_ENTRIES": 16, "ISQ_BMD_SIZE": 3, "IC_PREFETCH_DEGREE": 2, "clock": 1750}
+    children = [[dse_optimize.mutate(config, space, rng) for _ in range(20)]
+                for rng in (random.Random(3), random.Random(3))]
+    assert children[0] == children[1]
+
+def test_propose_only_legal(model):
+    rng = random.Random(1)
+    population = [(dse_optimize.random_config(space, rng), float(i)) for i in range(6)]
+    children = dse_optimize.propose(population, space, 40, set(), rng, model)
+    assert len(children) == 40
+    assert len({dse_optimize.config_key(c) for c in children}) == 40
+    for child in children:
+        assert dse_optimize.is_legal(child, model)
+        assert child["IC_PREFETCH_DEGREE"] <= 3 and child["ISQ_BMD_SIZE"] >= 3
+    # Without the model the same draw does include illegal points
+    rng = random.Random(1)
+    population = [(dse_optimize.random_config(space, rng), float(i)) for i in range(6)]
+    unchecked = dse_optimize.propose(population, space, 40, set(), rng)
+    assert not all(dse_optimize.is_legal(c, model) for c in unchecked)
+
+def test_optimize(model):
+    evaluated = []
+    def evaluate(configs):
+        evaluated.extend(configs)
+        return [{"score": c["clock"] / c["NUM_ROB_ENTRIES"]} for c in configs]
+    best, evaluations = dse_optimize.optimize(evaluate, space, budget=24, batch=6, seed=2, model=model)
+    assert len(evaluations) == 24
+    assert all(dse_optimize.is_legal(c, model) for c in evaluated)
+    # Never the same point twice
+    assert len({dse_optimize.config_key(c) for c in evaluated}) == 24
+    assert best[1] == min(c["clock"] / c["NUM_ROB_ENTRIES"] for c in evaluated)
+    # Seeded: the same search again
+    again = []
+    dse_optimize.optimize(lambda cs: again.extend(cs) or evaluate(cs), space, budget=24, batch=6, seed=2, model=model)
+    assert again == evaluated[24:]
+
+def test_optimize_screen(model):
+    # A screen that keeps only small-clock configs, most promising first
+    screened = []
+    def screen(configs):
+        screened.append(len(configs))
+        return sorted((c for c in configs if c["clock"] == 1500), key=lambda c: -c["NUM_ROB_ENTRIES"])
+    evaluated = []
+    def evaluate(configs):
+        evaluated.extend(configs)
+        return [{"score": 1.0} for _ in configs]
+    dse_optimize.optimize(evaluate, space, budget=6, batch=3, seed=0, model=model, screen=screen)
+    assert evaluated and all(c["clock"] == 1500 for c in evaluated)
+    assert screened[0] == 3 * dse_optimize.oversample
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import dse_db
+import dse_func
+import dse_parallel
+
+def write(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    # An mp_ooo tree with a build left in it
+    root = str(tmp_path / "mp_ooo")
+    write(f"{root}/hdl/cpu.sv", "module cpu; endmodule\n")
+    write(f"{root}/pkg/types.sv")
+    write(f"{root}/synth/.gitignore", "# build products\nreports\noutputs\n!keep\n")
+    write(f"{root}/synth/synthesis.tcl")
+    write(f"{root}/synth/reports/timing.rpt", "slack (MET) 0.1\n")
+    write(f"{root}/synth/outputs/synth.ddc")
+    write(f"{root}/sim/.gitignore", "vcs\n*.log\n")
+    write(f"{root}/sim/Makefile")
+    write(f"{root}/sim/vcs/top_tb")
+    write(f"{root}/sim/run.log")
+    write(f"{root}/bin/generate_memory_file.py")
+    write(f"{root}/hvl/top_tb.sv")
+    write(f"{root}/options.json", "{}")
+    write(f"{root}/sram/output/sram.db")
+    write(f"{root}/testcode/coremark_im.elf")
+    monkeypatch.setattr(dse_parallel, "source_root", root)
+    monkeypatch.setattr(dse_parallel, "sandbox_dir", str(tmp_path / "sandboxes"))
+    return root
+
+def test_ignored_outputs(root):
+    ignore = dse_parallel.ignored_outputs(f"{root}/synth")
+    assert ignore(f"{root}/synth", ["reports", "outputs", "synthesis.tcl", "keep"]) == {"reports", "outputs"}
+    assert dse_parallel.ignored_outputs(f"{root}/hdl") is None
+
+def test_make_sandbox(root):
+    path = dse_parallel.make_sandbox("run0")
+    assert os.path.isfile(f"{path}/synth/synthesis.tcl") and os.path.isfile(f"{path}/sim/Makefile")
+    assert os.path.isfile(f"{path}/hdl/cpu.sv") and os.path.isfile(f"{path}/options.json")
+    # Build outputs stay behind
+    for rel in ["synth/reports", "synth/outputs", "sim/vcs", "sim/run.log"]:
+        assert not os.path.exists(f"{path}/{rel}")
+    # Read-only inputs are shared
+    for d in ["sram", "testcode"]:
+        assert os.path.islink(f"{path}/{d}") and os.path.realpath(f"{path}/{d}") == os.path.realpath(f"{root}/{d}")
+    # A sandbox of its own: edits do not reach the tree
+    write(f"{path}/pkg/types.sv", "changed")
+    with open(f"{root}/pkg/types.sv") as f:
+        assert f.read() == ""
+
+def test_make_sandbox_replaces_old(root):
+    path = dse_parallel.make_sandbox("run0")
+    write(f"{path}/synth/reports/timing.rpt", "stale")
+    assert dse_parallel.make_sandbox("run0") == path
+    assert not os.path.exists(f"{path}/synth/reports")
+
+types_text = """package params;
+    localparam int unsigned IC_PREFETCH_DEGREE = 3;     // (Ranges from 1-3)
+    localparam int unsigned NUM_ROB_ENTRIES = 16;
+endpackage
+"""
+
+@pytest.fixture
+def stages(root, tmp_path, monkeypatch):
+    # Every dse_func stage stubbed; runs with clock 666 fail in synth, later runs finish first
+    monkeypatch.setattr(dse_parallel, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(dse_db, "db_path", str(tmp_path / "dse_results.db"))
+    calls = []
+    lock = threading.Lock()
+    def stage(kind, name, data):
+        with lock:
+            calls.append((kind, name))
+        time.sleep(0.2 / (1 + int(name[3:])))
+        return dict(data, cached=False, time=1, reports={})
+    def synth_run(name, cache=False, warm=False):
+        if name == "run1":
+            raise dse_func.StageError(f"synth {name}: make synth failed")
+        return stage("synth", name, {"area": 1000.0 + int(name[3:]), "slack": 0.1, "timingmet": True})
+    def sim_run(run, name, cache=False, reuse=True, started=None, timeout=None, cancelled=None):
+        return stage("sim", name, {"delay": 0.5, "ipc": 0.7})
+    def power_run(name, cache=False, prog=None, warm=False):
+        return stage("power", name, {"power": 5.0})
+    monkeypatch.setattr(dse_func, "update_options_and_params", lambda run, copy: None)
+    monkeypatch.setattr(dse_func, "synth_run", synth_run)
+    monkeypatch.setattr(dse_func, "sim_run", sim_run)
+    monkeypatch.setattr(dse_func, "power_run", power_run)
+    return calls
+
+def test_parallel_run(stages, tmp_path):
+    runs = [{"clock": 1000 + i, "ungroup": False, "gate_clock": True, "prog": "../testcode/coremark_im.elf",
+             "params": {"NUM_ROB_ENTRIES": 8 + i}} for i in range(4)]
+    runs.append(dict(runs[0], params={"IC_PREFETCH_DEGREE": 7}))
+    names = [f"run{i}" for i in range(len(runs))]
+    results = dse_parallel.parallel_run(runs, {"params": types_text}, 4, names,
+                                        resources={"dc": 4, "vcs": 4, "mem_gb": 1024, "cores": 64})
+    # In input order, whatever order they finished in
+    assert [r["clock"] for r in results] == [run["clock"] for run in runs]
+    assert [r.get("area") for r in results] == [1000.0, None, 1002.0, 1003.0, None]
+    for i in [0, 2, 3]:
+        assert results[i]["score"] == dse_func.score_calculate(5.0, 0.5, 1000.0 + i)
+    # A failed run does not lose the others
+    assert results[1]["timingmet"] == 'Error' and "make synth failed" in results[1]["error"]
+    # Invalid params never reach a stage
+    assert results[4]["timingmet"] == 'Error' and "IC_PREFETCH_DEGREE = 7" in results[4]["error"]
+    assert {name for _, name in stages} == {"run0", "run2", "run3"}
+    assert sorted(stages) == sorted((kind, f"run{i}") for kind in ["synth", "sim", "power"] for i in [0, 2, 3])
+    # Sandboxes are gone, failed or not
+    assert os.listdir(tmp_path / "sandboxes") == []
+
+def test_parallel_run_unique_names(stages):
+    with pytest.raises(ValueError):
+        dse_parallel.parallel_run([{"clock": 1000, "params": {}}] * 2, {"params": types_text}, 2, ["a", "a"])
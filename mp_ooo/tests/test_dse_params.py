@@ -0,0 +1,80 @@
+import pytest
+
+import dse_params
+
+# Cut down from pkg/types.sv, with a power-of-two free list so the warning rule has something to lose
+types_text = """package params;
+    localparam int unsigned IC_PREFETCH_DEGREE = 3;     // (Ranges from 1-3)
+    localparam int unsigned RPT_SETS = 4;       // DO NOT CHANGE (RELIANT ON SRAM)
+    localparam int unsigned ISQ_ALU_SIZE = 9;
+    localparam int unsigned ISQ_BMD_SIZE = 4;
+    localparam int unsigned ISQ_LS_SIZE = 6;
+    localparam int unsigned LOAD_QUEUE_DEPTH = 16;
+    localparam int unsigned STORE_QUEUE_DEPTH = 16;
+    localparam int unsigned NUM_ROB_ENTRIES = 16;
+    localparam int unsigned NUM_PHYSICAL_REGISTERS = 32 + NUM_ROB_ENTRIES;
+    localparam int unsigned FREE_LIST_DEPTH = NUM_PHYSICAL_REGISTERS - 32;
+    localparam int unsigned NUM_EBR_CHECKPOINT = 3; // Should never bigger than reservation station
+    localparam int unsigned ROB_IDX_SIZE = $clog2(NUM_ROB_ENTRIES);
+    localparam int unsigned DIV_WIDTH = 3;      // Max 8
+endpackage
+package rv32i_types;
+    localparam int unsigned NUM_ROB_ENTRIES = 1;
+endpackage
+"""
+
+@pytest.fixture
+def model():
+    return dse_params.load_model(types_text)
+
+def test_load_model(model):
+    params = model["params"]
+    assert params["IC_PREFETCH_DEGREE"]["range"] == (1, 3)
+    assert params["DIV_WIDTH"]["range"] == (0, 8)
+    assert params["RPT_SETS"]["locked"]
+    assert params["FREE_LIST_DEPTH"]["deps"] == {"NUM_PHYSICAL_REGISTERS"}
+    values = dse_params.evaluate(model, {"NUM_ROB_ENTRIES": 32})
+    assert values["FREE_LIST_DEPTH"] == 32 and values["ROB_IDX_SIZE"] == 5
+
+def test_shipped_types_validate():
+    assert dse_params.validate(dse_params.load_model()) == ([], [])
+
+def test_validate_baseline(model):
+    assert dse_params.validate(model) == ([], [])
+    assert dse_params.validate(model, {"NUM_ROB_ENTRIES": 32, "IC_PREFETCH_DEGREE": 1}) == ([], [])
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"IC_PREFETCH_DEGREE": 4}, "IC_PREFETCH_DEGREE = 4 is outside 1-3"),
+    ({"DIV_WIDTH": 9}, "DIV_WIDTH = 9 is outside 0-8"),
+    ({"RPT_SETS": 8}, "RPT_SETS is marked DO NOT CHANGE"),
+    ({"NUM_EBR_CHECKPOINT": 5}, "NUM_EBR_CHECKPOINT is bigger than a reservation station"),
+    ({"NUM_ROB_ENTRIES": 1}, "FREE_LIST_DEPTH below 2 leaves the free list without a head/tail bit"),
+    ({"NUM_ROB_ENTRIES": -40}, "NUM_ROB_ENTRIES = -40 is negative but declared int unsigned"),
+    ({"NOT_A_PARAM": 1}, "NOT_A_PARAM is not a localparam in the params package"),
+])
+def test_validate_errors(model, overrides, message):
+    errors, _ = dse_params.validate(model, overrides)
+    assert message in errors
+
+def test_locked_param_may_be_restated(model):
+    assert dse_params.validate(model, {"RPT_SETS": 4}) == ([], [])
+
+def test_validate_warnings(model):
+    errors, warnings = dse_params.validate(model, {"NUM_ROB_ENTRIES": 20})
+    assert errors == []
+    assert warnings == ["FREE_LIST_DEPTH is not a power of two, the free list wraps on QUEUE_DEPTH_TOP"]
+
+def test_apply_overrides(model):
+    text = dse_params.apply_overrides(types_text, {"NUM_ROB_ENTRIES": 32, "IC_PREFETCH_DEGREE": 2})
+    assert "localparam int unsigned NUM_ROB_ENTRIES = 32;\n" in text
+    assert "localparam int unsigned IC_PREFETCH_DEGREE = 2;     // (Ranges from 1-3)\n" in text
+    # Names that merely contain the key, and the same name in another package, are left alone
+    assert "NUM_PHYSICAL_REGISTERS = 32 + NUM_ROB_ENTRIES;" in text
+    assert "ROB_IDX_SIZE = $clog2(NUM_ROB_ENTRIES);" in text
+    assert text.endswith("localparam int unsigned NUM_ROB_ENTRIES = 1;\nendpackage\n")
+    assert len(text.splitlines()) == len(types_text.splitlines())
+    assert dse_params.evaluate(dse_params.load_model(text))["FREE_LIST_DEPTH"] == 32
+
+def test_apply_overrides_unknown(model):
+    with pytest.raises(dse_params.ParamError):
+        dse_params.apply_overrides(types_text, {"ROB_ENTRIES": 32})
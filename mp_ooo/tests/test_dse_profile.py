@@ -0,0 +1,41 @@
+import dse_profile
+
+def event(name, cat, ts, dur, pid=1, tid=1, **args):
+    return {"name": name, "cat": cat, "ph": "X", "ts": ts, "dur": dur, "pid": pid, "tid": tid, "args": args}
+
+def test_critical_path_pipelined():
+    # Sim overlapped with synth; power waited for both, so the path runs through the longer synth
+    synth = event("synth", "stage", 0, 1000000)
+    sim = event("sim", "stage", 0, 400000, tid=2)
+    power = event("power", "stage", 1000500, 300000)
+    assert dse_profile.critical_path([sim, synth, power]) == [synth, power]
+
+def test_critical_path_chain():
+    synth = event("synth", "stage", 0, 100)
+    sim = event("sim", "stage", 100, 200)
+    power = event("power", "stage", 300, 50)
+    assert dse_profile.critical_path([power, sim, synth]) == [synth, sim, power]
+    assert dse_profile.critical_path([]) == []
+
+def test_critical_path_tolerance():
+    # A stage started a little before the one it waited for logged its end still follows it
+    synth = event("synth", "stage", 0, 10000)
+    sim = event("sim", "stage", 10000 - dse_profile.tolerance, 5000)
+    assert dse_profile.critical_path([synth, sim]) == [synth, sim]
+    late = event("sim", "stage", 10000 - dse_profile.tolerance - 1, 5000)
+    assert dse_profile.critical_path([synth, late]) == [late]
+
+def test_to_chrome():
+    events = [event("b", "make", 20, 5, pid=7), event("a", "stage", 10, 30, pid=3), event("c", "step", 15, 1, pid=7)]
+    chrome = dse_profile.to_chrome(events)
+    assert chrome["displayTimeUnit"] == "ms"
+    meta, rest = chrome["traceEvents"][:2], chrome["traceEvents"][2:]
+    assert [(m["ph"], m["pid"], m["args"]["name"]) for m in meta] == [("M", 3, "dse worker 3"), ("M", 7, "dse worker 7")]
+    assert [e["name"] for e in rest] == ["a", "c", "b"]
+
+def test_children():
+    stage = event("sim", "stage", 0, 100)
+    make = event("make vcs/top_tb", "make", 10, 50)
+    other_thread = event("make synth", "make", 10, 50, tid=2)
+    after = event("make run_vcs_top_tb", "make", 90, 20)
+    assert dse_profile.children([stage, make, other_thread, after], stage) == [make]
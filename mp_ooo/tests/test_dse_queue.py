@@ -0,0 +1,112 @@
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import dse_queue
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = dse_queue.connect(str(tmp_path / "queue.db"))
+    yield conn
+    conn.close()
+
+def state(conn, job_id):
+    return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+def dead_pid():
+    # A PID that existed and is gone
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+def test_claim_order(conn):
+    low = dse_queue.submit(conn, {"NUM_ROB_ENTRIES": 16})
+    high = dse_queue.submit(conn, {"NUM_ROB_ENTRIES": 32}, priority=5)
+    low2 = dse_queue.submit(conn, {"NUM_ROB_ENTRIES": 64})
+    assert [dse_queue.claim(conn, "w")["id"] for _ in range(3)] == [high, low, low2]
+    assert dse_queue.claim(conn, "w") is None
+
+def test_claim_marks_running(conn):
+    job_id = dse_queue.submit(conn, {"clock": 1000}, name="c1000")
+    job = dse_queue.claim(conn, "host:1")
+    assert job["id"] == job_id and job["run"] == {"clock": 1000} and job["name"] == "c1000"
+    row = state(conn, job_id)
+    assert (row["state"], row["worker"], row["attempts"]) == ("running", "host:1", 1)
+
+def test_no_double_claim(tmp_path):
+    # Two connections, as two workers on two machines sharing the file
+    path = str(tmp_path / "queue.db")
+    a, b = dse_queue.connect(path), dse_queue.connect(path)
+    for n in range(10):
+        dse_queue.submit(a, {"n": n})
+    claimed = []
+    while True:
+        ja, jb = dse_queue.claim(a, "a"), dse_queue.claim(b, "b")
+        claimed += [j["id"] for j in (ja, jb) if j is not None]
+        if ja is None and jb is None:
+            break
+    assert sorted(claimed) == list(range(1, 11))
+    a.close()
+    b.close()
+
+def test_submit_dedups(conn):
+    job_id = dse_queue.submit(conn, {"a": 1, "b": 2})
+    assert dse_queue.submit(conn, {"b": 2, "a": 1}, priority=3) == job_id
+    assert state(conn, job_id)["priority"] == 3
+    assert dse_queue.submit(conn, {"a": 1, "b": 2}, kind="synth") != job_id
+    with pytest.raises(ValueError):
+        dse_queue.submit(conn, {"a": 1}, kind="power")
+
+def test_requeue_stale_heartbeat(conn):
+    job_id = dse_queue.submit(conn, {"a": 1})
+    dse_queue.claim(conn, "elsewhere:1")
+    dse_queue.requeue_stale(conn)
+    assert state(conn, job_id)["state"] == "running"
+    conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - dse_queue.stale_after - 1, job_id))
+    dse_queue.requeue_stale(conn)
+    row = state(conn, job_id)
+    assert (row["state"], row["worker"]) == ("queued", None)
+    assert dse_queue.claim(conn, "w")["id"] == job_id
+
+def test_requeue_dead_local_worker(conn):
+    job_id = dse_queue.submit(conn, {"a": 1})
+    dse_queue.claim(conn, f"{socket.gethostname()}:{dead_pid()}")
+    dse_queue.requeue_stale(conn)
+    assert state(conn, job_id)["state"] == "queued"
+
+def test_live_local_worker_keeps_its_job(conn):
+    job_id = dse_queue.submit(conn, {"a": 1})
+    dse_queue.claim(conn)
+    dse_queue.requeue_stale(conn)
+    assert state(conn, job_id)["state"] == "running"
+    # A live PID is no proof of life without a heartbeat, it may have been reused
+    conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - dse_queue.stale_after - 1, job_id))
+    dse_queue.requeue_stale(conn)
+    assert state(conn, job_id)["state"] == "queued"
+
+def test_requeue_gives_up(conn):
+    job_id = dse_queue.submit(conn, {"a": 1})
+    worker = f"{socket.gethostname()}:{dead_pid()}"
+    for _ in range(dse_queue.max_attempts):
+        assert dse_queue.claim(conn, worker)["id"] == job_id
+        dse_queue.requeue_stale(conn)
+    row = state(conn, job_id)
+    assert (row["state"], row["attempts"]) == ("failed", dse_queue.max_attempts)
+    assert dse_queue.claim(conn, worker) is None
+    assert dse_queue.retry(conn) == 1
+    assert dse_queue.claim(conn, worker)["id"] == job_id
+
+def test_complete_and_release(conn):
+    done = dse_queue.submit(conn, {"a": 1})
+    back = dse_queue.submit(conn, {"a": 2})
+    dse_queue.claim(conn, "w")
+    dse_queue.claim(conn, "w")
+    dse_queue.complete(conn, done, {"ipc": 0.5})
+    dse_queue.release(conn, back)
+    assert dse_queue.counts(conn) == {"done": 1, "queued": 1}
+    # A requeued job finished by its old worker is not marked done
+    dse_queue.complete(conn, back, {"ipc": 0.1})
+    assert state(conn, back)["state"] == "queued"
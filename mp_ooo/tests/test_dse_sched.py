@@ -0,0 +1,97 @@
+from concurrent.futures import Future
+
+import pytest
+
+import dse_sched
+
+class FakePool:
+    # Starts nothing, the test finishes each future by hand
+    def __init__(self):
+        self.started = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.started.append((args[0], future))
+        return future
+
+    def future(self, tag):
+        return dict(self.started)[tag]
+
+def started(pool):
+    return [tag for tag, _ in pool.started]
+
+def scheduler(resources, **times):
+    pool = FakePool()
+    sched_times = dict(dse_sched.default_times, **times)
+    sched_times["pipelined"] = max(sched_times["synth"], sched_times["sim"])
+    return pool, dse_sched.make_scheduler(pool, resources, sched_times)
+
+def submit(sched, stage, tag, priority=0):
+    dse_sched.submit(sched, stage, tag, None, tag, priority=priority)
+
+def test_tokens_limit_admission():
+    pool, sched = scheduler({"dc": 1, "vcs": 2, "mem_gb": 64, "cores": 8})
+    for tag in ["synth1", "synth2"]:
+        submit(sched, "synth", tag)
+    assert started(pool) == ["synth1"]
+    assert sched["free"]["dc"] == 0 and sched["free"]["cores"] == 4
+    assert dse_sched.pending(sched) == 2
+
+def test_priority_order():
+    pool, sched = scheduler({"dc": 1, "vcs": 1, "mem_gb": 64, "cores": 8})
+    submit(sched, "synth", "first")
+    for tag, priority in [("late", 2), ("urgent", -1), ("normal", 0)]:
+        submit(sched, "synth", tag, priority)
+    order = []
+    while dse_sched.pending(sched):
+        pool.future(started(pool)[-1]).set_result(None)
+        order += [tag for tag, _ in dse_sched.wait_any(sched)]
+    assert order == ["first", "urgent", "normal", "late"]
+
+def test_backfill_short_job():
+    # A sim that ends before the next synth can get the license runs in the gap
+    pool, sched = scheduler({"dc": 1, "vcs": 1, "mem_gb": 64, "cores": 8}, synth=1800, sim=300)
+    submit(sched, "synth", "synth1")
+    submit(sched, "synth", "synth2")
+    submit(sched, "sim", "sim1")
+    assert started(pool) == ["synth1", "sim1"]
+
+@pytest.mark.parametrize("sim_time, backfilled", [(300, True), (3000, False)])
+def test_backfill_never_delays_the_head(sim_time, backfilled):
+    # The waiting synth needs every core once the power run ends; a sim holding one then
+    # may only start if it is done by that time
+    pool, sched = scheduler({"dc": 1, "vcs": 1, "mem_gb": 20, "cores": 4}, power=600, sim=sim_time)
+    submit(sched, "power", "power1")
+    submit(sched, "synth", "synth1")
+    submit(sched, "sim", "sim1")
+    assert ("sim1" in started(pool)) == backfilled
+    assert "synth1" not in started(pool)
+
+def test_backfill_into_spare_tokens():
+    # A long sim still starts when the waiting synth will not need what it holds
+    pool, sched = scheduler({"dc": 1, "vcs": 1, "mem_gb": 64, "cores": 8}, power=600, sim=3000)
+    submit(sched, "power", "power1")
+    submit(sched, "synth", "synth1")
+    submit(sched, "sim", "sim1")
+    assert started(pool) == ["power1", "sim1"]
+
+def test_wait_any_frees_tokens():
+    pool, sched = scheduler({"dc": 1, "vcs": 1, "mem_gb": 64, "cores": 8})
+    submit(sched, "synth", "synth1")
+    submit(sched, "synth", "synth2")
+    pool.future("synth1").set_result("report")
+    finished = dse_sched.wait_any(sched)
+    assert [(tag, future.result()) for tag, future in finished] == [("synth1", "report")]
+    assert started(pool) == ["synth1", "synth2"]
+    pool.future("synth2").set_result(None)
+    dse_sched.wait_any(sched)
+    assert sched["free"] == sched["total"]
+    assert dse_sched.wait_any(sched) == []
+
+def test_demand_capped_by_host():
+    # 16 GB synth on an 8 GB machine still runs, alone
+    pool, sched = scheduler({"dc": 2, "vcs": 1, "mem_gb": 8, "cores": 8})
+    assert dse_sched.stage_demand("synth", sched["total"])["mem_gb"] == 8
+    submit(sched, "synth", "synth1")
+    submit(sched, "synth", "synth2")
+    assert started(pool) == ["synth1"]
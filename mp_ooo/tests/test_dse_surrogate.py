@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+import dse_db
+import dse_surrogate
+
+def f(x):
+    return x * x - math.sin(x)
+
+def test_fit_predict():
+    X = [[i / 7] for i in range(15)]
+    model = dse_surrogate.fit(X, [f(x[0]) for x in X], ["x"])
+    for x in [0.1, 0.55, 1.3, 1.9]:
+        mean, std = dse_surrogate.predict(model, [x])
+        assert abs(mean - f(x)) < 0.05
+        assert abs(mean - f(x)) <= dse_surrogate.confidence * std + 1e-3
+    # Less sure away from the data than on it
+    assert dse_surrogate.predict(model, [5.0])[1] > 10 * dse_surrogate.predict(model, [1.0])[1]
+
+def test_fit_constant():
+    model = dse_surrogate.fit([[0, 1], [1, 1], [2, 1]], [3.0, 3.0, 3.0])
+    assert dse_surrogate.predict(model, [1.5, 1])[0] == pytest.approx(3.0)
+
+def slack_model():
+    # Timing is met from a 1500 ps clock up
+    clocks = list(range(1000, 2050, 50))
+    return dse_surrogate.fit([[c] for c in clocks], [(c - 1500) / 500 for c in clocks], ["clock"])
+
+def score_model():
+    # Scores fall with the ROB size, fitted in log space like train() does
+    robs = list(range(8, 33, 2))
+    return dse_surrogate.fit([[r] for r in robs], [math.log(100 / r) for r in robs], ["NUM_ROB_ENTRIES"])
+
+def test_verdict():
+    assert dse_surrogate.verdict({"slack": (-0.5, 0.1)}) is not None
+    # Not confidently bad: the bound reaches positive slack
+    assert dse_surrogate.verdict({"slack": (-0.5, 0.3)}) is None
+    assert dse_surrogate.verdict({"score": (math.log(20), 0.1)}, best_score=10) is not None
+    assert dse_surrogate.verdict({"score": (math.log(20), 0.5)}, best_score=10) is None
+    assert dse_surrogate.verdict({"score": (math.log(20), 0.1)}) is None
+
+def test_rank():
+    models = {"slack": slack_model(), "score": score_model()}
+    configs = [{"clock": 1100, "NUM_ROB_ENTRIES": 32}, {"clock": 1900, "NUM_ROB_ENTRIES": 8},
+               {"clock": 1900, "NUM_ROB_ENTRIES": 32}, {"clock": 1800, "NUM_ROB_ENTRIES": 16}]
+    kept, skipped = dse_surrogate.rank(models, configs, best_score=100 / 12)
+    # Misses timing, and confidently worse than the best score
+    assert [(c, "slack" in reason) for c, reason in skipped] == [(configs[0], True), (configs[1], False)]
+    assert kept == [configs[2], configs[3]]
+
+def test_train_and_cross_validate(tmp_path):
+    conn = dse_db.connect(str(tmp_path / "dse_results.db"))
+    for i in range(30):
+        rob, clock = 8 + i % 6 * 4, 1400 + i * 25
+        run = {"clock": clock, "ungroup": False, "gate_clock": True, "prog": "../testcode/coremark_im.elf",
+               "params": {"NUM_ROB_ENTRIES": rob}}
+        ipc = 0.5 + rob / 100
+        dse_db.record_run(conn, run, {"area": 1000.0 * rob, "slack": (clock - 1600) / 1000, "timingmet": clock >= 1600,
+                                      "ipc": ipc, "score": clock / ipc})
+    keys = ["NUM_ROB_ENTRIES", "clock"]
+    models = dse_surrogate.train(conn, keys, "coremark_im")
+    assert set(models) == set(dse_surrogate.targets)
+    mean, _ = dse_surrogate.estimate(models, {"clock": 1700, "NUM_ROB_ENTRIES": 16})["area"]
+    assert mean == pytest.approx(16000, rel=0.05)
+    report = dse_surrogate.cross_validate(conn, keys, "coremark_im")
+    assert set(report) == set(dse_surrogate.targets)
+    assert all(r["n"] == 30 for r in report.values())
+    assert report["area"]["rmse"] < 500
+    # Too few runs of another benchmark: no model, nothing to validate
+    assert dse_surrogate.train(conn, keys, "fft", which=["ipc"]) == {}
+    conn.close()
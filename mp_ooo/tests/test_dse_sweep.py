@@ -0,0 +1,19 @@
+import collections
+
+import dse_sweep
+
+def test_sobol_balanced():
+    points = list(dse_sweep.sobol([4, 8], {"count": 32}))
+    assert len(set(points)) == 32
+    assert set(collections.Counter(p[0] for p in points).values()) == {8}
+    assert set(collections.Counter(p[1] for p in points).values()) == {4}
+
+def test_sobol_seed():
+    unseeded = list(dse_sweep.sobol([4, 8], {"count": 32}))
+    a = list(dse_sweep.sobol([4, 8], {"count": 32, "seed": 1}))
+    b = list(dse_sweep.sobol([4, 8], {"count": 32, "seed": 2}))
+    assert a == list(dse_sweep.sobol([4, 8], {"count": 32, "seed": 1}))
+    assert a != b and a != unseeded
+    # The shift keeps every axis balanced
+    assert set(collections.Counter(p[0] for p in a).values()) == {8}
+    assert sorted(a) == sorted(set(a))
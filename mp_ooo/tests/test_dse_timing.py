@@ -0,0 +1,36 @@
+import pytest
+
+import dse_timing
+
+def test_first_step_follows_the_slack():
+    # 1000 ps period with 0.2 ns slack left: try 800 ps, plus the margin
+    assert dse_timing.predict_clock([(1000, 0.2)], None, None, 0) == pytest.approx(800)
+    assert dse_timing.predict_clock([(1000, -0.1)], None, None, 10) == pytest.approx(1110)
+
+def test_secant_step():
+    # DC gives back less slack than the period it was handed: 100 ps tighter lost only 50 ps of slack
+    history = [(1000, 0.2), (900, 0.15)]
+    guess = dse_timing.predict_clock(history, (900, 0.15), None, 0)
+    assert guess == pytest.approx(600)
+    # Where the line through both synths reaches a slack of margin
+    assert dse_timing.predict_clock(history, (900, 0.15), None, 50) == pytest.approx(700)
+
+def test_secant_needs_two_different_points():
+    # Same slack twice (or the same clock) gives no slope, back to the one-point step
+    assert dse_timing.predict_clock([(1000, 0.2), (900, 0.2)], (900, 0.2), None, 0) == pytest.approx(700)
+
+def test_bisection_fallback():
+    # Secant through the last two synths lands past a passing clock found earlier: bisect instead
+    history = [(900, 0.02), (1000, 0.3), (800, -0.4)]
+    assert dse_timing.predict_clock(history, (900, 0.02), (800, -0.4), 0) == pytest.approx(850)
+    # Inside the bracket the secant step is kept
+    history = [(1000, 0.1), (800, -0.1)]
+    assert dse_timing.predict_clock(history, (1000, 0.1), (800, -0.1), 0) == pytest.approx(900)
+    history = [(1000, 0.15), (800, -0.05)]
+    assert dse_timing.predict_clock(history, (1000, 0.15), (800, -0.05), 0) == pytest.approx(850)
+
+def test_one_sided_bounds():
+    # Never back to or past the fastest passing period, never at or under the slowest failing one
+    assert dse_timing.predict_clock([(900, 0.0)], (900, 0.0), None, 0) == 900 - dse_timing.tolerance
+    guess = dse_timing.predict_clock([(800, -0.05)], None, (900, -0.03), 0)
+    assert guess == 900 + max(dse_timing.tolerance, 30)
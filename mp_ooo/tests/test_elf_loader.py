@@ -0,0 +1,91 @@
+import os
+import random
+
+import pytest
+
+import elf_loader
+
+testcode = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testcode")
+coremark = os.path.join(testcode, "coremark_im.elf")
+addressabilities = [1, 2, 4, 8, 16, 32]
+
+def dense_baseline(data, a, pad=0):
+    # The byte at a time loop generate_memory_file.py used before hex_words
+    out = ""
+    temp_string = "".zfill(2*pad)
+    for i in range(len(data)):
+        temp_string += f"{data[i]:02x}"
+        if len(temp_string) == 2*a:
+            out += "".join(reversed([temp_string[i:i+2] for i in range(0, len(temp_string), 2)])) + '\n'
+            temp_string = ""
+    if len(temp_string) != 0:
+        out += "".join(reversed([temp_string[i:i+2] for i in range(0, len(temp_string), 2)])).zfill(2*a) + '\n'
+    return out
+
+@pytest.mark.parametrize("a", addressabilities)
+def test_hex_words_matches_baseline(a):
+    rng = random.Random(a)
+    for _ in range(200):
+        pad = rng.randrange(a)
+        data = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 100)))
+        assert elf_loader.hex_words(data, a, pad) == dense_baseline(data, a, pad)
+
+def test_hex_words_order():
+    assert elf_loader.hex_words(b"\x13\x00\x00\x00\x6f\x00", 4) == "00000013\n0000006f\n"
+    assert elf_loader.hex_words(b"\xaa\xbb", 4, pad=2) == "bbaa0000\n"
+    assert elf_loader.hex_words(b"", 4) == ""
+
+@pytest.mark.skipif(not os.path.isfile(coremark), reason="coremark_im.elf not built")
+@pytest.mark.parametrize("a", addressabilities)
+def test_hex_words_on_elf(a):
+    for s in elf_loader.memory_sections(elf_loader.load(coremark)):
+        assert elf_loader.hex_words(s.data, a, s.lma % a) == dense_baseline(s.data, a, s.lma % a)
+
+def sparse_words(data, a, pad, min_zero_words):
+    # {word offset: line} of a sparse image, built the way generate_memory_file.py writes it
+    words = bytes(pad) + data
+    words += bytes(-len(words) % a)
+    image = {}
+    for offset, block in elf_loader.nonzero_blocks(words, a, min_zero_words):
+        assert len(block) % a == 0
+        for i, line in enumerate(elf_loader.hex_words(block, a).splitlines()):
+            image[offset + i] = line
+    return image
+
+def check_sparse(data, a, pad, min_zero_words):
+    dense = elf_loader.hex_words(data, a, pad).splitlines()
+    sparse = sparse_words(data, a, pad, min_zero_words)
+    # Every word left out is zero, which is what bmem_0_on_x reads back
+    assert {i: line for i, line in enumerate(dense) if i in sparse} == sparse
+    assert all(int(line, 16) == 0 for i, line in enumerate(dense) if i not in sparse)
+    # and only runs long enough to be worth a jump are left out
+    missing = sorted(set(range(len(dense))) - set(sparse))
+    runs = []
+    for i in missing:
+        if runs and runs[-1][1] == i:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    assert all(hi - lo >= min_zero_words for lo, hi in runs)
+
+@pytest.mark.parametrize("a", addressabilities)
+def test_sparse_expands_to_dense(a):
+    rng = random.Random(a)
+    for _ in range(200):
+        # Mostly zero runs of random length between a few random bytes
+        data = b"".join(bytes(rng.randrange(64)) + bytes([rng.randrange(1, 256)]) * rng.randrange(3)
+                        for _ in range(rng.randrange(1, 20)))
+        check_sparse(data, a, rng.randrange(a), rng.randrange(1, 8))
+
+def test_nonzero_blocks():
+    data = b"\x01\x00\x00\x00" + bytes(16) + b"\x02\x00\x00\x00"
+    assert elf_loader.nonzero_blocks(data, 4, 4) == [(0, data[:4]), (5, data[20:])]
+    # A run one word short stays in
+    assert elf_loader.nonzero_blocks(data, 4, 5) == [(0, data)]
+    assert elf_loader.nonzero_blocks(bytes(8), 4, 1) == []
+
+@pytest.mark.skipif(not os.path.isfile(coremark), reason="coremark_im.elf not built")
+@pytest.mark.parametrize("a", addressabilities)
+def test_sparse_on_elf(a):
+    for s in elf_loader.memory_sections(elf_loader.load(coremark)):
+        check_sparse(s.data, a, s.lma % a, max(256 // a, 1))
@@ -0,0 +1,90 @@
+import pytest
+
+import parse_reports
+
+# Trimmed from Design Compiler / VCS output
+timing_rpt = """****************************************
+Report : timing
+****************************************
+  data arrival time                                                 -1.72
+  ---------------------------------------------------------------------------
+  slack (VIOLATED: increase significant digits)                     -0.03
+
+  slack (MET)                                                        0.12
+"""
+
+area_rpt = """Number of ports:                        12345
+Number of cells:                         4567
+Combinational area:              80000.000000
+Total cell area:                123456.789000
+Total area:                 undefined
+"""
+
+power_rpt = """  Cell Internal Power  =   2.1000 mW   (70%)
+  Net Switching Power  = 900.0000 uW   (30%)
+Total Dynamic Power    =   3.0000 mW  (100%)
+
+Cell Leakage Power     = 250.0000 uW
+
+                 Internal         Switching           Leakage            Total
+Power Group      Power            Power               Power              Power   (   %    )  Attrs
+--------------------------------------------------------------------------------------------------
+register       1.0000e+03 uW     1.0000e+02 uW      5.0000e+07 nW      1.1500e+03 uW  ( 35.38%)
+--------------------------------------------------------------------------------------------------
+Total          2.1000e+03 uW     9.0000e+02 uW      2.5000e+08 nW      3.2500e+03 uW
+"""
+
+sim_log = """Monitor: Power Start time is 1000
+Monitor: Segment Start time is 1000
+Monitor: Segment IPC: 0.812345
+Monitor: Segment Time: 400000
+Monitor: Power Stop time is 401000
+Monitor: Total IPC: 0.700000
+Monitor: Total Time: 500000
+"""
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_parse_timing(tmp_path):
+    # The first slack line is the worst path
+    assert parse_reports.parse_timing(write(tmp_path, "timing.rpt", timing_rpt)) == (-0.03, False)
+    assert parse_reports.parse_timing(write(tmp_path, "met.rpt", "  slack (MET)   0.25\n")) == (0.25, True)
+    assert parse_reports.parse_timing(write(tmp_path, "empty.rpt", "")) == (None, None)
+
+def test_parse_area(tmp_path):
+    assert parse_reports.parse_area(write(tmp_path, "area.rpt", area_rpt)) == (123456.789, 4567)
+    assert parse_reports.parse_area(write(tmp_path, "cells.rpt", "Number of cells:  12\n")) == (None, 12)
+
+def test_parse_power(tmp_path):
+    report = parse_reports.parse_power(write(tmp_path, "power2.rpt", power_rpt))
+    assert report.dynamic == pytest.approx(3.0)
+    assert report.leakage == pytest.approx(0.25)
+    # The last column of the Total row, not the register group above it
+    assert report.total == pytest.approx(3.25)
+
+def test_parse_power_missing(tmp_path):
+    assert parse_reports.parse_power(write(tmp_path, "power2.rpt", "Error: no design\n")) == (None, None, None)
+
+def test_parse_sim(tmp_path):
+    report = parse_reports.parse_sim(write(tmp_path, "simulation.log", sim_log))
+    assert report == (0.812345, 0.7, 400000, 500000, 1000, 401000)
+    assert report.ipc == 0.812345
+    assert report.delay == pytest.approx(0.401)
+
+def test_parse_sim_without_segment(tmp_path):
+    report = parse_reports.parse_sim(write(tmp_path, "simulation.log", "Monitor: Total IPC: 0.5\n"))
+    assert report.ipc == 0.5
+    assert report.delay is None
+
+def test_matches_across_blocks(tmp_path, monkeypatch):
+    # Lines split by the block size are still found whole, and only the first value counts
+    padding = "x" * 37 + "\n"
+    text = padding * 50 + sim_log + padding * 50 + "Monitor: Segment IPC: 0.1\n"
+    path = write(tmp_path, "simulation.log", text)
+    expected = parse_reports.parse_sim(path)
+    monkeypatch.setattr(parse_reports, "block_size", 16)
+    assert parse_reports.parse_sim(path) == expected
+    assert expected.segment_ipc == 0.812345
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import prog_cache
+
+@pytest.fixture
+def prog(tmp_path):
+    # A two-file C program with a header next to it, and the startup code and linker script
+    for name, text in [("main.c", "int main() { return f(); }\n"), ("f.c", "int f() { return 0; }\n"),
+                       ("f.h", "int f();\n"), ("README", "notes\n"), ("startup.s", "_start:\n"), ("link.ld", "")]:
+        (tmp_path / name).write_text(text)
+    return tmp_path
+
+def key(prog, flags="-O2", sources=("main.c", "f.c"), compiler="sh"):
+    return prog_cache.compile_key([str(prog / s) for s in sources], [str(prog / "startup.s"), str(prog / "link.ld"), ""],
+                                  flags, compiler)
+
+def test_compile_key_is_stable(prog):
+    assert key(prog) == key(prog)
+
+def test_compile_key_follows_inputs(prog):
+    base = key(prog)
+    assert key(prog, flags="-O3") != base
+    assert key(prog, sources=("f.c", "main.c")) != base
+    assert key(prog, compiler="true") != base
+    (prog / "f.h").write_text("int f(void);\n")
+    header = key(prog)
+    assert header != base
+    # A header that was not there before is picked up too
+    (prog / "g.hpp").write_text("\n")
+    assert key(prog) != header
+    header = key(prog)
+    (prog / "link.ld").write_text("SECTIONS {}\n")
+    assert key(prog) != header
+
+def test_compile_key_ignores_other_files(prog):
+    base = key(prog)
+    (prog / "README").write_text("more notes\n")
+    (prog / "main.o").write_text("")
+    assert key(prog) == base
+
+def test_store_fetch(prog, tmp_path, monkeypatch):
+    monkeypatch.setattr(prog_cache, "cache_dir", str(tmp_path / "cache"))
+    k = key(prog)
+    elf = prog / "main.elf"
+    assert not prog_cache.fetch("elf", k, str(elf))
+    elf.write_bytes(b"\x7fELF")
+    prog_cache.store("elf", k, str(elf))
+    out = tmp_path / "out.elf"
+    assert prog_cache.fetch("elf", k, str(out))
+    assert out.read_bytes() == b"\x7fELF"
+    # Entries are read-only, so nothing writes through a hardlink into the cache
+    assert not os.stat(prog_cache.entry_path("elf", k)).st_mode & 0o222
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+
+import re
+import struct
+import sys
+from typing import NamedTuple
+
+# Minimal ELF32 reader: the header tables are parsed once and the loadable bytes kept in memory,
+# so every memory_{a}.lst comes from one read of the file instead of objdump -h plus an objcopy
+# per section and addressability. The same file is in mp_ooo, mp_pipeline and mp_verif/cpu bin/.
+
+SHT_SYMTAB  = 2
+SHT_NOBITS  = 8
+SHF_ALLOC   = 0x2
+SHF_EXECINSTR = 0x4
+SHN_LORESERVE = 0xff00
+STT_FUNC    = 2
+STT_SECTION = 3
+STT_FILE    = 4
+PT_LOAD     = 1
+
+class Segment(NamedTuple):
+    type: int
+    offset: int
+    vaddr: int
+    paddr: int
+    filesz: int
+    memsz: int
+    flags: int
+
+class Section(NamedTuple):
+    name: str
+    type: int
+    flags: int
+    addr: int           # VMA
+    lma: int            # load address, what objdump -h prints as LMA
+    offset: int
+    size: int
+    data: bytes         # empty for .bss and anything not allocated
+
+    @property
+    def loadable(self):
+        # What objcopy -O binary would write out
+        return bool(self.flags & SHF_ALLOC) and self.type != SHT_NOBITS and self.size > 0
+
+class Symbol(NamedTuple):
+    name: str
+    value: int
+    size: int
+    type: int           # STT_*
+    bind: int           # STB_*
+    shndx: int          # section index, 0 undefined, >= SHN_LORESERVE absolute/common
+
+class ElfError(Exception):
+    pass
+
+def load_address(sec_addr, sec_offset, sec_type, segments):
+    # The LMA the way BFD assigns it: through the PT_LOAD segment that holds the section
+    for seg in segments:
+        if seg.type != PT_LOAD:
+            continue
+        if sec_type != SHT_NOBITS:
+            if seg.offset <= sec_offset < seg.offset + seg.filesz:
+                return seg.paddr + sec_addr - seg.vaddr
+        elif seg.vaddr <= sec_addr < seg.vaddr + seg.memsz:
+            return seg.paddr + sec_addr - seg.vaddr
+    return sec_addr
+
+def parse(image):
+    if image[:4] != b"\x7fELF":
+        raise ElfError("not an ELF file")
+    if image[4] != 1:
+        raise ElfError("only ELF32 is supported")
+    endian = "<" if image[5] == 1 else ">"
+    (e_type, e_machine, e_version, e_entry, e_phoff, e_shoff, e_flags, e_ehsize, e_phentsize, e_phnum,
+     e_shentsize, e_shnum, e_shstrndx) = struct.unpack_from(endian + "HHIIIIIHHHHHH", image, 16)
+    segments = [Segment(*struct.unpack_from(endian + "7I", image, e_phoff + i * e_phentsize))
+                for i in range(e_phnum)]
+    headers = [struct.unpack_from(endian + "10I", image, e_shoff + i * e_shentsize) for i in range(e_shnum)]
+    names = b""
+    if e_shstrndx < len(headers):
+        _, _, _, _, off, size, _, _, _, _ = headers[e_shstrndx]
+        names = image[off:off + size]
+    sections = []
+    for sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, _, _, _, _ in headers[1:]:
+        name = names[sh_name:names.index(b"\0", sh_name)].decode() if names else ""
+        data = b""
+        if sh_flags & SHF_ALLOC and sh_type != SHT_NOBITS:
+            data = bytes(image[sh_offset:sh_offset + sh_size])
+        sections.append(Section(name, sh_type, sh_flags, sh_addr,
+                                load_address(sh_addr, sh_offset, sh_type, segments), sh_offset, sh_size, data))
+    return {"entry": e_entry, "machine": e_machine, "endian": endian, "segments": segments,
+            "sections": sections, "headers": headers, "image": image}
+
+def load(path):
+    with open(path, 'rb') as f:
+        return parse(f.read())
+
+def memory_sections(elf):
+    # Sections that end up in memory, in section header order (the order objdump -h lists them)
+    return [s for s in elf["sections"] if s.flags & SHF_ALLOC]
+
+def symbols(elf):
+    # Every .symtab entry, in table order; empty for a stripped ELF
+    image = elf["image"]
+    endian = elf["endian"]
+    syms = []
+    for _, sh_type, _, _, sh_offset, sh_size, sh_link, _, _, sh_entsize in elf["headers"]:
+        if sh_type != SHT_SYMTAB or sh_link >= len(elf["headers"]):
+            continue
+        str_off, str_size = elf["headers"][sh_link][4], elf["headers"][sh_link][5]
+        strtab = image[str_off:str_off + str_size]
+        for off in range(sh_offset, sh_offset + sh_size, sh_entsize or 16):
+            st_name, st_value, st_size, st_info, _, st_shndx = struct.unpack_from(endian + "IIIBBH", image, off)
+            name = strtab[st_name:strtab.index(b"\0", st_name)].decode(errors="replace") if st_name else ""
+            syms.append(Symbol(name, st_value, st_size, st_info & 0xf, st_info >> 4, st_shndx))
+    return syms
+
+def hex_words(data, a, pad=0):
+    # $readmemh lines of a bytes each, most significant byte first. pad zero bytes go in front
+    # (a section starting mid-word), a partial last word is filled with zeros at the top.
+    # Reversing the whole buffer swaps the bytes of every word at once, bytes.hex splits it
+    # into words, and only the line order is left to undo; no per-byte Python work.
+    data = bytes(pad) + bytes(data)
+    if len(data) % a:
+        data += bytes(a - len(data) % a)
+    if not data:
+        return ""
+    lines = data[::-1].hex("\n", a).split("\n")
+    lines.reverse()
+    return "\n".join(lines) + "\n"
+
+def nonzero_blocks(data, a, min_zero_words):
+    # [(word offset, bytes)] of data (a whole number of words) with every run of at least
+    # min_zero_words all-zero words left out, for memories that read unloaded words as zero
+    blocks = []
+    start = 0
+    for m in re.finditer(rb"\x00{%d,}" % (min_zero_words * a), data):
+        # Only whole words can be skipped
+        lo = -(-m.start() // a) * a
+        hi = m.end() // a * a
+        if hi - lo < min_zero_words * a:
+            continue
+        if lo > start:
+            blocks.append((start // a, data[start:lo]))
+        start = hi
+    if start < len(data):
+        blocks.append((start // a, data[start:]))
+    return blocks
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: elf_loader.py <elf>")
+        exit(1)
+    elf = load(sys.argv[1])
+    print(f"entry {elf['entry']:08x}")
+    print(f'{"Name":<14}{"Size":>10}{"VMA":>10}{"LMA":>10}{"Off":>10}')
+    for s in memory_sections(elf):
+        print(f"{s.name:<14}{s.size:>10x}{s.addr:>10x}{s.lma:>10x}{s.offset:>10x}{'' if s.loadable else '  (no contents)'}")
+
+if __name__ == "__main__":
+    main()
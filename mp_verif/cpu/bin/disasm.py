@@ -0,0 +1,297 @@
+#!/usr/bin/python3
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import NamedTuple
+
+import elf_loader
+
+# Lazy disassembly. Instead of an objdump -D of the whole ELF on every run, the index
+# (<stem>.idx next to the memory images) holds the symbol table, and objdump -d only runs over
+# the function (symbol to next symbol) something asks about, once per function.
+# The same file is in mp_ooo, mp_pipeline and mp_verif/cpu bin/.
+#
+#   python3 disasm.py bin/coremark_im.idx pc 0x1eceb0a4
+#   python3 disasm.py bin/coremark_im.idx func core_bench_list
+#   python3 disasm.py bin/coremark_im.idx annotate spike/commit.log
+#   python3 disasm.py bin/coremark_im.idx dump > bin/coremark_im.dis
+
+index_version   = 2
+# RISCV_OBJDUMP overrides; mp_ooo compiles with the riscv64 toolchain, mp_pipeline and mp_verif with riscv32
+objdump_names   = ["riscv64-unknown-elf-objdump", "riscv32-unknown-elf-objdump"]
+objdump_flags   = ["-Mnumeric"]
+# Symbols objdump would not label an address with
+mapping_symbol  = re.compile(r"\$[xd]")
+# "80000000:	00000093          	addi	x1,x0,0" (llvm-objdump: "80000000: 93 00 00 00  	li	x1, 0"),
+# the text is missing on a continuation line
+insn_line       = re.compile(r"^\s*([0-9a-f]+):\s+([0-9a-f]+(?: [0-9a-f]+)*)\s*(?:\t(.*))?$")
+
+class Insn(NamedTuple):
+    addr: int
+    size: int
+    raw: int
+    text: str
+    symbol: str         # enclosing symbol, "" when there is none
+    offset: int         # addr - symbol address
+
+### INDEX
+
+def file_sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def build_index(elf, elf_path):
+    # Executable sections and symbols, functions and globals first among those at one address
+    syms = []
+    for s in elf_loader.symbols(elf):
+        if s.shndx == 0 or s.shndx >= elf_loader.SHN_LORESERVE or s.type in (elf_loader.STT_SECTION, elf_loader.STT_FILE):
+            continue
+        if s.name and not mapping_symbol.match(s.name):
+            syms.append([s.value, s.size, s.type, s.bind, s.name])
+    syms.sort(key=lambda s: (s[0], -(s[2] == elf_loader.STT_FUNC), -s[3], s[4]))
+    sections = [{"name": sec.name, "addr": sec.addr, "size": sec.size} for sec in elf["sections"]
+                if sec.flags & elf_loader.SHF_EXECINSTR and sec.loadable]
+    return {"version": index_version, "elf": os.path.abspath(elf_path), "sha256": file_sha256(elf["image"]),
+            "sections": sections, "symbols": syms}
+
+def save_index(idx, path):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump({k: idx[k] for k in ["version", "elf", "sha256", "sections", "symbols"]}, f, separators=(",", ":"))
+        f.write("\n")
+    os.replace(tmp, path)
+
+def read_index(path):
+    with open(path) as f:
+        return json.load(f)
+
+def open_index(path):
+    # path: an ELF or a .idx. A .idx is used while it matches its ELF, otherwise rebuilt in memory.
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    idx = None
+    if head != b"\x7fELF":
+        idx = read_index(path)
+        # The tree may have been copied since, then the ELF is next to the index
+        path = idx["elf"] if os.path.isfile(idx["elf"]) else os.path.splitext(path)[0] + ".elf"
+    with open(path, 'rb') as f:
+        image = f.read()
+    if idx is None or idx.get("version") != index_version or idx["sha256"] != file_sha256(image):
+        idx = build_index(elf_loader.parse(image), path)
+    # What objdump reads, and the functions it already disassembled
+    idx["path"] = path
+    idx["windows"] = {}
+    idx["addrs"] = [s[0] for s in idx["symbols"]]
+    return idx
+
+### OBJDUMP
+
+def objdump_tool():
+    tool = os.environ.get("RISCV_OBJDUMP")
+    if tool:
+        return tool
+    for name in objdump_names:
+        if shutil.which(name):
+            return name
+    raise RuntimeError(f"no RISC-V objdump ({' or '.join(objdump_names)}) in PATH, set RISCV_OBJDUMP")
+
+def objdump(path, args):
+    result = subprocess.run([objdump_tool()] + objdump_flags + args + [path], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"objdump {path}: {result.stderr.strip()}")
+    return result.stdout
+
+def parse_objdump(idx, text):
+    # Instruction lines of objdump -d output; a continuation line (a long .word run) extends the one before
+    insns = []
+    for line in text.splitlines():
+        m = insn_line.match(line)
+        if m is None:
+            continue
+        addr = int(m.group(1), 16)
+        # Each group is a number (an instruction, a .word, or one byte for llvm-objdump), in memory order
+        raw = size = 0
+        for g in m.group(2).split():
+            raw |= int(g, 16) << (8 * size)
+            size += len(g) // 2
+        if m.group(3) is None and insns and insns[-1].addr + insns[-1].size == addr:
+            prev = insns[-1]
+            insns[-1] = prev._replace(size=prev.size + size, raw=prev.raw | raw << (8 * prev.size))
+            continue
+        sym = symbol_at(idx, addr) or ("", 0)
+        insns.append(Insn(addr, size, raw, (m.group(3) or "").strip(), *sym))
+    return insns
+
+### QUERIES
+
+def section_of(idx, addr):
+    for s in idx["sections"]:
+        if s["addr"] <= addr < s["addr"] + s["size"]:
+            return s
+    return None
+
+def symbol_at(idx, addr):
+    # (name, offset) of the symbol addr falls in: the closest one at or below it, preferring
+    # functions and globals at the same address. None below the first symbol.
+    i = bisect.bisect_right(idx["addrs"], addr) - 1
+    if i < 0:
+        return None
+    base = idx["addrs"][i]
+    while i > 0 and idx["addrs"][i - 1] == base:
+        i -= 1
+    return idx["symbols"][i][4], addr - base
+
+def symbolize(idx, addr):
+    sym = symbol_at(idx, addr)
+    if sym is None:
+        return ""
+    return sym[0] if sym[1] == 0 else f"{sym[0]}+0x{sym[1]:x}"
+
+def window(idx, addr):
+    # [start, end) around addr from one symbol to the next, inside addr's executable section.
+    # A symbol is an instruction boundary, so objdump starting there stays in sync.
+    sec = section_of(idx, addr)
+    if sec is None:
+        return None
+    start, end = sec["addr"], sec["addr"] + sec["size"]
+    i = bisect.bisect_right(idx["addrs"], addr)
+    if i > 0 and idx["addrs"][i - 1] >= start:
+        start = idx["addrs"][i - 1]
+    if i < len(idx["addrs"]) and idx["addrs"][i] < end:
+        end = idx["addrs"][i]
+    return start, end
+
+def disassemble(idx, start, end):
+    # Instructions starting in [start, end), start should be an instruction boundary
+    return parse_objdump(idx, objdump(idx["path"], ["-d", f"--start-address=0x{start:x}", f"--stop-address=0x{end:x}"]))
+
+def window_insns(idx, addr):
+    # Memoized per window, an annotated log hits the same few functions over and over
+    bounds = window(idx, addr)
+    if bounds is None:
+        return []
+    if bounds not in idx["windows"]:
+        idx["windows"][bounds] = disassemble(idx, *bounds)
+    return idx["windows"][bounds]
+
+def lookup(idx, pc):
+    # The instruction at pc, or the one pc falls inside. None outside the executable sections.
+    insns = window_insns(idx, pc)
+    i = bisect.bisect_right([insn.addr for insn in insns], pc) - 1
+    if i < 0 or pc >= insns[i].addr + insns[i].size:
+        return None
+    return insns[i]
+
+def function_range(idx, name):
+    # [start, end) of a symbol: its size, or up to the next symbol when the size is 0
+    for addr, size, _, _, sym in idx["symbols"]:
+        if sym == name:
+            if size:
+                return addr, addr + size
+            later = [a for a in idx["addrs"] if a > addr]
+            sec = section_of(idx, addr)
+            end = sec["addr"] + sec["size"] if sec else addr
+            return addr, min(later + [end])
+    raise KeyError(f"no symbol {name}")
+
+def function(idx, name):
+    return disassemble(idx, *function_range(idx, name))
+
+def format_insn(insn):
+    # objdump -d style
+    raw = f"{insn.raw:0{insn.size * 2}x}"
+    return f"{insn.addr:8x}:\t{raw:<20}\t{insn.text}"
+
+pc_pattern = re.compile(r"0x([0-9a-fA-F]{8})")
+
+def annotate(idx, line):
+    # Appends <symbol+offset> and the instruction to a log line at its first 0x........ pc,
+    # e.g. a spike or commit.log line
+    m = pc_pattern.search(line)
+    insn = lookup(idx, int(m.group(1), 16)) if m else None
+    if insn is None:
+        return line
+    return f"{line}\t<{symbolize(idx, insn.addr)}>\t{insn.text.expandtabs(8)}"
+
+def dump(idx, out):
+    # What generate_memory_file.py used to write to <stem>.dis
+    out.write(objdump(idx["path"], ["-D"]))
+
+def parse_addr(s):
+    # Addresses are hex, with or without 0x
+    return int(s, 16)
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up instructions and symbols of a RISC-V ELF without a full disassembly")
+    parser.add_argument("elf", help="ELF, or its .idx written by generate_memory_file.py")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("pc", help="the instruction and symbol at each address")
+    p.add_argument("pcs", nargs="+")
+    p.add_argument("-C", "--context", type=int, default=0, help="instructions to show around it, within its function")
+    p = sub.add_parser("func", help="disassemble a function or label")
+    p.add_argument("names", nargs="+")
+    p = sub.add_parser("range", help="disassemble [start, end)")
+    p.add_argument("start")
+    p.add_argument("end")
+    p = sub.add_parser("annotate", help="append the instruction to every line of a log with a pc")
+    p.add_argument("log", nargs="?", default="-")
+    sub.add_parser("symbols", help="the symbol table, by address")
+    sub.add_parser("dump", help="objdump -D of the whole ELF, the old .dis file")
+    p = sub.add_parser("index", help="write the index of an ELF")
+    p.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    try:
+        idx = open_index(args.elf)
+    except (OSError, ValueError, elf_loader.ElfError) as e:
+        print(f"Error: {args.elf}: {e}", file=sys.stderr)
+        exit(1)
+    try:
+        if args.cmd == "pc":
+            for s in args.pcs:
+                pc = parse_addr(s)
+                insn = lookup(idx, pc)
+                if insn is None:
+                    sym = symbol_at(idx, pc)
+                    print(f"{pc:08x}: not code" + (f" <{symbolize(idx, pc)}>" if sym else ""))
+                    continue
+                insns = window_insns(idx, pc)
+                i = insns.index(insn)
+                for other in insns[max(i - args.context, 0):i + 1 + args.context]:
+                    mark = "=>" if other.addr == insn.addr else "  "
+                    print(f"{mark} <{symbolize(idx, other.addr)}>\t{format_insn(other)}")
+        elif args.cmd == "func":
+            for name in args.names:
+                start, _ = function_range(idx, name)
+                print(f"{start:08x} <{name}>:")
+                for insn in function(idx, name):
+                    print(format_insn(insn))
+        elif args.cmd == "range":
+            for insn in disassemble(idx, parse_addr(args.start), parse_addr(args.end)):
+                print(f"<{symbolize(idx, insn.addr)}>\t{format_insn(insn)}")
+        elif args.cmd == "annotate":
+            f = sys.stdin if args.log == "-" else open(args.log)
+            for line in f:
+                print(annotate(idx, line.rstrip("\n")))
+        elif args.cmd == "symbols":
+            for addr, size, typ, bind, name in idx["symbols"]:
+                print(f"{addr:08x} {size:>8} {'FUNC' if typ == elf_loader.STT_FUNC else '':<4} {name}")
+        elif args.cmd == "dump":
+            dump(idx, sys.stdout)
+        else:
+            save_index(idx, args.output or os.path.splitext(args.elf)[0] + ".idx")
+    except (KeyError, RuntimeError) as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        exit(1)
+    except BrokenPipeError:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ import pathlib
 import subprocess
 import math
 
+import disasm
+import elf_loader
+
 RED    = "31"
 YELLOW = "33"
 GREEN  = "32"
@@ -38,8 +41,6 @@ linker_script = os.path.join(script_dir, "link.ld")
 compile = True
 
 assembler="riscv32-unknown-elf-gcc"
-objdump="riscv32-unknown-elf-objdump"
-objcopy="riscv32-unknown-elf-objcopy"
 arch = "rv32im"
 abi = "ilp32"
 opt = "-Ofast -flto"
@@ -48,10 +49,9 @@ include = "" if len(input_file) == 1 else f"-I {os.path.dirname(os.path.abspath(
 assembler_args = f"-mcmodel=medany -static -fno-common -ffreestanding -nostartfiles -lm -static-libgcc -lgcc -lc -Wl,--no-relax -march={arch} -mabi={abi} {opt} {warn} -T {linker_script} {include}"
 
 out_elf_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".elf")
-out_dis_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".dis")
-temp_bin_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".bin")
+out_idx_file = os.path.join(work_dir, pathlib.Path(input_file[0]).stem + ".idx")
 
-for f in [os.path.join(work_dir, f"memory_{x}.lst") for x in addressability] + [out_elf_file, out_dis_file, temp_bin_file]:
+for f in [os.path.join(work_dir, f"memory_{x}.lst") for x in addressability] + [out_elf_file, out_idx_file]:
     if os.path.isfile(f):
         os.remove(f)
 if not os.path.isdir(work_dir):
@@ -74,37 +74,25 @@ if compile:
     else:
         print(f"[INFO]  Compiled source to {out_elf_file}")
 
-result = subprocess.run(f"{objdump} -D -Mnumeric {out_elf_file} > {out_dis_file}", shell=True, stdout=subprocess.PIPE)
-if result.returncode != 0:
-    print(sprint_color("[ERROR]", RED) + "Error disassembling")
+try:
+    elf = elf_loader.load(out_elf_file)
+except (OSError, elf_loader.ElfError) as e:
+    print(sprint_color("[ERROR]", RED) + f" Error reading {out_elf_file}: {e}")
     exit(1)
-else:
-    print(f"[INFO]  Disassembling {os.path.basename(out_elf_file)} to {out_dis_file}")
 
-result = subprocess.run(f"objdump -h {out_elf_file}", shell=True, stdout=subprocess.PIPE)
-if result.returncode != 0:
-    print(sprint_color("[ERROR]", RED) + "Error objdumping")
-    exit(1)
-sections = [x.strip().split() for x in result.stdout.decode().splitlines()[5::2]]
+# No objdump -D here: disasm.py runs objdump -d over just the function asked about, using the index,
+# e.g. python3 ../bin/disasm.py bin/<prog>.idx pc 1eceb0a4, and dump writes the old .dis
+disasm.save_index(disasm.build_index(elf, out_elf_file), out_idx_file)
+print(f"[INFO]  Indexed {os.path.basename(out_elf_file)} to {out_idx_file}")
+
+sections = elf_loader.memory_sections(elf)
 
 for a in addressability:
     fname = os.path.join(work_dir, f"memory_{a}.lst")
     with open(fname, 'w') as f:
         for s in sections:
-            os.system(f"{objcopy} -O binary -j {s[1]} {out_elf_file} {temp_bin_file}")
-            if not os.path.isfile(temp_bin_file):
-                print(sprint_color("[ERROR]", RED) + "Error binarizing")
-                exit(1)
-            with open(temp_bin_file, 'rb') as f2:
-                binary = f2.read()
-            if len(binary) != 0:
-                f.write(f"@{int(s[3], 16) >> int(math.log2(a)):08x}\n")
-                temp_string = ""
-                for i in range(len(binary)):
-                    temp_string += f"{binary[i]:02x}"
-                    if (i+1) % a == 0:
-                        f.write("".join(reversed([temp_string[i:i+2] for i in range(0, len(temp_string), 2)])) + '\n')
-                        temp_string = ""
-                f.write('\n')
-            os.remove(temp_bin_file)
+            if len(s.data) != 0:
+                # Whole words only, a trailing partial word is left out; one write per section
+                words = s.data[:len(s.data) - len(s.data) % a]
+                f.write(f"@{s.addr >> int(math.log2(a)):08x}\n" + elf_loader.hex_words(words, a) + '\n')
     print(f"[INFO]  Wrote memory contents to {fname}")